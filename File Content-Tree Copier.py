@@ -1,7 +1,88 @@
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import filedialog, scrolledtext, ttk, messagebox
 import os
+import bisect
 import json
+import queue
+import re
+import time
+from collections import deque
+
+from tree_copier import (
+    DEFAULT_CACHE_BUDGET, DEFAULT_READ_WORKERS, AggregateContent, ContentCache, DirectoryIndex, IgnoreRules, diff_trees,
+    SkipReport, format_size, is_ignored_file, iter_bundle_segments, iter_tree_files,
+    read_files_parallel, scan_directory, scan_files, TreeNode, TokenCounter, fit_to_budget, format_tokens,
+    CONTENTS_HEADER, PartWriter, ARCHIVE_FORMATS, ContentHashes, iter_deduplicated, export_format, open_text_output,
+    write_archive, write_jsonl,
+    LoadProfile, DecodePool, JobCancelled, JobScheduler, PRIORITY_BACKGROUND, PRIORITY_CONTENT, PRIORITY_TREE,
+    DEFAULT_FALLBACK_ENCODINGS, decodes_the_same, normalize_encodings,
+    SearchIndex, compile_query, required_literals, search_segments, ContentFilter, iter_matching,
+)
+
+# Streaming of loaded contents into the text area
+STREAM_QUEUE_SIZE = 64        # Files buffered between the loader thread and the UI
+STREAM_BATCH_SECONDS = 0.03   # Main-loop time spent inserting per batch
+STREAM_DRAIN_INTERVAL_MS = 10 # Delay between batches, keeps the UI responsive
+
+# How often the main loop applies the UI updates posted by background jobs
+JOB_POLL_MS = 15
+
+# Watch mode: how often the open directory is rescanned for changes
+WATCH_INTERVAL_MS = 2000
+
+# File tree: directories opened up front (breadth first) while the listing stays under this many rows
+TREE_AUTO_EXPAND_ROWS = 2000
+TREE_WHEEL_ROWS = 3  # Rows scrolled per mouse wheel step
+
+# Line numbers are redrawn at most this many times per second
+GUTTER_MAX_FPS = 60
+
+# Scrollbar file markers closer than this many pixels are drawn as one
+INDICATOR_BUCKET_PX = 3
+
+# Tokens "Fit to Budget" fills by default, a common model context size
+DEFAULT_TOKEN_BUDGET = 128000
+
+# Search as you type: delay after the last keystroke before searching
+SEARCH_DELAY_MS = 150
+
+class ContentStream:
+    """Bounded hand-off of (name, content) chunks from a loader thread to the Tk main loop"""
+    END = object()
+
+    def __init__(self, maxsize=STREAM_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = False
+        # Binary and oversized files left out, filled by the reader threads
+        self.skipped = SkipReport()
+        # Consumer-side state, only touched on the main loop
+        self.content = AggregateContent()
+        self.profile = None  # LoadProfile when profiling is on
+        # Filled by the loader thread, searched once the stream is shown
+        self.search_index = SearchIndex()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def put(self, item):
+        # Block while the UI catches up, but give up once the stream is superseded
+        while not self.cancelled:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(self, chunks):
+        try:
+            for chunk in chunks:
+                if not self.put(chunk):
+                    break
+        finally:
+            chunks.close()
+            self.put(self.END)
 
 class CustomScrollbarFrame(tk.Frame):
     def __init__(self, parent, text_widget, *args, **kwargs):
@@ -24,103 +105,109 @@ class CustomScrollbarFrame(tk.Frame):
         # Bind events
         self.canvas.bind('<Button-1>', self.on_indicator_click)
         self.canvas.bind('<Motion>', self.on_hover)  # Add hover effect
+        self.canvas.bind('<Configure>', lambda e: self.update_indicators())
         
         self.file_positions = []  # Store (line_number, filename) tuples
-        self.hover_tag = None  # Store current hover tooltip
+        self.hover_bucket = None  # Bucket whose tooltip is shown
+
+        # Marker geometry, computed once per content or size change:
+        # [y, line_number, filenames] per drawn marker, sorted by y
+        self.buckets = []
+        self.bucket_ys = []
+        self.geometry_key = None
         
     def on_scroll(self, first, last):
-        # Update regular scrollbar
+        # Update regular scrollbar; the markers don't depend on the view
         self.scrollbar.set(first, last)
-        self.update_indicators()
-        
-    def update_indicators(self):
-        self.canvas.delete('all')
         
+    def update_indicators(self, force=False):
         # Get dimensions
-        height = self.winfo_height()
-        if not height:  # Guard against division by zero
+        height = self.canvas.winfo_height()
+        total_lines = int(self.text_widget.index('end-1c').split('.')[0])
+        key = (height, total_lines)
+        if key == self.geometry_key and not force:
             return
-            
-        total_lines = float(self.text_widget.index('end-1c').split('.')[0])
-        if total_lines <= 1:
+        self.geometry_key = key
+
+        self.canvas.delete('all')
+        self.hover_bucket = None
+        self.buckets = []
+        if height <= 1 or total_lines <= 1:  # Not laid out yet, or nothing to mark
+            self.bucket_ys = []
             return
-            
-        # Draw indicators
+
+        # Files closer than a bucket share one marker, so the canvas never holds
+        # more items than it has pixels to show them
+        last_bucket = None
         for line_num, filename in self.file_positions:
-            # Calculate relative position
-            rel_pos = line_num / total_lines
-            y_pos = rel_pos * height
-            
-            # Get the line text to check for dot marker
-            line_text = self.text_widget.get(f"{line_num}.0", f"{line_num}.end")
-            if line_text.startswith('⚫ ') and line_text.endswith(':'):
-                # Draw indicator mark
-                self.canvas.create_rectangle(
-                    0, y_pos - 3,
-                    self.indicator_width, y_pos + 3,
-                    fill='#2196F3',  # More visible blue color
-                    outline='#1976D2',  # Darker blue outline
-                    tags=(f'indicator_{line_num}', filename, 'marker')
-                )
-                
-                # Add hover area (slightly larger than visible marker)
-                self.canvas.create_rectangle(
-                    0, y_pos - 5,
-                    self.indicator_width, y_pos + 5,
-                    fill='',
-                    outline='',
-                    tags=(f'hover_{line_num}', filename, 'hover_area')
-                )
+            y_pos = line_num / total_lines * height
+            bucket = int(y_pos // INDICATOR_BUCKET_PX)
+            if bucket == last_bucket:
+                self.buckets[-1][2].append(filename)
+            else:
+                self.buckets.append([y_pos, line_num, [filename]])
+                last_bucket = bucket
+        self.bucket_ys = [y_pos for y_pos, _, _ in self.buckets]
+
+        # Draw indicators, darker where several files were merged
+        for y_pos, _, filenames in self.buckets:
+            self.canvas.create_rectangle(
+                0, y_pos - 3,
+                self.indicator_width, y_pos + 3,
+                fill='#2196F3' if len(filenames) == 1 else '#0D47A1',
+                outline='#1976D2',
+            )
+
+    def _bucket_at(self, y):
+        # Nearest marker within its hover area (slightly larger than the visible marker)
+        index = bisect.bisect_left(self.bucket_ys, y - 5)
+        nearest = None
+        for bucket in self.buckets[index:index + 2]:
+            if abs(bucket[0] - y) <= 5 and (nearest is None or abs(bucket[0] - y) < abs(nearest[0] - y)):
+                nearest = bucket
+        return nearest
             
     def on_hover(self, event):
+        bucket = self._bucket_at(event.y)
+        if bucket is self.hover_bucket:
+            return
+        self.hover_bucket = bucket
+
         # Remove existing tooltip
-        if self.hover_tag:
-            self.canvas.delete(self.hover_tag)
-            self.hover_tag = None
-            
-        # Find hover area under cursor
-        items = self.canvas.find_overlapping(event.x, event.y, event.x + 1, event.y + 1)
-        for item in items:
-            tags = self.canvas.gettags(item)
-            if 'hover_area' in tags:
-                filename = tags[1]  # Get filename from tags
-                
-                # Create tooltip
-                self.hover_tag = self.canvas.create_text(
-                    self.indicator_width + 5, event.y,
-                    text=filename,
-                    anchor='w',
-                    fill='#000000',
-                    tags='tooltip',
-                    font=('Arial', 8)
-                )
-                
-                # Create tooltip background
-                bbox = self.canvas.bbox(self.hover_tag)
-                if bbox:
-                    self.canvas.create_rectangle(
-                        bbox,
-                        fill='#FFFFFF',
-                        outline='#CCCCCC',
-                        tags='tooltip'
-                    )
-                    self.canvas.tag_raise(self.hover_tag)
-                break
+        self.canvas.delete('tooltip')
+        if bucket is None:
+            return
+
+        filenames = bucket[2]
+        label = filenames[0] if len(filenames) == 1 else f"{filenames[0]} (+{len(filenames) - 1} more)"
+        tooltip = self.canvas.create_text(
+            self.indicator_width + 5, event.y,
+            text=label,
+            anchor='w',
+            fill='#000000',
+            tags='tooltip',
+            font=('Arial', 8)
+        )
+
+        # Create tooltip background
+        bbox = self.canvas.bbox(tooltip)
+        if bbox:
+            self.canvas.create_rectangle(
+                bbox,
+                fill='#FFFFFF',
+                outline='#CCCCCC',
+                tags='tooltip'
+            )
+            self.canvas.tag_raise(tooltip)
             
     def on_indicator_click(self, event):
-        items = self.canvas.find_overlapping(event.x, event.y, event.x + 1, event.y + 1)
-        for item in items:
-            tags = self.canvas.gettags(item)
-            if 'marker' in tags or 'hover_area' in tags:
-                # Get line number from the indicator tag
-                indicator_tag = next((tag for tag in tags if tag.startswith('indicator_') or tag.startswith('hover_')), None)
-                if indicator_tag:
-                    line_num = indicator_tag.split('_')[1]
-                    # Scroll to position
-                    self.text_widget.see(f"{line_num}.0")
-                    # Highlight the line briefly
-                    self.highlight_line(line_num)
-                break
+        bucket = self._bucket_at(event.y)
+        if bucket is not None:
+            # Scroll to the first file of the marker
+            line_num = bucket[1]
+            self.text_widget.see(f"{line_num}.0")
+            # Highlight the line briefly
+            self.highlight_line(line_num)
                 
     def highlight_line(self, line_num):
         # Remove any existing highlight
@@ -135,7 +222,100 @@ class CustomScrollbarFrame(tk.Frame):
                 
     def set_file_positions(self, positions):
         self.file_positions = positions
-        self.update_indicators()
+        self.update_indicators(force=True)
+
+class LineNumberGutter(tk.Canvas):
+    """Line numbers beside a Text widget.
+
+    Redraw requests are coalesced into at most one redraw per frame
+    (GUTTER_MAX_FPS), a redraw is skipped when the visible line range hasn't
+    moved, and the canvas text items are kept in a pool that is moved and
+    relabelled instead of deleted and recreated.
+    """
+    def __init__(self, parent, text_widget=None, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.text_widget = text_widget  # May be attached after packing, the gutter sits left of it
+        self.min_interval = 1.0 / GUTTER_MAX_FPS
+        self._pending = None
+        self._last_draw = 0.0
+        self._drawn_key = None
+        self._dirty = True
+        self._items = []  # [item id, line number, y, visible] for each pooled text item
+
+        # Profiling counters
+        self.requests = 0
+        self.redraws = 0
+        self.skipped = 0
+        self._redraw_times = deque()
+
+    def invalidate(self):
+        """Redraw even if the visible range is unchanged, e.g. after the text was replaced or edited"""
+        self._dirty = True
+        self.request_redraw()
+
+    def request_redraw(self, event=None):
+        self.requests += 1
+        if self._pending is not None:
+            return  # Already scheduled for the next frame
+        delay = self._last_draw + self.min_interval - time.perf_counter()
+        self._pending = self.after(max(0, int(delay * 1000)), self._redraw)
+
+    def _redraw(self):
+        self._pending = None
+        self._last_draw = time.perf_counter()
+        text = self.text_widget
+
+        first_line = int(text.index('@0,0').split('.')[0])
+        last_line = int(text.index(f'@0,{text.winfo_height()}').split('.')[0])
+        first_dline = text.dlineinfo(f"{first_line}.0")
+        key = (first_line, last_line, first_dline[1] if first_dline else None, self.winfo_height())
+        if key == self._drawn_key and not self._dirty:
+            self.skipped += 1
+            return
+        self._drawn_key = key
+        self._dirty = False
+
+        visible = []
+        for line_num in range(first_line, last_line + 1):
+            dline = text.dlineinfo(f"{line_num}.0")
+            if dline is not None:  # if line is visible
+                visible.append((line_num, dline[1]))
+
+        for index, (line_num, y) in enumerate(visible):
+            if index == len(self._items):
+                item = self.create_text(35, y, anchor='ne', text=str(line_num), font=("Arial", 10), fill='#555')
+                self._items.append([item, line_num, y, True])
+                continue
+            entry = self._items[index]
+            if entry[2] != y:
+                self.coords(entry[0], 35, y)
+                entry[2] = y
+            if entry[1] != line_num or not entry[3]:
+                self.itemconfigure(entry[0], text=str(line_num), state='normal')
+                entry[1] = line_num
+                entry[3] = True
+        for entry in self._items[len(visible):]:
+            if entry[3]:
+                self.itemconfigure(entry[0], state='hidden')
+                entry[3] = False
+
+        self.redraws += 1
+        self._redraw_times.append(self._last_draw)
+
+    def redraws_per_second(self):
+        """Redraws during the last second"""
+        horizon = time.perf_counter() - 1.0
+        while self._redraw_times and self._redraw_times[0] < horizon:
+            self._redraw_times.popleft()
+        return len(self._redraw_times)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'redraws': self.redraws,
+            'skipped': self.skipped,
+            'redraws_per_second': self.redraws_per_second(),
+        }
 
 class LoadingSpinner(tk.Canvas):
     def __init__(self, parent, size=20, width=2, color='#2196F3'):
@@ -169,12 +349,208 @@ class LoadingSpinner(tk.Canvas):
         self.angle = (self.angle + 10) % 360
         self.after(20, self._spin)
 
+class VirtualTreeView(tk.Frame):
+    """File tree drawn into a Listbox one screenful at a time.
+
+    The tree stays in its TreeNodes: rows are only listed for directories
+    that are expanded, and only the rows in view are handed to the Listbox,
+    so building, filtering and scrolling cost the same for any tree size.
+    """
+    def __init__(self, parent, icon_for, **listbox_options):
+        super().__init__(parent)
+        self.icon_for = icon_for  # icon_for(node, expanded)
+
+        self.listbox = tk.Listbox(self, exportselection=False, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill=tk.Y)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.row_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+
+        self.header = None
+        self.root_node = None
+        self.flat = False        # Selected files: no connectors, no directories
+        self.file_filter = None  # Files for which this returns False are hidden
+        self.expanded = set()    # rel_paths of open directories
+        self.rows = []           # (prefix, node) for every listed row; node is None for the header
+        self.top = 0             # Index of the first row in view
+        self.selected = None     # Index of the selected row
+        self.annotate = None     # annotate(node) -> text shown after a row's name
+
+        self.listbox.bind('<Configure>', lambda e: self._render())
+        self.listbox.bind('<<ListboxSelect>>', self._on_select)
+        self.listbox.bind('<MouseWheel>', self._on_wheel)  # Windows
+        self.listbox.bind('<Button-4>', self._on_wheel)  # Linux
+        self.listbox.bind('<Button-5>', self._on_wheel)  # Linux
+
+    def set_tree(self, header, root_node, flat=False):
+        self.header = header
+        self.root_node = root_node
+        self.flat = flat
+        self.file_filter = None
+        self.expanded = set()
+        self.top = 0
+        self.selected = None
+        if not flat:
+            self._auto_expand()
+        self._rebuild()
+
+    def _auto_expand(self):
+        # Open directories breadth first while the listing stays small
+        rows = len(self.root_node.children)
+        pending = deque(child for child in self.root_node.children if child.is_dir)
+        while pending:
+            directory = pending.popleft()
+            rows += len(directory.children)
+            if rows > TREE_AUTO_EXPAND_ROWS:
+                break
+            self.expanded.add(directory.rel_path)
+            pending.extend(child for child in directory.children if child.is_dir)
+
+    def set_file_filter(self, file_filter):
+        self.file_filter = file_filter
+        self.selected = None
+        self._rebuild()
+
+    def refilter(self):
+        """List the rows again after the file filter's answers changed, e.g. as grep matches come in"""
+        self.selected = None
+        self._rebuild()
+
+    def _iter_rows(self, directory, prefix, all_expanded=False):
+        children = directory.children
+        for index, node in enumerate(children):
+            if not node.is_dir and self.file_filter is not None and not self.file_filter(node):
+                continue  # Connectors still follow the unfiltered tree, as the export does
+            if self.flat:
+                yield "", node
+                continue
+            is_last = index == len(children) - 1
+            yield prefix + ('└── ' if is_last else '├── '), node
+            if node.is_dir and (all_expanded or node.rel_path in self.expanded):
+                yield from self._iter_rows(node, prefix + ('    ' if is_last else '│   '), all_expanded)
+
+    def _child_prefix(self, row_prefix):
+        return row_prefix[:-4] + ('    ' if row_prefix.endswith('└── ') else '│   ')
+
+    def _subtree_end(self, index):
+        inside = self.rows[index][1].rel_path + os.sep
+        end = index + 1
+        while end < len(self.rows) and self.rows[end][1].rel_path.startswith(inside):
+            end += 1
+        return end
+
+    def _rebuild(self):
+        self.rows = []
+        if self.root_node is not None:
+            self.rows.append((self.header, None))
+            self.rows.extend(self._iter_rows(self.root_node, ""))
+        self._render()
+
+    def iter_lines(self):
+        """Every line of the filtered tree, expanded or not, as shown (with icons)"""
+        if self.root_node is None:
+            return
+        yield self.header
+        for prefix, node in self._iter_rows(self.root_node, "", all_expanded=True):
+            yield f"{prefix}{self.icon_for(node)} {node.name}"
+
+    def _row_text(self, row):
+        prefix, node = row
+        if node is None:
+            return prefix
+        expanded = node.is_dir and node.rel_path in self.expanded
+        text = f"{prefix}{self.icon_for(node, expanded)} {node.name}"
+        return text + self.annotate(node) if self.annotate is not None else text
+
+    def _visible_rows(self):
+        height = self.listbox.winfo_height()
+        if height <= 1:  # Not laid out yet
+            return int(self.listbox.cget('height'))
+        return height // self.row_height + 1
+
+    def _render(self):
+        count = self._visible_rows()
+        self.top = max(0, min(self.top, len(self.rows) - count + 1))
+        window = self.rows[self.top:self.top + count]
+
+        # Two Tcl calls per redraw, however long the tree is
+        self.listbox.delete(0, tk.END)
+        if window:
+            self.listbox.insert(0, *[self._row_text(row) for row in window])
+        if self.selected is not None and self.top <= self.selected < self.top + count:
+            self.listbox.selection_set(self.selected - self.top)
+
+        if self.rows:
+            self.scrollbar.set(self.top / len(self.rows), min(1.0, (self.top + count - 1) / len(self.rows)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def redraw(self):
+        """Draw the rows in view again, e.g. after their annotations changed"""
+        self._render()
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = self._visible_rows() - 1 if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self._render()
+
+    def _on_wheel(self, event):
+        self.top += -TREE_WHEEL_ROWS if event.num == 4 or event.delta > 0 else TREE_WHEEL_ROWS
+        self._render()
+        return "break"  # The Listbox only holds the rows in view, don't let it scroll them
+
+    def _on_select(self, event=None):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+
+    def row_at(self, y):
+        """Index in rows of the row drawn at a y coordinate, or None"""
+        index = self.top + self.listbox.nearest(y)
+        return index if index < len(self.rows) else None
+
+    def toggle(self, index):
+        """Expand or collapse the directory at a row, listing its children only when opened"""
+        prefix, node = self.rows[index]
+        if node is None or not node.is_dir:
+            return
+        if node.rel_path in self.expanded:
+            self.expanded.discard(node.rel_path)
+            del self.rows[index + 1:self._subtree_end(index)]
+        else:
+            self.expanded.add(node.rel_path)
+            self.rows[index + 1:index + 1] = list(self._iter_rows(node, self._child_prefix(prefix)))
+        self.selected = index
+        self._render()
+
+    def refresh_directory(self, directory):
+        """Re-list the rows below a directory whose children changed"""
+        if directory is self.root_node:
+            self._rebuild()
+            return
+        index = next((i for i, (_, node) in enumerate(self.rows) if node is directory), None)
+        if index is None or directory.rel_path not in self.expanded:
+            return  # Not in the listing, it is read again when opened
+        prefix = self.rows[index][0]
+        self.rows[index + 1:self._subtree_end(index)] = list(self._iter_rows(directory, self._child_prefix(prefix)))
+        self.selected = None
+        self._render()
+
 class FileAggregatorApp:
-    def __init__(self, root):
+    def __init__(self, root, read_workers=DEFAULT_READ_WORKERS, cache_budget=DEFAULT_CACHE_BUDGET,
+                 persistent_index=True, decode_processes=0):
         # Created by Sheharyar (Shery) - 2024
         # Portfolio: sheharyar.vercel.live
         # GitHub: github.com/Shery1508
         self.root = root
+        self.read_workers = read_workers
+        # Contents read by the last loads, so filtering never goes back to disk
+        self.content_cache = ContentCache(cache_budget)
+        # Keep an on-disk index per directory so reopening only rereads changed files
+        self.persistent_index = persistent_index
         self.root.title("File Content-Tree Copier")
         
         # Easter egg: Hidden signature in window geometry (1200x600 -> Shery's magic numbers)
@@ -203,6 +579,21 @@ class FileAggregatorApp:
         self.select_directory_button = ttk.Button(self.control_frame, text="Select Directory", command=self.select_directory)
         self.select_directory_button.pack(side=tk.LEFT, padx=5)
 
+        self.ignore_rules_button = ttk.Button(self.control_frame, text="Ignore Rules", command=self.show_ignore_dialog)
+        self.ignore_rules_button.pack(side=tk.LEFT, padx=5)
+
+        self.encodings_button = ttk.Button(self.control_frame, text="Encodings", command=self.show_encodings_dialog)
+        self.encodings_button.pack(side=tk.LEFT, padx=5)
+
+        self.fit_budget_button = ttk.Button(self.control_frame, text="Fit to Budget", command=self.show_budget_dialog)
+        self.fit_budget_button.pack(side=tk.LEFT, padx=5)
+
+        self.search_button = ttk.Button(self.control_frame, text="Search", command=self.show_search_dialog)
+        self.search_button.pack(side=tk.LEFT, padx=5)
+
+        self.grep_button = ttk.Button(self.control_frame, text="Grep", command=self.show_grep_dialog)
+        self.grep_button.pack(side=tk.LEFT, padx=5)
+
         # Create checkboxes for Show Tree and Show Contents
         self.show_tree_var = tk.BooleanVar(value=True)
         self.show_contents_var = tk.BooleanVar(value=True)
@@ -213,10 +604,31 @@ class FileAggregatorApp:
         self.show_contents_checkbox = tk.Checkbutton(self.control_frame, text="Show Contents", variable=self.show_contents_var, command=self.toggle_contents)
         self.show_contents_checkbox.pack(side=tk.LEFT, padx=5)
 
+        # Keep the open directory in sync with the disk
+        self.watch_var = tk.BooleanVar(value=False)
+        self.watch_checkbox = tk.Checkbutton(self.control_frame, text="Watch", variable=self.watch_var, command=self.toggle_watch)
+        self.watch_checkbox.pack(side=tk.LEFT, padx=5)
+
+        # Show files identical to an earlier one as a reference to it
+        self.dedupe_var = tk.BooleanVar(value=False)
+        self.dedupe_checkbox = tk.Checkbutton(self.control_frame, text="Dedupe", variable=self.dedupe_var, command=self.toggle_dedupe)
+        self.dedupe_checkbox.pack(side=tk.LEFT, padx=5)
+        # Hashes by path, size and mtime, kept across loads
+        self.content_hashes = ContentHashes()
+
+        # Time the stages of the next loads; off by default, costs nothing then
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_checkbox = tk.Checkbutton(self.control_frame, text="Profile", variable=self.profile_var)
+        self.profile_checkbox.pack(side=tk.LEFT, padx=5)
+        self.last_profile = None
+
         # Add an Info button to show information about the app in the top-right corner
         self.info_button = ttk.Button(self.control_frame, text="Info", command=self.show_info)
         self.info_button.pack(side=tk.RIGHT, padx=5)
 
+        self.stats_button = ttk.Button(self.control_frame, text="Stats", command=self.show_stats_dialog)
+        self.stats_button.pack(side=tk.RIGHT, padx=5)
+
         # Create a frame for the listbox and text area below the control frame
         self.main_frame = tk.Frame(root)
         self.main_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -247,23 +659,58 @@ class FileAggregatorApp:
         # Bind selection event
         self.extension_filter.bind('<<ComboboxSelected>>', self.apply_extension_filter)
 
-        # Create a listbox to display file structure
-        self.listbox = tk.Listbox(self.listbox_frame, height=20, width=40, font=("Courier New", 10))
-        self.listbox.pack(side=tk.LEFT, fill=tk.Y)
-
-        # Store original tree items for filtering
-        self.original_tree_items = []
-        
-        # Bind double-click event to the listbox
-        self.listbox.bind('<Double-Button-1>', self.on_listbox_double_click)
+        # Count of files left out of the contents; click for the list
+        self.skipped = SkipReport()
+        self.skipped_label = tk.Label(self.filter_frame, text="", font=("Arial", 9), fg='#888', cursor='hand2')
+        self.skipped_label.pack(side=tk.RIGHT)
+        self.skipped_label.bind('<Button-1>', self.show_skipped_files)
+
+        # Estimated tokens of the contents, per file (rel_path), per directory and in total
+        self.token_counter = TokenCounter()
+        self.file_tokens = {}
+        self.dir_tokens = {}
+        self.token_budget = DEFAULT_TOKEN_BUDGET
+        self.budget_selection = None  # rel_paths picked by "Fit to Budget", None when off
+        # With decode_processes > 1 (e.g. DEFAULT_DECODE_PROCESSES), large loads are decoded, hashed and
+        # tokenized in that many worker processes; off by default, the reader threads do it all
+        self.decode_pool = DecodePool(decode_processes, self.token_counter)
+        self.tokens_label = tk.Label(self.filter_frame, text="", font=("Arial", 9), fg='#888')
+        self.tokens_label.pack(side=tk.RIGHT, padx=(0, 5))
+
+        # Create the tree view to display file structure; it has its own scrollbar
+        self.tree_view = VirtualTreeView(self.listbox_frame, self._get_file_icon,
+                                         height=20, width=40, font=("Courier New", 10))
+        self.tree_view.pack(side=tk.LEFT, fill=tk.Y)
+        self.tree_view.annotate = self._tree_token_annotation
+
+        # Bind double-click event to the tree view
+        self.tree_view.listbox.bind('<Double-Button-1>', self.on_tree_double_click)
         
         # Add dictionary to store filename to line number mapping
         self.filename_to_line = {}
-
-        # Scrollbar for the listbox
-        self.listbox_scroll = tk.Scrollbar(self.listbox_frame, orient="vertical", command=self.listbox.yview)
-        self.listbox_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.listbox.configure(yscrollcommand=self.listbox_scroll.set)
+        # (line_number, name) of each filename_to_line entry, sorted, so an edit only shifts the ones below it
+        self.filename_lines = []
+
+        # Aggregate currently shown in the text area, and the directory load
+        # still streaming into it, if any
+        self.content = AggregateContent()
+        self.content_stream = None
+        self.filter_pending = False  # The filter changed while contents were streaming in
+
+        # Words of the loaded files, narrowing down which ones a search has to scan
+        self.search_index = SearchIndex()
+        self.search_dialog = None
+
+        # Grep mode: only files whose content matches are shown (None when off),
+        # and the rel_paths of those found so far
+        self.content_filter = None
+        self.grep_matches = set()
+
+        # Scanned tree of the open directory (None for selected files), and
+        # the pending watch poll
+        self.tree = None
+        self.watch_after_id = None
+        self.watch_busy = False
 
         # Create the copy button for the tree structure with adjusted position
         self.copy_tree_button = ttk.Button(self.listbox_frame, text="Copy Tree", command=self.copy_tree_to_clipboard)
@@ -275,33 +722,26 @@ class FileAggregatorApp:
         self.text_area_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Create line number canvas with increased width
-        self.line_number_canvas = tk.Canvas(self.text_area_frame, width=45, bg='#f0f0f0')  # Increased from 30 to 45
+        self.line_number_canvas = LineNumberGutter(self.text_area_frame, width=45, bg='#f0f0f0')  # Increased from 30 to 45
         self.line_number_canvas.pack(side=tk.LEFT, fill=tk.Y)
 
         # Create text widget with adjusted width
         self.text_area = tk.Text(self.text_area_frame, wrap=tk.WORD, width=80, height=20, 
                                 font=("Arial", 10), undo=True, padx=5)  # Added padx=5
         self.text_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_number_canvas.text_widget = self.text_area
 
         # Create custom scrollbar frame
         self.custom_scrollbar = CustomScrollbarFrame(self.text_area_frame, self.text_area)
         self.custom_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Bind events for updating line numbers
+        # Every view change (wheel, scrollbar drag, see(), inserts) reports through
+        # yscrollcommand, so the gutter follows it there instead of per input event
+        self.text_area.configure(yscrollcommand=self.on_text_view_change)
+
+        # Edits and resizes can rewrap lines without moving the view
         self.text_area.bind('<KeyRelease>', self.update_line_numbers)
-        self.text_area.bind('<Button-1>', self.update_line_numbers)
-        self.text_area.bind('<Button-4>', self.on_mousewheel)  # Linux
-        self.text_area.bind('<Button-5>', self.on_mousewheel)  # Linux
-        self.text_area.bind('<MouseWheel>', self.on_mousewheel)  # Windows
-        
-        # Bind to custom scrollbar's scroll events
-        self.custom_scrollbar.scrollbar.bind('<B1-Motion>', lambda e: self.root.after(1, self.update_line_numbers))
-        self.custom_scrollbar.scrollbar.bind('<ButtonRelease-1>', lambda e: self.update_line_numbers())
-        
-        # Bind to text widget's scroll event
         self.text_area.bind('<Configure>', self.update_line_numbers)
-        self.text_area.bind('<<Scroll>>', self.update_line_numbers)
-        self.text_area.bind('<Enter>', self.update_line_numbers)
 
         # Adjust copy button position
         self.copy_contents_button = ttk.Button(self.text_area_frame, text="Copy", command=self.copy_to_clipboard)
@@ -314,9 +754,6 @@ class FileAggregatorApp:
         # Disable the new button by default
         self.update_copy_both_button_state()
 
-        # Add at the start of __init__ with other instance variables
-        self.tree_paths = {}
-
         # Add file type icons mapping
         self.file_icons = {
             # Folders
@@ -391,6 +828,16 @@ class FileAggregatorApp:
         self.templates_file = os.path.join(os.path.dirname(__file__), "templates.json")
         self.load_custom_templates()
 
+        # What directory scans leave out; the same rules shape the tree, contents and export
+        self.ignore_settings = {'excludes': [], 'includes': [], 'use_gitignore': True, 'use_defaults': True}
+        self.ignore_file = os.path.join(os.path.dirname(__file__), "ignore_rules.json")
+        self.load_ignore_settings()
+
+        # Tried in order for files that aren't UTF-8 and have no BOM
+        self.fallback_encodings = DEFAULT_FALLBACK_ENCODINGS
+        self.encodings_file = os.path.join(os.path.dirname(__file__), "encodings.json")
+        self.load_encoding_settings()
+
         # Add template controls to the control frame
         self.template_frame = ttk.Frame(self.control_frame)
         self.template_frame.pack(side=tk.RIGHT, padx=5)
@@ -423,6 +870,14 @@ class FileAggregatorApp:
         self.content_spinner.pack(side=tk.BOTTOM, pady=10)
         self.content_spinner.pack_forget()  # Hide initially
 
+        # Loads and watch rescans run as jobs; a new load cancels the one in progress,
+        # and only the main loop applies their results to the widgets
+        self.jobs = JobScheduler()
+        self._run_posted_jobs()
+        self.root.bind('<Escape>', self.cancel_load)
+        self.root.bind('<Control-f>', self.show_search_dialog)
+        self.text_area.bind('<Control-f>', self.show_search_dialog)  # Instead of moving the cursor
+
     def select_files(self):
         file_paths = filedialog.askopenfilenames(title="Select Files")
         if file_paths:
@@ -432,185 +887,349 @@ class FileAggregatorApp:
             self.tree_spinner.start()
             self.content_spinner.start()
             
-            def process_files():
+            dedupe = self.dedupe_var.get()
+            content_filter = self.content_filter
+            profile = LoadProfile(f"{len(file_paths)} selected file(s)") if self.profile_var.get() else None
+
+            def list_files(job):
+                started = time.perf_counter()
+                nodes = scan_files(file_paths)
+                if profile is not None:
+                    profile.add('scan', time.perf_counter() - started)
+
+                # Selected files are listed flat under a placeholder directory
+                holder = TreeNode("", "", "", True)
+                holder.children = nodes
+                self.jobs.post(job, lambda: self.show_selected_files(holder))
+                self.jobs.submit(lambda content_job: read_files(content_job, nodes), PRIORITY_CONTENT, parent=job)
+
+            def read_files(job, nodes):
                 try:
-                    all_text = self.get_files_text(file_paths)
-                    self.display_text(all_text)
-                    self.build_listbox(file_paths, show_files=True)
+                    skipped = SkipReport()
+                    search_index = SearchIndex()
+                    content = self.get_files_content(nodes, skipped, dedupe, profile, job, search_index,
+                                                     content_filter)
+                    self.jobs.post(job, lambda: self.show_content(content, profile, search_index))
+                    self.jobs.post(job, lambda: self.set_skipped(skipped))
+                    self.jobs.post(job, lambda: self.finish_profile(profile, skipped))
+                except JobCancelled:
+                    raise
                 except Exception as e:
-                    messagebox.showerror("Error", f"Failed to process files: {str(e)}")
+                    message = f"Failed to process files: {str(e)}"
+                    self.jobs.post(job, lambda: messagebox.showerror("Error", message))
                 finally:
-                    # Hide both spinners
-                    self.root.after(0, lambda: self.tree_spinner.pack_forget())
-                    self.root.after(0, lambda: self.content_spinner.pack_forget())
-                    self.root.after(0, lambda: self.tree_spinner.stop())
-                    self.root.after(0, lambda: self.content_spinner.stop())
-
-            # Run the processing in a separate thread
-            import threading
-            thread = threading.Thread(target=process_files)
-            thread.daemon = True
-            thread.start()
+                    self.jobs.post(job, self.stop_spinners)
+
+            self.start_load(list_files)
 
     def select_directory(self):
         dir_path = filedialog.askdirectory(title="Select Directory")
         if dir_path:
-            # Show tree spinner
-            self.tree_spinner.pack(side=tk.BOTTOM, pady=10)
-            self.tree_spinner.start()
-            
-            def process_directory():
-                try:
-                    # First build the tree (faster operation)
-                    self.build_listbox([dir_path], show_files=False)
-                    
-                    # Hide tree spinner and show content spinner
-                    self.root.after(0, lambda: self.tree_spinner.pack_forget())
-                    self.root.after(0, lambda: self.content_spinner.pack(side=tk.BOTTOM, pady=10))
-                    self.root.after(0, lambda: self.content_spinner.start())
-                    
-                    # Then load the contents
-                    all_text = self.get_files_text_in_directory(dir_path)
-                    self.display_text(all_text)
-                    
-                finally:
-                    # Hide both spinners
-                    self.root.after(0, lambda: self.tree_spinner.pack_forget())
-                    self.root.after(0, lambda: self.content_spinner.pack_forget())
-                    self.root.after(0, lambda: self.tree_spinner.stop())
-                    self.root.after(0, lambda: self.content_spinner.stop())
-
-            # Run the processing in a separate thread
-            import threading
-            thread = threading.Thread(target=process_directory)
-            thread.daemon = True
-            thread.start()
-
-    def get_files_text(self, file_paths):
-        all_text = ""
-        positions = []
-        current_line = 1
-        ignored_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.mp4', '.avi', '.mov', '.wmv', '.zip', '.tar', '.gz']
+            self.load_directory(dir_path)
+
+    def load_directory(self, dir_path):
+        # Show tree spinner
+        self.tree_spinner.pack(side=tk.BOTTOM, pady=10)
+        self.tree_spinner.start()
         
-        for file_path in file_paths:
-            if os.path.exists(file_path) and os.path.isfile(file_path):
-                if not any(file_path.endswith(ext) for ext in ignored_extensions):
-                    filename = os.path.basename(file_path)
-                    if all_text:  # If not the first file
-                        all_text += "\n"
-                        current_line += 1
-                    
-                    # Record the position and add file marker
-                    positions.append((current_line, filename))
-                    all_text += f"⚫ {filename}:\n"  # Add dot marker before filename
-                    current_line += 1
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            content = file.read()
-                            all_text += content
-                            current_line += content.count('\n')
-                            if not content.endswith('\n'):
-                                all_text += '\n'
-                                current_line += 1
-                    except (UnicodeDecodeError, IOError):
-                        all_text += f"[Could not read file: {filename}]\n"
-                        current_line += 1
-
-        # Update the text area and file positions
-        self.text_area.delete('1.0', tk.END)
-        self.text_area.insert(tk.END, all_text)
-        self.filename_to_line = {pos[1]: pos[0] for pos in positions}
-        self.filename_to_line.update({os.path.basename(pos[1]): pos[0] for pos in positions})
-        self.custom_scrollbar.set_file_positions(positions)
-        return all_text
-
-    def get_files_text_in_directory(self, dir_path):
-        all_text = ""
-        positions = []
-        current_line = 1
-        ignored_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.mp4', '.avi', '.mov', '.wmv', '.zip', '.tar', '.gz']
-
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Skip ignored file types
-                if any(file_path.lower().endswith(ext) for ext in ignored_extensions):
-                    continue
-                
-                try:
-                    relative_path = os.path.relpath(file_path, dir_path)
-                    if all_text:  # If not the first file
-                        all_text += "\n"
-                        current_line += 1
-                    
-                    # Record the position and add file marker
-                    positions.append((current_line, relative_path))
-                    all_text += f"⚫ {relative_path}:\n"  # Add dot marker before filename
-                    current_line += 1
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            all_text += content
-                            current_line += content.count('\n')
-                            if not content.endswith('\n'):
-                                all_text += '\n'
-                                current_line += 1
-                    except UnicodeDecodeError:
-                        all_text += f"[Could not read file: Binary or non-text file]\n"
-                        current_line += 1
-                    except IOError as e:
-                        all_text += f"[Could not read file: {str(e)}]\n"
-                        current_line += 1
-                    except Exception as e:
-                        all_text += f"[Error reading file: {str(e)}]\n"
-                        current_line += 1
-                        
-                except Exception as e:
-                    print(f"Error processing {file_path}: {str(e)}")
-                    continue  # Skip this file but continue with others
+        dedupe = self.dedupe_var.get()
+        content_filter = self.content_filter
+        profile = LoadProfile(dir_path) if self.profile_var.get() else None
+
+        def scan(job):
+            # One scan feeds the tree, the contents and the filter
+            started = time.perf_counter()
+            tree = scan_directory(dir_path, self.ignore_rules, cancelled=lambda: job.cancelled)
+            job.check()  # A partial tree is of no use
+            if profile is not None:
+                profile.add('scan', time.perf_counter() - started)
+
+            # First build the tree (faster operation), then read the contents behind any newer scan
+            self.jobs.post(job, lambda: self.show_directory_tree(tree))
+            self.jobs.submit(lambda content_job: self.stream_directory_contents(content_job, tree, dedupe, profile,
+                                                                                content_filter),
+                             PRIORITY_CONTENT, parent=job)
+
+        self.start_load(scan)
+
+    def start_load(self, func):
+        """Run func(job) as the app's load, superseding the load or watch rescan still running"""
+        self.jobs.cancel_group('watch')
+        return self.jobs.submit(func, PRIORITY_TREE, group='load')
+
+    def cancel_load(self, event=None):
+        """Stop the running load; what has been shown so far stays"""
+        self.jobs.cancel_group('load')
+        self.stop_spinners()
+
+    def stop_spinners(self):
+        for spinner in (self.tree_spinner, self.content_spinner):
+            spinner.pack_forget()
+            spinner.stop()
+
+    def _run_posted_jobs(self):
+        self.jobs.run_posted(STREAM_BATCH_SECONDS)
+        self.root.after(JOB_POLL_MS, self._run_posted_jobs)
+
+    def show_selected_files(self, holder):
+        self.tree = None
+        self.build_tree_view(holder, "The File(s):", flat=True)
+
+    def show_directory_tree(self, tree):
+        self.tree = tree
+        self.build_tree_view(tree, "The Contents")
+
+        # Hide tree spinner and show content spinner
+        self.tree_spinner.pack_forget()
+        self.tree_spinner.stop()
+        self.content_spinner.pack(side=tk.BOTTOM, pady=10)
+        self.content_spinner.start()
+
+    def stream_directory_contents(self, job, tree, dedupe=False, profile=None, content_filter=None):
+        """Read a scanned directory on a job and stream it (or, in grep mode, the matching files) into the
+        text area as it is read"""
+        stream = ContentStream()
+        stream.profile = profile
+        job.on_cancel(stream.cancel)
+        self.jobs.post(job, lambda: self.begin_content_stream(stream))
+        index = DirectoryIndex.open_for(tree.path) if self.persistent_index else None
+        try:
+            stream.produce(self._count_segment_tokens(
+                self.iter_files_text_in_directory(tree, index, stream.skipped, dedupe, profile, content_filter),
+                stream.search_index))
+        finally:
+            if index is not None:
+                # Only a complete load knows which files are gone
+                index.save(prune=not stream.cancelled)
+                index.close()
+
+    def get_files_content(self, nodes, skipped=None, dedupe=False, profile=None, job=None, search_index=None,
+                          content_filter=None):
+        selected = [node for node in nodes if not is_ignored_file(node.path)]
+
+        content = AggregateContent()
+        files = self.decode_pool.read_files(selected, self.read_workers, self.content_cache, skipped=skipped,
+                                            profile=profile, hashes=self.content_hashes if dedupe else None,
+                                            encodings=self.fallback_encodings)
+        if content_filter is not None:
+            files = iter_matching(files, content_filter, skipped)
+        if dedupe:
+            files = iter_deduplicated(files, self.content_hashes, skipped=skipped)
+        for node, text in files:
+            if job is not None:
+                job.check()  # Stop reading once the load is superseded
+            started = time.perf_counter() if profile is not None else 0
+            self.token_counter.count(text)  # Tokenize off the main loop, show_content finds the counts
+            if search_index is not None:
+                search_index.add(node.rel_path, text)
+            content.append(node.rel_path, text)
+            if profile is not None:
+                profile.add('assemble', time.perf_counter() - started, 1)
+        return content
+
+    def iter_files_text_in_directory(self, tree, index=None, skipped=None, dedupe=False, profile=None,
+                                     content_filter=None):
+        """Yield (relative_path, content) for each file in a scanned tree (that content_filter matches), in os.walk order"""
+        return iter_bundle_segments(tree, workers=self.read_workers, cache=self.content_cache, index=index,
+                                    skipped=skipped, dedupe=dedupe, hashes=self.content_hashes, profile=profile,
+                                    pool=self.decode_pool, encodings=self.fallback_encodings,
+                                    content_filter=content_filter)
+
+    def _count_segment_tokens(self, segments, search_index):
+        # Runs on the loader thread, so the main loop only looks the counts up; texts are indexed on the way
+        try:
+            for relative_path, text in segments:
+                self.token_counter.count(text)
+                search_index.add(relative_path, text)
+                yield relative_path, text
+        finally:
+            segments.close()
+
+    def begin_content_stream(self, stream):
+        # Supersede any load that is still streaming into the text area
+        if self.content_stream is not None:
+            self.content_stream.cancel()
+        self.content_stream = stream
+        self.search_index = stream.search_index
+        if self.content_filter is not None:
+            # The tree lists the matches as they come in
+            self.grep_matches = set()
+            self.tree_view.refilter()
 
-        # Update the text area and file positions
         self.text_area.delete('1.0', tk.END)
-        self.text_area.insert(tk.END, all_text)
-        self.filename_to_line = {pos[1]: pos[0] for pos in positions}
-        self.filename_to_line.update({os.path.basename(pos[1]): pos[0] for pos in positions})
-        self.custom_scrollbar.set_file_positions(positions)
-        return all_text
+        self._mark_text_unmodified()
+        # Don't keep an undo record of the (possibly huge) loaded text
+        self.text_area.configure(undo=False)
+        self.filename_to_line = {}
+        self.filename_lines = []
+        self.file_tokens = {}
+        self.custom_scrollbar.set_file_positions([])
+        self._drain_content_stream(stream)
+
+    def _drain_content_stream(self, stream):
+        if stream is not self.content_stream:
+            return  # A newer load took over
+        if stream.cancelled:
+            # Stopped or superseded: keep what is shown, take nothing more from the queue
+            self._end_content_stream(stream)
+            return
 
-    def display_text(self, text):
+        parts = []
+        finished = False
+        known_files = len(stream.content.positions)
+        started = time.perf_counter()
+        deadline = started + STREAM_BATCH_SECONDS
+        while time.perf_counter() < deadline:
+            try:
+                item = stream.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is ContentStream.END:
+                finished = True
+                break
+
+            relative_path, text = item
+            parts.extend(stream.content.append(relative_path, text))
+            self._map_filename(relative_path, stream.content.positions[-1][0])
+            self.file_tokens[relative_path] = self.token_counter.count_segment(relative_path, text)
+            if self.content_filter is not None:
+                self.grep_matches.add(relative_path)
+
+        if self.content_filter is not None and parts:
+            self.tree_view.refilter()
+
+        profile = stream.profile
+        if profile is not None and parts:
+            assembled = time.perf_counter()
+            profile.add('assemble', assembled - started, len(stream.content.positions) - known_files)
+
+        # One insert per batch instead of one per file
+        if parts:
+            text = "".join(parts)
+            self.text_area.insert(tk.END, text)
+            self._mark_text_unmodified()
+            # Text appended below the view leaves the visible range, and the gutter, as they were
+            self.line_number_canvas.request_redraw()
+            if profile is not None:
+                profile.add('insert', time.perf_counter() - assembled, len(text))
+
+        if finished:
+            self._end_content_stream(stream)
+            self.finish_profile(profile, stream.skipped)
+        else:
+            self.root.after(STREAM_DRAIN_INTERVAL_MS, lambda: self._drain_content_stream(stream))
+
+    def _end_content_stream(self, stream):
+        self.content_stream = None
+        self.content = stream.content
+        self.text_area.configure(undo=True)
+        self.text_area.edit_reset()
+        started = time.perf_counter()
+        self.custom_scrollbar.set_file_positions(stream.content.positions)
+        if stream.profile is not None:
+            stream.profile.add('indicators', time.perf_counter() - started, len(stream.content.positions))
+        self.update_line_numbers()
+        self.set_skipped(stream.skipped)
+        self.update_token_totals()
+        self.content_spinner.pack_forget()
+        self.content_spinner.stop()
+        if self.filter_pending:
+            self.apply_extension_filter()
+
+    def show_content(self, content, profile=None, search_index=None):
+        """Replace the text area with an aggregate, inserted in a few large chunks.
+
+        search_index replaces the search index when the files are new rather than filtered.
+        """
+        self.content = content
+        if search_index is not None:
+            self.search_index = search_index
+        if self.content_filter is not None:
+            self.grep_matches = {name for name, _ in content.segments}
+            self.tree_view.refilter()
         self.text_area.delete('1.0', tk.END)
-        
-        positions = []
-        current_line = 1
-        lines = text.split('\n')
-        
-        # Clear the filename to line mapping
-        self.filename_to_line = {}
-        
-        for i, line in enumerate(lines):
-            # Look for the dot marker to identify file headers
-            if line.startswith('⚫ ') and line.endswith(':'):
-                filename = line[2:].rstrip(':')  # Remove dot and colon
-                positions.append((current_line, filename))
-                self.filename_to_line[filename] = current_line
-                self.filename_to_line[os.path.basename(filename)] = current_line
-                
-            self.text_area.insert(tk.END, line + '\n')
-            current_line += 1
-            
-        self.custom_scrollbar.set_file_positions(positions)
+        self.text_area.configure(undo=False)
+        started = time.perf_counter()
+        for chunk in content.iter_chunks():
+            self.text_area.insert(tk.END, chunk)
+            if profile is not None:
+                profile.add('insert', time.perf_counter() - started, len(chunk))
+                started = time.perf_counter()
+        self.text_area.configure(undo=True)
+        self.text_area.edit_reset()
+        self._mark_text_unmodified()
+
+        # Positions were recorded while the aggregate was built
+        self.filename_to_line = content.filename_to_line()
+        self.filename_lines = sorted((line_num, name) for name, line_num in self.filename_to_line.items())
+        started = time.perf_counter()
+        self.custom_scrollbar.set_file_positions(content.positions)
+        if profile is not None:
+            profile.add('indicators', time.perf_counter() - started, len(content.positions))
         self.update_line_numbers()
+        self.count_content_tokens(content)
+
+    def count_content_tokens(self, content):
+        # Unchanged texts are memoized by the counter, so only new content is tokenized
+        self.file_tokens = {name: self.token_counter.count_segment(name, text) for name, text in content.segments}
+        self.update_token_totals()
+
+    def update_token_totals(self):
+        """Sum the file counts per directory and in total, and show them"""
+        self.dir_tokens = {}
+        if self.tree_view.root_node is not None:
+            # Directories are listed before their descendants, so sum them in reverse
+            directories = []
+            stack = [self.tree_view.root_node]
+            while stack:
+                directory = stack.pop()
+                directories.append(directory)
+                stack.extend(child for child in directory.children if child.is_dir)
+            for directory in reversed(directories):
+                self.dir_tokens[directory.rel_path] = sum(
+                    self.dir_tokens.get(child.rel_path, 0) if child.is_dir else self.file_tokens.get(child.rel_path, 0)
+                    for child in directory.children
+                )
+
+        total = sum(self.file_tokens.values())
+        if not self.file_tokens:
+            self.tokens_label.config(text="", fg='#888')
+        elif self.budget_selection is not None:
+            over = total > self.token_budget
+            self.tokens_label.config(text=f"≈{format_tokens(total)} / {format_tokens(self.token_budget)} tokens",
+                                     fg='#c62828' if over else '#2e7d32')
+        else:
+            self.tokens_label.config(text=f"≈{format_tokens(total)} tokens", fg='#888')
+        self.tree_view.redraw()
+
+    def _tree_token_annotation(self, node):
+        count = self.dir_tokens.get(node.rel_path) if node.is_dir else self.file_tokens.get(node.rel_path)
+        return f"  ({format_tokens(count)})" if count else ""
 
     def copy_to_clipboard(self):
-        content = self.text_area.get("1.0", "end-1c")
-        content = self.apply_template(content)
+        before, after = self.get_template_wrapping()
+        # The clipboard takes one string: join the parts once, with the template around them
+        content = "".join([before, *self.iter_content_parts(), after])
         self.root.clipboard_clear()
         self.root.clipboard_append(content)
         self.copy_contents_button.config(text="Copied!")
         self.root.after(2000, lambda: self.copy_contents_button.config(text="Copy"))
 
+    def iter_content_parts(self):
+        """The text area's contents as parts of the content model, without a copy out of Tk.
+
+        Only when the text was edited by hand does it have to be read back
+        from the widget.
+        """
+        if self.text_area.edit_modified():
+            return iter([self.text_area.get("1.0", "end-1c")])
+        content = self.content_stream.content if self.content_stream is not None else self.content
+        return content.iter_parts()
+
+    def _mark_text_unmodified(self):
+        # Called after the app itself changed the text area, so hand edits can be told apart
+        self.text_area.edit_modified(False)
+
     def _clean_tree_text(self, text):
         """Remove emoji icons and clean up the text for copying"""
         # Remove emoji and extra space after it
@@ -625,7 +1244,7 @@ class FileAggregatorApp:
 
     def copy_tree_to_clipboard(self):
         self.root.clipboard_clear()
-        tree_text = self.listbox.get(0, tk.END)
+        tree_text = self.tree_view.iter_lines()
         # Clean each line before joining
         cleaned_lines = [self._clean_tree_text(line) for line in tree_text]
         tree_contents = "\n".join(cleaned_lines)
@@ -637,17 +1256,18 @@ class FileAggregatorApp:
         # Check if both show tree and show contents are enabled
         if self.show_tree_var.get() and self.show_contents_var.get():
             # Get tree structure and clean it
-            tree_text = self.listbox.get(0, tk.END)
+            tree_text = self.tree_view.iter_lines()
             cleaned_tree = "\n".join(self._clean_tree_text(line) for line in tree_text)
             
-            # Get file contents
-            file_contents = self.text_area.get("1.0", "end-1c")
-            
-            # Prepare the combined content
-            combined_text = f"{cleaned_tree}\n\nAnd here is the file's code in detail:\n\n{file_contents}"
-            
-            # Apply template to the combined content
-            final_content = self.apply_template(combined_text)
+            # Combine tree, file contents and template in a single join
+            before, after = self.get_template_wrapping()
+            final_content = "".join([
+                before,
+                cleaned_tree,
+                "\n\nAnd here is the file's code in detail:\n\n",
+                *self.iter_content_parts(),
+                after,
+            ])
             
             # Copy to clipboard
             self.root.clipboard_clear()
@@ -657,154 +1277,482 @@ class FileAggregatorApp:
         else:
             messagebox.showwarning("Warning", "Please enable both Show Tree and Show Contents to use this feature.")
 
-    def build_listbox(self, paths, show_files=False):
-        self.listbox.delete(0, tk.END)
-        self.tree_paths.clear()
-        self.original_tree_items = []
-        extensions = set()
-        
-        if show_files:
-            self.original_tree_items.append(("The File(s):", None))
-            self.listbox.insert(tk.END, "The File(s):")
-            
-        for path in paths:
-            if os.path.isfile(path):
-                    filename = os.path.basename(path)
-                    icon = self._get_file_icon(path)
-                    display_text = f"{icon} {filename}"
-                    self.original_tree_items.append((display_text, path))
-                    self.listbox.insert(tk.END, display_text)
-                    self.tree_paths[display_text] = path
-                    
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext:
-                        extensions.add(ext)
-        else:
-            self.original_tree_items.append(("The Contents", None))
-            self.listbox.insert(tk.END, "The Contents")
-            
-            for path in paths:
-                if os.path.isdir(path):
-                    self._build_tree(path, "", path, extensions)
-
-        filter_values = ['All Files'] + sorted(list(extensions))
+    def build_tree_view(self, root_node, header, flat=False):
+        self.budget_selection = None
+        self.tree_view.set_tree(header, root_node, flat)
+        if self.content_filter is not None:
+            # Files show up as the load finds that they match
+            self.grep_matches = set()
+            self.tree_view.set_file_filter(self._grep_file_filter(None))
+
+        extensions = {os.path.splitext(node.name)[1].lower() for node in iter_tree_files(root_node)}
+        extensions.discard('')
+        filter_values = ['All Files'] + sorted(extensions)
         self.extension_filter['values'] = filter_values
+        self.filter_pending = False
         self.extension_var.set('All Files')
 
-    def _build_tree(self, path, prefix, root_path, extensions=None):
-        items = sorted(os.listdir(path))
-        for index, item in enumerate(items):
-            full_path = os.path.join(path, item)
-            is_last = index == len(items) - 1
-            display_prefix = '└── ' if is_last else '├── '
-            
-            icon = self._get_file_icon(full_path)
-            display_text = f"{prefix}{display_prefix}{icon} {item}"
-            self.original_tree_items.append((display_text, full_path))
-            self.listbox.insert(tk.END, display_text)
-            
-            if os.path.isfile(full_path):
-                rel_path = os.path.relpath(full_path, root_path)
-                self.tree_paths[display_text] = rel_path
-                
-                if extensions is not None:
-                    ext = os.path.splitext(item)[1].lower()
-                    if ext:
-                        extensions.add(ext)
-            
-            if os.path.isdir(full_path):
-                next_prefix = prefix + ('    ' if is_last else '│   ')
-                self._build_tree(full_path, next_prefix, root_path, extensions)
-
     def apply_extension_filter(self, event=None):
+        if event is not None:
+            self.budget_selection = None  # Picking a filter leaves the budget selection
         selected_filter = self.extension_var.get()
-        
-        # Clear the listbox
-        self.listbox.delete(0, tk.END)
-        
-        # Reset tree_paths for the filtered items
-        self.tree_paths = {}
-        
-        if selected_filter == 'All Files':
-            # Show all items
-            for display_text, file_path in self.original_tree_items:
-                self.listbox.insert(tk.END, display_text)
-                if file_path:  # If it's a file (not a header)
-                    self.tree_paths[display_text] = file_path
+        # Only the tree rows in view are redrawn
+        if self.budget_selection is not None:
+            selection = self.budget_selection
+            file_filter = lambda node: node.rel_path in selection
+        elif selected_filter == 'All Files':
+            file_filter = None
         else:
-            # Show only items with selected extension
-            for display_text, file_path in self.original_tree_items:
-                if not file_path:  # Headers
-                    self.listbox.insert(tk.END, display_text)
-                elif os.path.isdir(file_path):  # Directories
-                    self.listbox.insert(tk.END, display_text)
-                elif file_path.lower().endswith(selected_filter):  # Matching files
-                    self.listbox.insert(tk.END, display_text)
-                    self.tree_paths[display_text] = file_path
-
-        # Update the text area with filtered content
-        filtered_text = ""
-        current_line = 1
-        positions = []
-        
-        # Build filtered content based on visible items
-        for i in range(self.listbox.size()):
-            item = self.listbox.get(i)
-            if item in self.tree_paths and os.path.isfile(self.tree_paths[item]):
-                file_path = self.tree_paths[item]
-                try:
-                    if filtered_text:
-                        filtered_text += "\n"
-                        current_line += 1
-                    
-                    # Add file header with dot marker
-                    positions.append((current_line, file_path))
-                    filtered_text += f"⚫ {os.path.basename(file_path)}:\n"
-                    current_line += 1
-                    
-                    # Add file content
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        filtered_text += content
-                        current_line += content.count('\n')
-                        if not content.endswith('\n'):
-                            filtered_text += '\n'
-                            current_line += 1
-                except Exception as e:
-                    print(f"Error reading file {file_path}: {str(e)}")
-                    filtered_text += f"[Could not read file: {file_path}]\n"
-                    current_line += 1
+            file_filter = lambda node: node.name.lower().endswith(selected_filter)
+        self.tree_view.set_file_filter(self._grep_file_filter(file_filter))
 
-        # Update text area and indicators
-        self.text_area.delete('1.0', tk.END)
-        self.text_area.insert(tk.END, filtered_text)
-        
-        # Update filename to line mapping
-        self.filename_to_line = {pos[1]: pos[0] for pos in positions}
-        self.filename_to_line.update({os.path.basename(pos[1]): pos[0] for pos in positions})
-        
-        # Update scrollbar indicators
-        self.custom_scrollbar.set_file_positions(positions)
-        self.update_line_numbers()
+        if self.content_stream is not None:
+            # Rebuilding now would leave the stream appending to the filtered text; the contents
+            # are filtered once it has ended
+            self.filter_pending = True
+            return
+        self.filter_pending = False
 
-    def get_tree_structure(self, dir_path, prefix="", include_parent=True):
-        structure = ""
-        parent_dir = os.path.basename(dir_path) if include_parent else ""
-        items = sorted(os.listdir(dir_path))
-        
-        if include_parent:
-            structure += f"{prefix}{parent_dir}/\n"
-
-        for index, item in enumerate(items):
-            path = os.path.join(dir_path, item)
-            is_last = index == len(items) - 1
-            if os.path.isdir(path):
-                structure += f"{prefix}{'└── ' if is_last else '├── '}{item}/\n"
-                next_prefix = prefix + ("    " if is_last else "│   ")
-                structure += self.get_tree_structure(path, next_prefix, include_parent=False)
+        visible_files = [node for node in self._iter_file_nodes() if self._shows_in_content(node, selected_filter)]
+        if self.content_filter is not None:
+            self.stream_grep_matches(visible_files)
+            return
+        skipped = SkipReport()
+        texts = self._load_texts(visible_files, skipped)
+
+        # Build filtered content from the visible files, in the order they were loaded
+        content = AggregateContent()
+        files = [(node, texts[node.path][0]) for node in visible_files]
+        if self.dedupe_var.get():
+            files = iter_deduplicated(files, self.content_hashes, skipped=skipped)
+        for node, text in files:
+            loaded_text, line_count = texts[node.path]
+            content.append(node.rel_path, text, line_count if text is loaded_text else None)
+
+        # Update text area, file positions and indicators
+        self.show_content(content)
+        self.set_skipped(skipped)
+
+    def _grep_file_filter(self, file_filter):
+        """file_filter narrowed to the files grep mode has matched so far"""
+        if self.content_filter is None:
+            return file_filter
+        if file_filter is None:
+            return lambda node: node.rel_path in self.grep_matches
+        return lambda node: node.rel_path in self.grep_matches and file_filter(node)
+
+    def stream_grep_matches(self, nodes):
+        """Match file nodes of the current load on a job and stream the matching ones into the text area"""
+        content_filter = self.content_filter
+        search_index = self.search_index
+        dedupe = self.dedupe_var.get()
+        self.content_spinner.pack(side=tk.BOTTOM, pady=10)
+        self.content_spinner.start()
+
+        def grep(job):
+            stream = ContentStream()
+            stream.search_index = search_index  # Same files, the index still applies
+            job.on_cancel(stream.cancel)
+            self.jobs.post(job, lambda: self.begin_content_stream(stream))
+            # Texts come from the cache filled by the load, and files the index rules out aren't looked at
+            files = read_files_parallel(content_filter.prefilter(nodes, search_index), self.read_workers,
+                                        self.content_cache, skipped=stream.skipped, encodings=self.fallback_encodings)
+            files = iter_matching(files, content_filter, stream.skipped)
+            if dedupe:
+                files = iter_deduplicated(files, self.content_hashes, skipped=stream.skipped)
+            stream.produce(self._count_segment_tokens(((node.rel_path, text) for node, text in files), search_index))
+
+        self.start_load(grep)
+
+    def set_content_filter(self, content_filter):
+        """Turn grep mode on (a ContentFilter) or off (None) and filter the current load again"""
+        self.content_filter = content_filter
+        self.grep_matches = set()
+        self.grep_button.config(text="Grep (on)" if content_filter is not None else "Grep")
+        if self.tree_view.root_node is None:
+            return
+        if content_filter is None and self.content_stream is not None:
+            # Stop the matches still streaming in, the whole load replaces them as the stream ends
+            self.cancel_load()
+            self.filter_pending = True
+            self._end_content_stream(self.content_stream)
+        else:
+            self.apply_extension_filter()
+
+    def show_grep_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Grep")
+        dialog.geometry("420x360")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        options_frame = ttk.LabelFrame(dialog, text="Only show files whose content matches", padding=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        current = self.content_filter
+        ttk.Label(options_frame, text="Patterns, one per line:", font=("Arial", 10)).pack(anchor=tk.W)
+        patterns_text = tk.Text(options_frame, height=6, width=40)
+        patterns_text.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
+        if current is not None:
+            patterns_text.insert('1.0', "\n".join(current.sources))
+
+        match_all = tk.BooleanVar(value=current is not None and current.match_all)
+        regex = tk.BooleanVar(value=current is not None and current.regex)
+        match_case = tk.BooleanVar(value=current is not None and current.match_case)
+        ttk.Radiobutton(options_frame, text="Any of the patterns (OR)", variable=match_all,
+                        value=False).pack(anchor=tk.W)
+        ttk.Radiobutton(options_frame, text="All of the patterns (AND)", variable=match_all,
+                        value=True).pack(anchor=tk.W)
+        ttk.Checkbutton(options_frame, text="Regular expressions", variable=regex).pack(anchor=tk.W)
+        ttk.Checkbutton(options_frame, text="Match case", variable=match_case).pack(anchor=tk.W)
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def apply():
+            patterns = [line for line in patterns_text.get('1.0', 'end-1c').splitlines() if line.strip()]
+            if not patterns:
+                messagebox.showerror("Error", "Enter at least one pattern.", parent=dialog)
+                return
+            try:
+                content_filter = ContentFilter(patterns, match_all.get(), regex.get(), match_case.get())
+            except re.error as e:
+                messagebox.showerror("Error", f"Invalid pattern: {e}", parent=dialog)
+                return
+            dialog.destroy()
+            self.set_content_filter(content_filter)
+
+        def clear():
+            dialog.destroy()
+            self.set_content_filter(None)
+
+        ttk.Button(button_frame, text="Apply", command=apply).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
+        if current is not None:
+            ttk.Button(button_frame, text="Show All Files", command=clear).pack(side=tk.LEFT)
+
+    def _load_texts(self, nodes, skipped):
+        """Return {path: (text, line_count or None)} for file nodes.
+
+        Contents come from the cache filled by the load; only evicted files are read again.
+        """
+        texts = {}
+        missing = []
+        for node in nodes:
+            entry = self.content_cache.get(node.path)
+            if entry is None or not decodes_the_same(entry.encoding, entry.skip_reason, self.fallback_encodings):
+                missing.append(node)
             else:
-                structure += f"{prefix}{'└── ' if is_last else '├── '}{item}\n"
-        return structure
+                texts[node.path] = (entry.text, entry.line_count)
+                if entry.skip_reason is not None:
+                    skipped.add(node.rel_path, entry.skip_reason, entry.size)
+                else:
+                    skipped.add_encoding(node.rel_path, entry.encoding)
+        for node, text in read_files_parallel(missing, self.read_workers, self.content_cache, skipped=skipped,
+                                              encodings=self.fallback_encodings):
+            texts[node.path] = (text, None)
+            self.search_index.add(node.rel_path, text)
+        return texts
+
+    def finish_profile(self, profile, skipped):
+        """Close a load's profile and keep it for the Stats panel"""
+        if profile is None:
+            return
+        profile.count('skipped', len(skipped))
+        profile.extra['gutter'] = self.line_number_canvas.stats()
+        profile.finish()
+        self.last_profile = profile
+
+    def show_stats_dialog(self):
+        profile = self.last_profile
+        if profile is None:
+            messagebox.showinfo("Stats", "Check Profile, then load files or a directory to time the load.")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Load Stats")
+        dialog.geometry("640x420")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        stats_frame = ttk.LabelFrame(dialog, text="Last profiled load", padding=10)
+        stats_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        stats_text = scrolledtext.ScrolledText(stats_frame, wrap=tk.NONE, font=("Courier New", 9), height=15)
+        stats_text.pack(fill=tk.BOTH, expand=True)
+        stats_text.insert('1.0', "\n".join(profile.report_lines()))
+        stats_text.configure(state=tk.DISABLED)
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def save_json():
+            file_path = filedialog.asksaveasfilename(
+                parent=dialog, defaultextension=".json", filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+            if not file_path:
+                return
+            try:
+                profile.dump(file_path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save the stats: {str(e)}")
+
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Save JSON...", command=save_json).pack(side=tk.RIGHT, padx=5)
+
+    def set_skipped(self, skipped):
+        self.skipped = skipped
+        parts = []
+        if len(skipped):
+            parts.append(f"{len(skipped)} skipped")
+        if skipped.encodings:
+            parts.append(f"{len(skipped.encodings)} non-UTF-8")
+        self.skipped_label.config(text=", ".join(parts))
+
+    def show_skipped_files(self, event=None):
+        if not len(self.skipped) and not self.skipped.encodings:
+            return
+        sections = []
+        if len(self.skipped):
+            files = sorted(self.skipped, key=lambda skipped_file: skipped_file.path)
+            lines = [
+                f"{skipped_file.path}: {skipped_file.reason}"
+                + (f" ({format_size(skipped_file.size)})" if skipped_file.size is not None else "")
+                for skipped_file in files[:40]
+            ]
+            if len(files) > 40:
+                lines.append(f"... and {len(files) - 40} more")
+            sections.append(
+                f"{len(files)} binary or oversized file(s), {format_size(self.skipped.total_size())} in total, "
+                f"were left out of the contents:\n\n" + "\n".join(lines)
+            )
+        if self.skipped.encodings:
+            decoded = sorted(self.skipped.encodings.items())
+            lines = [f"{path}: {encoding}" for path, encoding in decoded[:40]]
+            if len(decoded) > 40:
+                lines.append(f"... and {len(decoded) - 40} more")
+            sections.append(f"{len(decoded)} file(s) weren't UTF-8 and were decoded as:\n\n" + "\n".join(lines))
+        messagebox.showinfo("Skipped Files", "\n\n".join(sections))
+
+    def _iter_file_nodes(self):
+        """Files of the current load, in the order their contents are aggregated"""
+        if self.tree_view.root_node is None:
+            return iter(())
+        return iter_tree_files(self.tree_view.root_node)
+
+    def _shows_in_content(self, node, selected_filter):
+        if is_ignored_file(node.name):
+            return False
+        if self.budget_selection is not None:
+            return node.rel_path in self.budget_selection
+        return selected_filter == 'All Files' or node.name.lower().endswith(selected_filter)
+
+    def show_budget_dialog(self):
+        if self.tree_view.root_node is None or self.content_stream is not None:
+            messagebox.showinfo("Fit to Budget", "Load files or a directory first.")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Fit to Budget")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        options_frame = ttk.LabelFrame(dialog, text="Keep the contents within a token budget", padding=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        ttk.Label(options_frame, text="Budget (tokens):").pack(anchor=tk.W)
+        budget_var = tk.StringVar(value=str(self.token_budget))
+        ttk.Entry(options_frame, textvariable=budget_var, width=20).pack(anchor=tk.W, pady=(0, 5))
+        ttk.Label(options_frame, text="Files matching the filter come first, then the most recently\n"
+                                      "modified, then the smallest.", font=("Arial", 9)).pack(anchor=tk.W)
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def fit():
+            try:
+                budget = int(budget_var.get().replace(',', '').replace('_', ''))
+            except ValueError:
+                messagebox.showerror("Error", "The budget must be a whole number of tokens.")
+                return
+            dialog.destroy()
+            self.fit_to_budget(budget)
+
+        def show_all():
+            dialog.destroy()
+            self.budget_selection = None
+            self.apply_extension_filter()
+
+        ttk.Button(button_frame, text="Fit", command=fit).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Show All", command=show_all).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
+
+    def fit_to_budget(self, budget):
+        """Show only the files that fit in budget tokens, picked by priority"""
+        self.token_budget = budget
+        candidates = [node for node in self._iter_file_nodes() if not is_ignored_file(node.name)]
+        if self.content_filter is not None:
+            candidates = [node for node in candidates if node.rel_path in self.grep_matches]
+
+        # Counts are memoized, only files never shown before are tokenized here
+        texts = self._load_texts(candidates, SkipReport())
+        counts = {node.rel_path: self.token_counter.count_segment(node.rel_path, texts[node.path][0])
+                  for node in candidates}
+
+        selected_filter = self.extension_var.get()
+        preferred = None
+        if selected_filter != 'All Files':
+            preferred = lambda node: node.name.lower().endswith(selected_filter)
+        chosen, _ = fit_to_budget(candidates, counts, budget, preferred)
+        self.budget_selection = {node.rel_path for node in chosen}
+        self.apply_extension_filter()
+
+    def toggle_dedupe(self):
+        # Rebuild the contents of the current load from the cache; a load still streaming picks it up next time
+        if self.tree_view.root_node is not None and self.content_stream is None:
+            self.apply_extension_filter()
+
+    def toggle_watch(self):
+        if self.watch_after_id is not None:
+            self.root.after_cancel(self.watch_after_id)
+            self.watch_after_id = None
+        if self.watch_var.get():
+            self.watch_after_id = self.root.after(WATCH_INTERVAL_MS, self._poll_watched_directory)
+
+    def _poll_watched_directory(self):
+        self.watch_after_id = None
+        if not self.watch_var.get():
+            return
+
+        tree = self.tree
+        # Nothing to watch for selected files, and a running load or poll finishes first
+        if tree is None or self.content_stream is not None or self.watch_busy:
+            self.toggle_watch()
+            return
+
+        search_index = self.search_index
+
+        def rescan(job):
+            changes, texts = None, {}
+            try:
+                # Scan in the background; the app's model is only touched on the main loop
+                new_tree = scan_directory(tree.path, self.ignore_rules, cancelled=lambda: job.cancelled)
+                job.check()
+                changes = diff_trees(tree, new_tree)
+                changed = changes.added + [new_node for _, new_node in changes.modified]
+                changed = [node for node in changed if not is_ignored_file(node.name)]
+                for node, text in read_files_parallel(changed, self.read_workers, self.content_cache,
+                                                      encodings=self.fallback_encodings):
+                    job.check()
+                    texts[node.rel_path] = text
+                    search_index.add(node.rel_path, text)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                changes = None
+                print(f"Error watching {tree.path}: {str(e)}")
+            self.jobs.post(job, lambda: self._apply_watch_changes(tree, changes, texts))
+
+        self.watch_busy = True
+        job = self.jobs.submit(rescan, PRIORITY_BACKGROUND, group='watch')
+        # A load cancels the rescan, the poll still has to be re-armed
+        job.on_cancel(lambda: self.jobs.post(None, lambda: self._apply_watch_changes(tree, None, {})))
+
+    def _apply_watch_changes(self, tree, changes, texts):
+        """Patch the tree and the contents with what changed since the last scan"""
+        self.watch_busy = False
+        # Drop results for a directory that has been replaced or is reloading
+        if changes and tree is self.tree and self.content_stream is None:
+            selected_filter = self.extension_var.get()
+            for old_node, new_node in changes.modified:
+                old_node.size, old_node.mtime = new_node.size, new_node.mtime
+
+            for directory, new_directory in changes.changed_dirs:
+                directory.children = new_directory.children
+                # Only rows of an open directory are listed, the rest are read when opened
+                self.tree_view.refresh_directory(directory)
+
+            # New extensions become available in the filter
+            extensions = set(self.extension_filter['values'][1:])
+            extensions.update(os.path.splitext(node.name)[1].lower() for node in changes.added)
+            extensions.discard('')
+            self.extension_filter['values'] = ['All Files'] + sorted(extensions)
+
+            if self.dedupe_var.get() or self.content_filter is not None:
+                # Which copy is kept, or which files match, can change anywhere: rebuild from the cache
+                self.apply_extension_filter()
+            else:
+                self._patch_content(changes, texts, selected_filter)
+        self.toggle_watch()
+
+    def _patch_content(self, changes, texts, selected_filter):
+        """Remove, replace and insert only the changed files' segments in the text area"""
+        content = self.content
+        self.text_area.configure(undo=False)
+
+        names = {name: index for index, (name, _) in enumerate(content.segments)}
+        removed = [names[node.rel_path] for node in changes.removed if node.rel_path in names]
+        for index in sorted(removed, reverse=True):
+            self._apply_content_edit(content.remove(index))
+        if removed:
+            names = {name: index for index, (name, _) in enumerate(content.segments)}
+
+        for _, node in changes.modified:
+            index = names.get(node.rel_path)
+            if index is not None and node.rel_path in texts:
+                self._apply_content_edit(content.replace(index, texts[node.rel_path]))
+
+        # New files go where a full load would have put them
+        added = [node for node in changes.added
+                 if node.rel_path in texts and self._shows_in_content(node, selected_filter)]
+        if added:
+            rank = {node.rel_path: i for i, node in enumerate(self._iter_file_nodes())}
+            ranks = [rank.get(name, -1) for name, _ in content.segments]
+            for node in sorted(added, key=lambda node: rank[node.rel_path]):
+                index = bisect.bisect(ranks, rank[node.rel_path])
+                ranks.insert(index, rank[node.rel_path])
+                self._apply_content_edit(content.insert(index, node.rel_path, texts[node.rel_path]))
+                self._map_filename(node.rel_path, content.positions[index][0])
+
+        self.text_area.configure(undo=True)
+        self.text_area.edit_reset()
+        self._mark_text_unmodified()
+        self.custom_scrollbar.set_file_positions(content.positions)
+        self.update_line_numbers()
+        self.count_content_tokens(content)
+
+    def _apply_content_edit(self, edit):
+        first_line, end_line, text = edit
+        self.text_area.delete(f"{first_line}.0", f"{end_line}.0")
+        if text:
+            self.text_area.insert(f"{first_line}.0", text)
+
+        # Shift the headers below the edit instead of rebuilding the mapping
+        delta = text.count('\n') - (end_line - first_line)
+        lines = self.filename_lines
+        start = bisect.bisect_left(lines, (first_line,))
+        below = bisect.bisect_left(lines, (end_line,))
+        for _, name in lines[start:below]:
+            del self.filename_to_line[name]  # Header of a removed file
+        if delta:
+            for i in range(below, len(lines)):
+                line_num, name = lines[i]
+                lines[i] = (line_num + delta, name)
+                self.filename_to_line[name] = line_num + delta
+        del lines[start:below]
+
+    def _map_filename(self, rel_path, line_num):
+        """Point rel_path at its header line, and its basename too unless that already names a file"""
+        self._set_filename_line(rel_path, line_num)
+        # A basename never hides the full path of another file
+        basename = os.path.basename(rel_path)
+        if basename not in self.filename_to_line:
+            self._set_filename_line(basename, line_num)
+
+    def _set_filename_line(self, name, line_num):
+        old_line = self.filename_to_line.get(name)
+        if old_line is not None:
+            del self.filename_lines[bisect.bisect_left(self.filename_lines, (old_line, name))]
+        self.filename_to_line[name] = line_num
+        bisect.insort(self.filename_lines, (line_num, name))
 
     def toggle_tree(self):
         self.update_copy_both_button_state()
@@ -845,49 +1793,153 @@ class FileAggregatorApp:
         )
         messagebox.showinfo("Info", info_message)
 
-    def on_listbox_double_click(self, event):
-        selection = self.listbox.curselection()
-        if not selection:
+    def on_tree_double_click(self, event):
+        index = self.tree_view.row_at(event.y)
+        if index is None:
             return
-            
-        selected_text = self.listbox.get(selection[0])
-        
-        # Skip if it's a directory or header
-        if selected_text in ["The File(s):", "The Contents"] or selected_text.endswith('/'):
+        node = self.tree_view.rows[index][1]
+
+        # Skip the header; directories open and close
+        if node is None:
             return
-            
-        # Clean up the selected text if it has tree markers and icons
-        clean_text = selected_text
-        for prefix in ['├── ', '└── ', '│   ', '    ']:
-            clean_text = clean_text.replace(prefix, '')
-        # Remove the icon
-        if ' ' in clean_text:
-            clean_text = clean_text.split(' ', 1)[1]
-        
-        # Get the file path from tree_paths using both original and cleaned text
-        file_path = self.tree_paths.get(selected_text) or self.tree_paths.get(clean_text)
-        
-        if file_path:
-            # Try with full path first
-            if file_path in self.filename_to_line:
-                line_num = self.filename_to_line[file_path]
-                self.text_area.see(f"{line_num}.0")
-                self.highlight_line(line_num)
-                return
-                
-            # Try with basename
-            basename = os.path.basename(file_path)
-            if basename in self.filename_to_line:
-                line_num = self.filename_to_line[basename]
+        if node.is_dir:
+            self.tree_view.toggle(index)
+            return "break"
+
+        # Try with the full path first, then the basename
+        for name in (node.rel_path, node.name):
+            if name in self.filename_to_line:
+                line_num = self.filename_to_line[name]
                 self.text_area.see(f"{line_num}.0")
                 self.highlight_line(line_num)
                 return
-            
-            # Try with the clean text itself
-            if clean_text in self.filename_to_line:
-                line_num = self.filename_to_line[clean_text]
-                self.text_area.see(f"{line_num}.0")
-                self.highlight_line(line_num)
+
+    def show_search_dialog(self, event=None):
+        if self.search_dialog is not None and self.search_dialog.winfo_exists():
+            self.search_dialog.lift()
+            self.search_dialog.focus_set()
+            return "break"
+
+        # Not modal: matches are shown in the text area while the dialog stays open
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Search")
+        dialog.geometry("640x400")
+        dialog.transient(self.root)
+        self.search_dialog = dialog
+
+        query_frame = ttk.Frame(dialog)
+        query_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        query_var = tk.StringVar()
+        query_entry = ttk.Entry(query_frame, textvariable=query_var, font=("Courier New", 10))
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        regex_var = tk.BooleanVar(value=False)
+        case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(query_frame, text="Regex", variable=regex_var).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Checkbutton(query_frame, text="Match case", variable=case_var).pack(side=tk.LEFT)
+
+        results_frame = ttk.LabelFrame(dialog, text="Matching lines", padding=10)
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        results_list = tk.Listbox(results_frame, font=("Courier New", 9), activestyle='none')
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_list.yview)
+        results_list.configure(yscrollcommand=results_scrollbar.set)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        status_label = tk.Label(dialog, text="", font=("Arial", 9), fg='#888')
+        status_label.pack(anchor=tk.W, padx=10)
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        hits = []
+        pending = [None]  # Debounced search
+
+        def show_results(found, summary):
+            hits[:] = found
+            results_list.delete(0, tk.END)
+            results_list.insert(tk.END, *(f"{hit.name}:{hit.line}: {hit.text.strip()[:200]}" for hit in found))
+            status_label.config(text=summary)
+
+        def search(*args):
+            if pending[0] is not None:
+                dialog.after_cancel(pending[0])
+                pending[0] = None
+            self.run_search(query_var.get(), regex_var.get(), case_var.get(), show_results)
+
+        def search_later(*args):
+            if pending[0] is not None:
+                dialog.after_cancel(pending[0])
+            pending[0] = dialog.after(SEARCH_DELAY_MS, search)
+
+        def jump(event=None):
+            selection = results_list.curselection()
+            if selection:
+                self.jump_to_search_hit(hits[selection[0]])
+
+        def close():
+            self.jobs.cancel_group('search')
+            self.search_dialog = None
+            dialog.destroy()
+
+        query_var.trace_add('write', search_later)
+        regex_var.trace_add('write', search_later)
+        case_var.trace_add('write', search_later)
+        query_entry.bind('<Return>', search)
+        results_list.bind('<<ListboxSelect>>', jump)
+        dialog.bind('<Escape>', lambda e: close())
+        dialog.protocol("WM_DELETE_WINDOW", close)
+        ttk.Button(button_frame, text="Close", command=close).pack(side=tk.RIGHT, padx=5)
+
+        # Start from the selected text, if any
+        try:
+            selected = self.text_area.get(tk.SEL_FIRST, tk.SEL_LAST)
+        except tk.TclError:
+            selected = ""
+        if selected and '\n' not in selected:
+            query_var.set(selected)
+        query_entry.focus_set()
+        return "break"
+
+    def run_search(self, query, regex, match_case, on_done):
+        """Search the contents shown on a job; on_done(hits, summary) is called on the main loop"""
+        self.jobs.cancel_group('search')
+        if not query:
+            on_done([], "")
+            return
+        try:
+            pattern = compile_query(query, regex, match_case)
+        except re.error as e:
+            on_done([], f"Invalid regex: {e}")
+            return
+
+        # A snapshot, the search runs while a load may still be appending
+        content = self.content_stream.content if self.content_stream is not None else self.content
+        segments = list(content.segments)
+        search_index = self.search_index
+        note = " (contents edited by hand, lines may be off)" if self.text_area.edit_modified() else ""
+
+        def search(job):
+            started = time.perf_counter()
+            candidates = search_index.candidates(required_literals(pattern))
+            hits, total = search_segments(pattern, segments, candidates, cancelled=lambda: job.cancelled)
+            job.check()
+            searched = len(segments) if candidates is None else sum(1 for name, _ in segments if name in candidates)
+            summary = (f"{total:,} matching line(s), {searched:,} of {len(segments):,} files searched in "
+                       f"{(time.perf_counter() - started) * 1000:.0f} ms")
+            if total > len(hits):
+                summary += f", first {len(hits):,} shown"
+            self.jobs.post(job, lambda: on_done(hits, summary + note))
+
+        self.jobs.submit(search, PRIORITY_TREE, group='search')
+
+    def jump_to_search_hit(self, hit):
+        header_line = self.filename_to_line.get(hit.name)
+        if header_line is None:
+            return  # No longer in the contents
+        line_num = header_line + hit.line
+        self.text_area.see(f"{line_num}.{hit.column}")
+        self.text_area.mark_set(tk.INSERT, f"{line_num}.{hit.column}")
+        self.highlight_line(line_num)
 
     def highlight_line(self, line_num):
         # Remove any existing highlight
@@ -900,52 +1952,33 @@ class FileAggregatorApp:
         # Remove highlight after a delay
         self.root.after(1000, lambda: self.text_area.tag_remove('highlight', '1.0', 'end'))
 
-    def on_mousewheel(self, event):
-        self.update_line_numbers()
-        
+    def on_text_view_change(self, first, last):
+        self.custom_scrollbar.on_scroll(first, last)
+        self.line_number_canvas.request_redraw()
+
     def update_line_numbers(self, event=None):
-        self.line_number_canvas.delete('all')
-        
-        # Get the first visible line
-        first_visible = self.text_area.index('@0,0')
-        last_visible = self.text_area.index(f'@0,{self.text_area.winfo_height()}')
-        
-        first_line = int(float(first_visible))
-        last_line = int(float(last_visible))
-        
-        # Draw line numbers for visible lines
-        for line_num in range(first_line, last_line + 1):
-            dline = self.text_area.dlineinfo(f"{line_num}.0")
-            if dline is not None:  # if line is visible
-                y = dline[1]
-                # Adjusted x position and added padding
-                self.line_number_canvas.create_text(
-                    35, y,  # Adjusted from 25 to 35
-                    anchor='ne',
-                    text=str(line_num),
-                    font=("Arial", 10),
-                    fill='#555'
-                )
+        # Coalesced: at most one redraw per frame, whatever the number of calls
+        self.line_number_canvas.invalidate()
 
-    def _get_file_icon(self, path):
+    def _get_file_icon(self, node, expanded=False):
         # Shery's curated icon set 🎨
-        if os.path.isdir(path):
-            return self.file_icons['folder']
-        ext = os.path.splitext(path)[1].lower()
+        if node.is_dir:
+            return self.file_icons['folder_open' if expanded else 'folder']
+        ext = os.path.splitext(node.name)[1].lower()
         return self.file_icons.get(ext, self.file_icons['default'])
 
     def show_export_dialog(self):
         # Create export dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Export Options")
-        dialog.geometry("400x200")
+        dialog.geometry("400x260")
         dialog.transient(self.root)
         dialog.grab_set()
         
         # Center the dialog
         dialog.geometry("+%d+%d" % (
             self.root.winfo_rootx() + self.root.winfo_width()//2 - 200,
-            self.root.winfo_rooty() + self.root.winfo_height()//2 - 100
+            self.root.winfo_rooty() + self.root.winfo_height()//2 - 130
         ))
 
         # Add export options
@@ -970,6 +2003,17 @@ class FileAggregatorApp:
         filename_entry = ttk.Entry(filename_frame, textvariable=filename_var)
         filename_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
 
+        # Split into numbered parts that each fit a context window or the clipboard
+        split_frame = ttk.Frame(options_frame)
+        split_frame.pack(fill=tk.X)
+        split_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(split_frame, text="Split into parts of at most", variable=split_var).pack(side=tk.LEFT)
+        split_size_var = tk.StringVar(value=str(self.token_budget))
+        ttk.Entry(split_frame, textvariable=split_size_var, width=10).pack(side=tk.LEFT, padx=5)
+        split_unit_var = tk.StringVar(value="tokens")
+        ttk.Combobox(split_frame, textvariable=split_unit_var, values=["tokens", "KB", "MB"],
+                     width=7, state="readonly").pack(side=tk.LEFT)
+
         # Buttons frame
         button_frame = ttk.Frame(dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -979,34 +2023,63 @@ class FileAggregatorApp:
                 messagebox.showwarning("Warning", "Please select at least one option to export.")
                 return
 
+            max_bytes = max_tokens = None
+            if split_var.get():
+                try:
+                    size = float(split_size_var.get().replace(',', ''))
+                except ValueError:
+                    size = 0
+                if size <= 0:
+                    messagebox.showwarning("Warning", "Please enter a part size greater than zero.")
+                    return
+                if split_unit_var.get() == "tokens":
+                    max_tokens = int(size)
+                else:
+                    max_bytes = int(size * (1024 if split_unit_var.get() == "KB" else 1024 * 1024))
+
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".txt",
                 initialfile=filename_var.get(),
-                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+                filetypes=[
+                    ("Text files", "*.txt"),
+                    ("Compressed text", "*.gz *.xz"),
+                    ("JSON Lines (one record per file)", "*.jsonl"),
+                    ("Archives of the files", "*.zip *.tar *.tar.gz *.tgz *.tar.xz"),
+                    ("All files", "*.*"),
+                ]
             )
             
             if file_path:
+                fmt = export_format(file_path)
+                if fmt != 'text' and (max_bytes or max_tokens):
+                    messagebox.showwarning("Warning", "Only plain .txt exports can be split into parts.")
+                    return
                 try:
-                    content = ""
-                    if export_tree.get():
-                        # Get and clean tree content
-                        tree_text = self.listbox.get(0, tk.END)
-                        cleaned_tree = "\n".join(self._clean_tree_text(line) for line in tree_text)
-                        content += "=== File Structure ===\n\n"
-                        content += cleaned_tree
-                        
-                        if export_content.get():
-                            content += "\n\n"
-                    
-                    if export_content.get():
-                        content += "=== File Contents ===\n\n"
-                        content += self.text_area.get("1.0", "end-1c")
+                    # Archives and JSON Lines hold the files themselves, without tree or template
+                    if fmt in ARCHIVE_FORMATS or fmt == 'jsonl':
+                        self.export_files(file_path, fmt)
+                        messagebox.showinfo("Success", "File exported successfully!")
+                        dialog.destroy()
+                        return
 
                     # Apply template to the full content
-                    final_content = self.apply_template(content)
-                    
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(final_content)
+                    before, after = self.get_template_wrapping()
+
+                    if max_bytes or max_tokens:
+                        # Every part gets the template's header and footer
+                        paths = self.export_parts(export_tree.get(), export_content.get(),
+                                                  PartWriter(file_path, max_bytes, max_tokens, before, after))
+                        messagebox.showinfo("Success", f"Exported {len(paths)} part(s):\n"
+                                                       f"{os.path.basename(paths[0])} ... {os.path.basename(paths[-1])}"
+                                                       if len(paths) > 1 else "File exported successfully!")
+                        dialog.destroy()
+                        return
+
+                    # Stream the parts to the file (compressed for .gz and .xz), the export is never built as one string
+                    with open_text_output(file_path, fmt) as f:
+                        f.write(before)
+                        f.writelines(self.iter_export_parts(export_tree.get(), export_content.get()))
+                        f.write(after)
                     
                     messagebox.showinfo("Success", "File exported successfully!")
                     dialog.destroy()
@@ -1020,6 +2093,59 @@ class FileAggregatorApp:
         ttk.Button(button_frame, text="Export", command=export).pack(side=tk.RIGHT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=cancel).pack(side=tk.RIGHT)
 
+    def iter_export_parts(self, include_tree, include_contents):
+        if include_tree:
+            yield from self._iter_export_tree(include_contents)
+        
+        if include_contents:
+            yield CONTENTS_HEADER
+            yield from self.iter_content_parts()
+
+    def _iter_export_tree(self, include_contents):
+        # Get and clean tree content, line by line
+        yield "=== File Structure ===\n\n"
+        for index, line in enumerate(self.tree_view.iter_lines()):
+            yield ("\n" if index else "") + self._clean_tree_text(line)
+        
+        if include_contents:
+            yield "\n\n"
+
+    def export_files(self, file_path, fmt):
+        """Write the files in the contents to a JSON Lines file or an archive, one record or member each"""
+        stream = self.content_stream
+        content, skipped = (stream.content, stream.skipped) if stream is not None else (self.content, self.skipped)
+        nodes = {node.rel_path: node for node in self._iter_file_nodes()}
+        if fmt == 'jsonl':
+            with open_text_output(file_path, fmt) as f:
+                write_jsonl(f, (
+                    (name, nodes[name].size if name in nodes else None, text, skipped.reason_for(name),
+                     skipped.encoding_for(name))
+                    for name, text in content.segments
+                ))
+        else:
+            # Skipped files only have a placeholder, they are left out
+            write_archive(file_path, (
+                (name, nodes[name].mtime if name in nodes else None, text)
+                for name, text in content.segments if skipped.reason_for(name) is None
+            ), fmt)
+
+    def export_parts(self, include_tree, include_contents, writer):
+        """Write the export through a PartWriter, cutting only between files (or lines of a large one)"""
+        with writer:
+            if include_tree:
+                writer.write_lines(self._iter_export_tree(include_contents))
+
+            if include_contents:
+                writer.write_lines([CONTENTS_HEADER])
+                if self.text_area.edit_modified():
+                    # Edited by hand: the file boundaries are no longer known, cut between lines
+                    writer.write_lines(self.text_area.get("1.0", "end-1c").splitlines(keepends=True))
+                else:
+                    content = self.content_stream.content if self.content_stream is not None else self.content
+                    for name, text in content.segments:
+                        writer.write_file(name, text)
+            return writer.close()
+
     def load_custom_templates(self):
         try:
             if os.path.exists(self.templates_file):
@@ -1036,6 +2162,137 @@ class FileAggregatorApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save templates: {e}")
 
+    def load_ignore_settings(self):
+        try:
+            if os.path.exists(self.ignore_file):
+                with open(self.ignore_file, 'r') as f:
+                    self.ignore_settings.update(json.load(f))
+            self.ignore_rules = IgnoreRules(**self.ignore_settings)
+        except Exception as e:
+            print(f"Error loading ignore rules: {e}")
+            self.ignore_rules = IgnoreRules()
+
+    def save_ignore_settings(self):
+        try:
+            with open(self.ignore_file, 'w') as f:
+                json.dump(self.ignore_settings, f, indent=4)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save ignore rules: {e}")
+
+    def load_encoding_settings(self):
+        try:
+            if os.path.exists(self.encodings_file):
+                with open(self.encodings_file, 'r') as f:
+                    self.fallback_encodings = normalize_encodings(json.load(f).get('fallbacks', []))
+        except Exception as e:
+            print(f"Error loading encodings: {e}")
+            self.fallback_encodings = DEFAULT_FALLBACK_ENCODINGS
+
+    def save_encoding_settings(self):
+        try:
+            with open(self.encodings_file, 'w') as f:
+                json.dump({'fallbacks': list(self.fallback_encodings)}, f, indent=4)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save encodings: {e}")
+
+    def show_encodings_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Encodings")
+        dialog.geometry("420x300")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        options_frame = ttk.LabelFrame(dialog, text="Files that aren't UTF-8", padding=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        ttk.Label(options_frame, text="A BOM decides the encoding, then UTF-8 is tried.\n"
+                                      "Otherwise try, in order (one per line, none to skip them):",
+                  font=("Arial", 10)).pack(anchor=tk.W)
+        encodings_text = tk.Text(options_frame, height=6, width=40)
+        encodings_text.pack(fill=tk.BOTH, expand=True)
+        encodings_text.insert('1.0', "\n".join(self.fallback_encodings))
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def reset():
+            encodings_text.delete('1.0', tk.END)
+            encodings_text.insert('1.0', "\n".join(DEFAULT_FALLBACK_ENCODINGS))
+
+        def save():
+            names = [line.strip() for line in encodings_text.get('1.0', 'end-1c').splitlines() if line.strip()]
+            try:
+                encodings = normalize_encodings(names)
+            except LookupError as e:
+                messagebox.showerror("Error", f"Unknown encoding: {e}", parent=dialog)
+                return
+            changed = encodings != self.fallback_encodings
+            self.fallback_encodings = encodings
+            self.save_encoding_settings()
+            dialog.destroy()
+
+            # Reload the open directory, files are decoded differently now
+            if changed and self.tree is not None:
+                self.load_directory(self.tree.path)
+
+        ttk.Button(button_frame, text="Save", command=save).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="Defaults", command=reset).pack(side=tk.LEFT)
+
+    def show_ignore_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Ignore Rules")
+        dialog.geometry("420x400")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        options_frame = ttk.LabelFrame(dialog, text="Left out when scanning a directory", padding=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        use_gitignore = tk.BooleanVar(value=self.ignore_settings['use_gitignore'])
+        use_defaults = tk.BooleanVar(value=self.ignore_settings['use_defaults'])
+        ttk.Checkbutton(options_frame, text="Honour .gitignore files",
+                       variable=use_gitignore).pack(anchor=tk.W, pady=2)
+        ttk.Checkbutton(options_frame, text="Skip .git, node_modules, venv, __pycache__, build output",
+                       variable=use_defaults).pack(anchor=tk.W, pady=2)
+
+        ttk.Label(options_frame, text="Exclude patterns (gitignore style, one per line):").pack(anchor=tk.W)
+        excludes_text = tk.Text(options_frame, height=5, width=40)
+        excludes_text.pack(fill=tk.X, pady=(0, 5))
+        excludes_text.insert('1.0', "\n".join(self.ignore_settings['excludes']))
+
+        ttk.Label(options_frame, text="Only include files matching (globs or re:REGEX):").pack(anchor=tk.W)
+        includes_text = tk.Text(options_frame, height=5, width=40)
+        includes_text.pack(fill=tk.X)
+        includes_text.insert('1.0', "\n".join(self.ignore_settings['includes']))
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        def save():
+            settings = {
+                'excludes': [line.strip() for line in excludes_text.get('1.0', 'end-1c').splitlines() if line.strip()],
+                'includes': [line.strip() for line in includes_text.get('1.0', 'end-1c').splitlines() if line.strip()],
+                'use_gitignore': use_gitignore.get(),
+                'use_defaults': use_defaults.get(),
+            }
+            try:
+                rules = IgnoreRules(**settings)
+            except re.error as e:
+                messagebox.showerror("Error", f"Invalid include pattern: {e}")
+                return
+            self.ignore_settings = settings
+            self.ignore_rules = rules
+            self.save_ignore_settings()
+            dialog.destroy()
+
+            # Rescan the open directory with the new rules
+            if self.tree is not None:
+                self.load_directory(self.tree.path)
+
+        ttk.Button(button_frame, text="Save", command=save).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT)
+
     def show_template_manager(self):
         dialog = tk.Toplevel(self.root)
         dialog.title("Template Manager")
@@ -1168,17 +2425,17 @@ class FileAggregatorApp:
         ttk.Button(button_frame, text="New", command=new_template).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Save", command=save_template).pack(side=tk.LEFT, padx=5)
 
-    def apply_template(self, content):
+    def get_template_wrapping(self):
+        """Return (before, after): the text the selected template puts around the content"""
         template_name = self.template_var.get()
         if template_name == 'No Template':
-            return content
+            return "", ""
 
         template = next((t for t in self.templates.values() if t['name'] == template_name), None)
         if not template:
-            return content
+            return "", ""
 
         # Find variables in template
-        import re
         header_vars = re.findall(r'\{(\w+)\}', template['header'])
         footer_vars = re.findall(r'\{(\w+)\}', template['footer'])
         all_vars = list(set(header_vars + footer_vars))
@@ -1215,7 +2472,7 @@ class FileAggregatorApp:
         footer = template['footer'].format(**variables) if variables else template['footer']
         
         # Add two newlines after header
-        return f"{header}\n\n{content}{footer}"
+        return f"{header}\n\n", footer
 
     # Add a hidden easter egg method
     def _easter_egg(self, event=None):
@@ -0,0 +1,82 @@
+"""Compare the old line-by-line display_text() loop with a chunked
+AggregateContent insert into a Tk Text widget.
+
+Run from the repository root (needs a display, the Tk window stays hidden):
+
+    python benchmarks/bench_display.py --files 2000 --lines 80
+"""
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tree_copier import AggregateContent  # noqa: E402
+
+def build_content(files, lines):
+    content = AggregateContent()
+    body = "".join(f"    value_{i} = compute({i})  # some code\n" for i in range(lines))
+    for index in range(files):
+        content.append(f"pkg{index % 50}/module_{index}.py", body)
+    return content
+
+def count_inserts(text_widget):
+    """Wrap text_widget.insert so every call is counted"""
+    calls = [0]
+    insert = text_widget.insert
+
+    def counting_insert(*args, **kwargs):
+        calls[0] += 1
+        return insert(*args, **kwargs)
+
+    text_widget.insert = counting_insert
+    return calls
+
+def legacy_display_text(text_widget, text):
+    # The pre-AggregateContent display_text(): re-parse and insert per line
+    text_widget.delete('1.0', tk.END)
+    positions = []
+    for current_line, line in enumerate(text.split('\n'), start=1):
+        if line.startswith('⚫ ') and line.endswith(':'):
+            positions.append((current_line, line[2:].rstrip(':')))
+        text_widget.insert(tk.END, line + '\n')
+    return positions
+
+def chunked_display(text_widget, content):
+    text_widget.delete('1.0', tk.END)
+    for chunk in content.iter_chunks():
+        text_widget.insert(tk.END, chunk)
+    return content.positions
+
+def run(name, func, text_widget, *args):
+    calls = count_inserts(text_widget)
+    start = time.perf_counter()
+    positions = func(text_widget, *args)
+    text_widget.update_idletasks()
+    elapsed = time.perf_counter() - start
+    del text_widget.insert
+    print(f"{name:<10} {calls[0]:>10} inserts {elapsed:>9.3f} s  {len(positions)} files")
+    return positions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000, help="number of files in the aggregate")
+    parser.add_argument("--lines", type=int, default=80, help="lines per file")
+    args = parser.parse_args()
+
+    content = build_content(args.files, args.lines)
+    text = content.get_text()
+    print(f"{args.files} files, {content.next_line - 1} lines, {len(text) / 1e6:.1f} MB")
+
+    root = tk.Tk()
+    root.withdraw()
+    text_widget = tk.Text(root)
+
+    legacy_positions = run("legacy", legacy_display_text, text_widget, text)
+    chunked_positions = run("chunked", chunked_display, text_widget, content)
+    assert legacy_positions == chunked_positions, "file positions differ"
+    root.destroy()
+
+if __name__ == "__main__":
+    main()
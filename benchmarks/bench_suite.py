@@ -0,0 +1,363 @@
+"""Time the scan, read, aggregate, search, grep, filter and rendering stages on a synthetic tree.
+
+Generates a reproducible directory tree (depth, fan-out, file count, size
+distribution and share of binary files are configurable), runs each stage
+a few times and reports the best run per stage as JSON: seconds, files/s,
+MB/s, peak RSS and, for the Tk stages, the number of Tcl calls. The Tk
+stages run in a window placed off screen and need a display (on a headless
+machine, run the suite under xvfb-run); pass --no-tk to time only the
+GUI-free core.
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py --files 20000 --depth 4 --fanout 6 --out before.json
+    python benchmarks/bench_suite.py --files 20000 --depth 4 --fanout 6 --out after.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+from tree_copier import (  # noqa: E402
+    AggregateContent, ContentCache, ContentFilter, ContentHashes, DecodePool, SearchIndex, SkipReport, TokenCounter,
+    compile_query, iter_bundle_files, iter_deduplicated, iter_tree_files, required_literals, scan_directory,
+    search_segments, write_bundle,
+)
+
+TEXT_EXTENSIONS = ['.py', '.js', '.ts', '.md', '.json', '.txt', '.css', '.html']
+BINARY_EXTENSIONS = ['.dat', '.bin', '.db']
+LINE_TEMPLATES = [
+    "    value_{i} = compute({i}, scale=0.{i})  # keep in sync\n",
+    "def handler_{i}(request, *args, **kwargs):\n",
+    "        return {{'id': {i}, 'name': \"item {i}\"}}\n",
+    "\n",
+    "// TODO({i}): remove once the migration is done\n",
+]
+
+def generate_tree(root, files, depth, fanout, median_size, size_sigma, binary_ratio, seed):
+    """Write a synthetic tree under root and return the total bytes written"""
+    rng = random.Random(seed)
+
+    # Directories breadth first, up to depth levels with fanout children each
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"dir_{index}") for parent in level for index in range(fanout)]
+        directories.extend(level)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    total = 0
+    for index in range(files):
+        directory = directories[index % len(directories)]
+        size = max(1, int(rng.lognormvariate(0, size_sigma) * median_size))
+        if rng.random() < binary_ratio:
+            path = os.path.join(directory, f"blob_{index}{rng.choice(BINARY_EXTENSIONS)}")
+            data = rng.randbytes(size) if hasattr(rng, 'randbytes') else os.urandom(size)
+            data = b'\0' + data[1:]
+        else:
+            path = os.path.join(directory, f"file_{index}{rng.choice(TEXT_EXTENSIONS)}")
+            lines = []
+            written = 0
+            while written < size:
+                line = rng.choice(LINE_TEMPLATES).format(i=rng.randrange(10000))
+                lines.append(line)
+                written += len(line)
+            data = "".join(lines).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(data)
+        total += len(data)
+    return total
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where it can't be read)"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    return None
+
+class CountingTk:
+    """Stands in for a Tk interpreter and counts the Tcl commands sent through it"""
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self._tkapp.eval(script)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+class Stage:
+    """Best of several timed runs of one stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = None
+        self.files = 0
+        self.bytes = 0
+        self.tcl_calls = None
+        self.peak_rss_mb = None
+
+    def record(self, seconds, files, size, tcl_calls=None):
+        if self.seconds is None or seconds < self.seconds:
+            self.seconds, self.files, self.bytes, self.tcl_calls = seconds, files, size, tcl_calls
+        # The peak only grows, so this is the peak up to the end of this stage
+        self.peak_rss_mb = peak_rss_mb()
+
+    def as_dict(self):
+        result = {
+            'seconds': round(self.seconds, 6),
+            'files': self.files,
+            'mb': round(self.bytes / 1e6, 3),
+            'files_per_s': round(self.files / self.seconds, 1) if self.seconds else None,
+            'mb_per_s': round(self.bytes / 1e6 / self.seconds, 2) if self.seconds else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+        }
+        if self.tcl_calls is not None:
+            result['tcl_calls'] = self.tcl_calls
+        return result
+
+def timed(stage, func, repeat=1, measure=None, counter=None):
+    """Run func repeat times, keep the fastest in stage and return the last result.
+
+    measure(result) returns the (files, bytes) the stage processed.
+    """
+    result = None
+    for _ in range(repeat):
+        calls_before = counter.calls if counter is not None else None
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        files, size = measure(result) if measure is not None else (0, 0)
+        stage.record(elapsed, files, size, counter.calls - calls_before if counter is not None else None)
+    return result
+
+def run_core(stages, root, args):
+    """GUI-free stages: scan, read (cold and cached), aggregate, export, tokens, dedupe, search, grep"""
+    tree = timed(stages['scan'], lambda: scan_directory(root), args.repeat,
+                 lambda tree: (sum(1 for _ in iter_tree_files(tree)), 0))
+
+    def read(cache, pool=None):
+        skipped = SkipReport()
+        return list(iter_bundle_files(tree, workers=args.workers, cache=cache, skipped=skipped, pool=pool)), skipped
+
+    # Each cold run gets a fresh cache; the OS page cache is warm after generating the tree
+    files, skipped = timed(stages['read'], lambda: read(ContentCache()), args.repeat,
+                           lambda result: (len(result[0]), sum(node.size or 0 for node, _ in result[0])))
+    text_bytes = sum(len(content) for _, content in files)
+
+    def processed(result):
+        return len(files), text_bytes
+
+    if 'read_pooled' in stages:
+        # Always pooled, whatever the tree size; the fastest run leaves out the process startup
+        with DecodePool(args.processes, min_files=0) as pool:
+            timed(stages['read_pooled'], lambda: read(ContentCache(), pool), args.repeat, processed)
+
+    cache = ContentCache()
+    read(cache)
+    timed(stages['read_cached'], lambda: read(cache), args.repeat, processed)
+
+    def aggregate():
+        content = AggregateContent()
+        for node, text in files:
+            content.append(node.rel_path, text)
+        return content
+    content = timed(stages['aggregate'], aggregate, args.repeat, processed)
+
+    def export():
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            write_bundle(out, tree, workers=args.workers, cache=cache)
+    timed(stages['write_bundle'], export, args.repeat, processed)
+
+    # A fresh counter per run, so every run tokenizes from scratch
+    timed(stages['tokens'], lambda: [TokenCounter().count_segment(node.rel_path, text) for node, text in files],
+          args.repeat, processed)
+    timed(stages['dedupe'], lambda: list(iter_deduplicated(files, ContentHashes(), skipped=skipped)),
+          args.repeat, processed)
+
+    def build_index():
+        search_index = SearchIndex()
+        for node, text in files:
+            search_index.add(node.rel_path, text)
+        return search_index
+    search_index = timed(stages['search_index'], build_index, args.repeat, processed)
+
+    # A rare identifier and a regex, each narrowed down by the index before the scan
+    queries = [compile_query("handler_4321("), compile_query(r"def handler_43\d\d\(request", regex=True)]
+
+    def search():
+        return [search_segments(pattern, content.segments, search_index.candidates(required_literals(pattern)))
+                for pattern in queries]
+    timed(stages['search'], search, args.repeat, processed)
+
+    # Grep mode over the cached texts: files with either identifier, then with both
+    grep_any = ContentFilter(["handler_4321(", "compute(17,"])
+    grep_all = ContentFilter(["def handler_", "TODO(", "migration"], match_all=True)
+    timed(stages['grep'], lambda: [list(iter_bundle_files(tree, workers=args.workers, cache=cache, content_filter=grep))
+                                   for grep in (grep_any, grep_all)], args.repeat, processed)
+    # As the app filters a loaded tree again: the index rules files out before they are read
+    timed(stages['grep_indexed'], lambda: [list(iter_bundle_files(tree, workers=args.workers, cache=cache,
+                                                                  content_filter=grep, search_index=search_index))
+                                           for grep in (grep_any, grep_all)], args.repeat, processed)
+    return tree, content, text_bytes
+
+def load_app_module():
+    spec = importlib.util.spec_from_file_location("file_content_tree_copier",
+                                                  os.path.join(ROOT_DIR, "File Content-Tree Copier.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_tk(stages, tree, content, text_bytes, args):
+    """Tk stages on the real widgets: tree view, content display, extension filter, scrollbar markers"""
+    import tkinter as tk
+    app_module = load_app_module()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Tk stages skipped: {e}", file=sys.stderr)
+        return False
+    counter = CountingTk(root.tk)
+    root.tk = counter  # Widgets take the interpreter from their master, so every Tcl call is counted
+    root.iconbitmap = lambda *args: None  # The .ico only loads on Windows
+    root.geometry("1200x600+-10000+-10000")  # Laid out like the real window, but off screen
+    app = app_module.FileAggregatorApp(root, read_workers=args.workers, persistent_index=False)
+    root.update()
+
+    def build_tree():
+        app.build_tree_view(tree, "The Contents")
+        root.update_idletasks()
+    timed(stages['tree_view'], build_tree, args.repeat, lambda _: (len(content.segments), 0), counter)
+
+    def display():
+        app.show_content(content)
+        root.update_idletasks()
+    timed(stages['display'], display, args.repeat, lambda _: (len(content.segments), text_bytes), counter)
+
+    # Filter on the most common extension, then back to all files
+    extensions = {}
+    for name, _ in content.segments:
+        extension = os.path.splitext(name)[1].lower()
+        extensions[extension] = extensions.get(extension, 0) + 1
+    common = max(extensions, key=extensions.get)
+
+    def apply_filter():
+        app.extension_var.set(common)
+        app.apply_extension_filter()
+        app.extension_var.set('All Files')
+        app.apply_extension_filter()
+        root.update_idletasks()
+    timed(stages['filter'], apply_filter, args.repeat,
+          lambda _: (len(content.segments) + extensions[common], text_bytes), counter)
+
+    def indicators():
+        app.custom_scrollbar.update_indicators(force=True)
+        root.update_idletasks()
+    timed(stages['indicators'], indicators, args.repeat, lambda _: (len(content.positions), 0), counter)
+    root.destroy()
+    return True
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000, help="number of files in the tree")
+    parser.add_argument("--depth", type=int, default=3, help="directory levels below the root")
+    parser.add_argument("--fanout", type=int, default=5, help="subdirectories per directory")
+    parser.add_argument("--median-size", type=int, default=2048, help="median file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=1.0,
+                        help="spread of the log-normal file size distribution (0 for equal sizes)")
+    parser.add_argument("--binary-ratio", type=float, default=0.05, help="share of binary files")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, the same seed gives the same tree")
+    parser.add_argument("--workers", type=int, default=16, help="reader threads")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="also time reads decoded by this many worker processes (default: off)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is reported")
+    parser.add_argument("--dir", help="generate the tree here (kept) instead of in a temporary directory")
+    parser.add_argument("--no-tk", action="store_true", help="skip the stages that need a display")
+    parser.add_argument("--out", help="write the JSON report to this file as well as stdout")
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix="tree_copier_bench_")
+    try:
+        generated = generate_tree(root, args.files, args.depth, args.fanout, args.median_size, args.size_sigma,
+                                  args.binary_ratio, args.seed)
+        names = ['scan', 'read', 'read_cached', 'aggregate', 'write_bundle', 'tokens', 'dedupe',
+                 'search_index', 'search', 'grep', 'grep_indexed']
+        if args.processes > 1:
+            names.insert(2, 'read_pooled')
+        if not args.no_tk:
+            names += ['tree_view', 'display', 'filter', 'indicators']
+        stages = {name: Stage(name) for name in names}
+
+        tree, content, text_bytes = run_core(stages, root, args)
+        if not args.no_tk and not run_tk(stages, tree, content, text_bytes, args):
+            for name in ('tree_view', 'display', 'filter', 'indicators'):
+                del stages[name]
+
+        report = {
+            'parameters': {key: value for key, value in vars(args).items() if key not in ('out', 'dir')},
+            'generated_mb': round(generated / 1e6, 3),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'stages': {name: stage.as_dict() for name, stage in stages.items()},
+        }
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from tree_copier.cache import ContentCache
+
+def test_fresh_only_with_the_same_mtime_and_size():
+    cache = ContentCache()
+    cache.put("a", "one\ntwo\n", mtime=1, size=8)
+    assert cache.get_fresh("a", 1, 8).line_count == 2
+    assert cache.get_fresh("a", 2, 8) is None
+    assert cache.get_fresh("a", 1, 9) is None
+    assert cache.get_fresh("b", 1, 8) is None
+
+def test_evicts_least_recently_used_over_budget():
+    cache = ContentCache(budget=10)
+    cache.put("a", "aaaa", 1, 4)
+    cache.put("b", "bbbb", 1, 4)
+    cache.get("a")  # b is now the oldest
+    cache.put("c", "cccc", 1, 4)
+    assert cache.get("b") is None
+    assert cache.get("a").text == "aaaa" and cache.get("c").text == "cccc"
+    assert cache.used == 8
+
+def test_replacing_an_entry_updates_the_size():
+    cache = ContentCache(budget=10)
+    cache.put("a", "aaaaaaaa", 1, 8)
+    cache.put("a", "aa", 2, 2)
+    assert cache.used == 2
+    assert cache.get_fresh("a", 2, 2).text == "aa"
+
+def test_text_over_budget_is_not_kept():
+    cache = ContentCache(budget=10)
+    cache.put("a", "aaaa", 1, 4)
+    entry = cache.put("big", "x" * 11, 1, 11)
+    assert entry.text == "x" * 11
+    assert cache.get("big") is None
+    assert cache.get("a") is not None and cache.used == 4
+
+def test_clear():
+    cache = ContentCache()
+    cache.put("a", "aaaa", 1, 4)
+    cache.clear()
+    assert cache.get("a") is None and cache.used == 0
@@ -0,0 +1,80 @@
+import pytest
+
+from tree_copier import cli
+from tree_copier.cli import main
+from tree_copier.index import DirectoryIndex
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "proj"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "main.py").write_text("print('hi')\n")
+    (root / "README.md").write_text("# Readme\n")
+    return root
+
+def test_writes_tree_then_contents(tree, capsys):
+    assert main([str(tree)]) == 0
+    out = capsys.readouterr().out
+    assert out == (
+        "=== File Structure ===\n\n"
+        "The Contents\n"
+        "├── README.md\n"
+        "└── src\n"
+        "    └── main.py\n\n"
+        "=== File Contents ===\n\n"
+        "⚫ README.md:\n# Readme\n\n"
+        "⚫ src/main.py:\nprint('hi')\n"
+    )
+
+def test_ext_filters_files_but_keeps_directories(tree, capsys):
+    main([str(tree), "--ext", "PY"])
+    out = capsys.readouterr().out
+    assert "└── src\n    └── main.py" in out
+    assert "README" not in out
+    assert "⚫ src/main.py:" in out
+
+def test_out_writes_a_file(tree, tmp_path, capsys):
+    out_path = tmp_path / "bundle.txt"
+    main([str(tree), "--no-tree", "--out", str(out_path)])
+    assert capsys.readouterr().out == ""
+    assert out_path.read_text(encoding="utf-8").startswith("=== File Contents ===\n\n⚫ README.md:\n")
+
+def test_second_run_served_from_the_index_matches(tree, capsys):
+    main([str(tree)])
+    first = capsys.readouterr().out
+    main([str(tree)])
+    assert capsys.readouterr().out == first
+    main([str(tree), "--no-index"])
+    assert capsys.readouterr().out == first
+
+def test_interrupted_run_keeps_the_index(tree, capsys, monkeypatch):
+    main([str(tree)])
+    capsys.readouterr()
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(cli, "write_bundle", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        main([str(tree)])
+    index = DirectoryIndex.open_for(str(tree))
+    assert len(index) == 2  # Not pruned, though nothing was looked up
+    index.close()
+
+def test_skipped_files_are_reported_on_stderr(tree, capsys):
+    (tree / "data.bin").write_bytes(b"\0" * 2048)
+    main([str(tree), "--no-tree"])
+    captured = capsys.readouterr()
+    assert "⚫ data.bin:\n[Skipped file: contains NUL bytes, 2.0 KB]\n" in captured.out
+    assert captured.err == (
+        "skipped data.bin: contains NUL bytes (2.0 KB)\n"
+        "1 file(s) skipped, 2.0 KB in total\n"
+    )
+
+def test_rejects_missing_directory(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "missing")])
@@ -0,0 +1,68 @@
+import random
+
+from tree_copier.content import AggregateContent, format_segments
+
+def _build(files):
+    content = AggregateContent()
+    parts = []
+    for name, text in files:
+        parts.extend(content.append(name, text))
+    return content, "".join(parts)
+
+def _apply(text, edit):
+    """Apply an edit (first_line, end_line, text) the way the app patches its text widget"""
+    first_line, end_line, inserted = edit
+
+    def offset(line):  # Start of a 1-based line, the end of the text past the last one
+        position = 0
+        for _ in range(line - 1):
+            position = text.find("\n", position) + 1
+            if not position:
+                return len(text)
+        return position
+    return text[:offset(first_line)] + inserted + text[offset(end_line):]
+
+def _header_lines(text):
+    return [(number, line[2:-1]) for number, line in enumerate(text.split("\n"), 1) if line.startswith("⚫ ")]
+
+def test_append_records_header_lines():
+    content, text = _build([("a.py", "one\ntwo\n"), ("b.py", "three\n")])
+    assert text == "⚫ a.py:\none\ntwo\n\n⚫ b.py:\nthree\n"
+    assert text == content.get_text() == "".join(format_segments(content.segments))
+    assert content.positions == [(1, "a.py"), (5, "b.py")] == _header_lines(text)
+    assert content.next_line == 7
+
+def test_filename_to_line_prefers_full_paths():
+    content, _ = _build([("util.py", "a\n"), ("x/util.py", "b\n")])
+    mapping = content.filename_to_line()
+    assert mapping["util.py"] == 1  # Not x/util.py's basename
+    assert mapping["x/util.py"] == 4
+
+def test_iter_chunks_joins_to_the_text():
+    content, text = _build([(f"f{i}", "line\n" * i) for i in range(20)])
+    chunks = list(content.iter_chunks(chunk_chars=30))
+    assert len(chunks) > 1 and "".join(chunks) == text
+
+def test_patches_keep_the_view_and_positions_in_sync():
+    # Random replace / insert / remove edits, applied both to the model and to a copy of the shown text
+    rng = random.Random(11)
+    content, text = _build([(f"f{i}", "x\n" * rng.randint(1, 3)) for i in range(5)])
+    for step in range(300):
+        action = rng.choice(["replace", "insert", "remove"]) if content.segments else "insert"
+        body = "".join(f"{step}.{n}\n" for n in range(rng.randint(1, 4)))
+        if action == "replace":
+            edit = content.replace(rng.randrange(len(content.segments)), body)
+        elif action == "insert":
+            edit = content.insert(rng.randint(0, len(content.segments)), f"n{step}", body)
+        else:
+            edit = content.remove(rng.randrange(len(content.segments)))
+        text = _apply(text, edit)
+        assert text == content.get_text(), step
+        assert content.positions == _header_lines(text), step
+        assert content.next_line == text.count("\n") + 1, step
+
+def test_line_counts_can_be_given():
+    content = AggregateContent()
+    content.append("a", "1\n2\n", line_count=2)
+    content.append("b", "3\n", line_count=1)
+    assert content.positions == [(1, "a"), (5, "b")]
@@ -0,0 +1,31 @@
+from tree_copier.dedup import DEDUP_MIN_CHARS, ContentHashes, duplicate_text, iter_deduplicated
+from tree_copier.scan import TreeNode
+
+LONG = "x = 1\n" * DEDUP_MIN_CHARS
+
+def _files(*pairs):
+    return [(TreeNode(name, "/root/" + name, name, False, size=len(text), mtime=1), text) for name, text in pairs]
+
+def _bodies(files, **kwargs):
+    return [(node.rel_path, content) for node, content in iter_deduplicated(files, **kwargs)]
+
+def test_identical_contents_refer_to_the_first_path():
+    files = _files(("a.py", LONG), ("b.py", LONG), ("c/d.py", LONG))
+    assert _bodies(files) == [("a.py", LONG), ("b.py", duplicate_text("a.py")), ("c/d.py", duplicate_text("a.py"))]
+    assert duplicate_text("a.py") == "(identical to a.py)\n"
+
+def test_distinct_contents_pass_through():
+    files = _files(("a.py", LONG), ("b.py", LONG + "y = 2\n"), ("c.py", "short\n"))
+    assert _bodies(files) == [(node.rel_path, content) for node, content in files]
+
+def test_short_bodies_are_kept():
+    files = _files(("a.py", "same\n"), ("b.py", "same\n"))
+    assert _bodies(files) == [("a.py", "same\n"), ("b.py", "same\n")]
+
+def test_hashes_are_memoized_by_size_and_mtime():
+    hashes = ContentHashes()
+    (node, _), = _files(("a.py", LONG))
+    first = hashes.hash_for(node, LONG)
+    assert hashes.hash_for(node, "ignored, the size and mtime are unchanged") == first
+    node.mtime = 2
+    assert hashes.hash_for(node, LONG + "changed\n") != first
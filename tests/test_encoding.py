@@ -0,0 +1,51 @@
+import codecs
+
+import pytest
+
+from tree_copier.cli import main
+from tree_copier.encoding import decode_bytes, detect_encoding, normalize_encodings
+from tree_copier.reader import SkipReport, read_files_parallel
+from tree_copier.scan import iter_tree_files, scan_directory
+
+TEXT = "naïve café\nline two\n"
+
+def test_utf8_with_and_without_bom():
+    assert decode_bytes(TEXT.encode("utf-8")) == (TEXT, "utf-8")
+    assert decode_bytes(codecs.BOM_UTF8 + TEXT.encode("utf-8")) == (TEXT, "utf-8-sig")
+
+@pytest.mark.parametrize("encoding", ["utf-16-le", "utf-16-be"])
+def test_utf16_with_and_without_bom(encoding):
+    bom = codecs.BOM_UTF16_LE if encoding == "utf-16-le" else codecs.BOM_UTF16_BE
+    assert decode_bytes(bom + TEXT.encode(encoding)) == (TEXT, encoding)
+    assert detect_encoding(TEXT.encode(encoding)) == (encoding, 0)
+    assert decode_bytes(TEXT.encode(encoding)) == (TEXT, encoding)
+
+def test_cp1252_fallback():
+    data = "“quoted” café\n".encode("cp1252")
+    assert decode_bytes(data) == ("“quoted” café\n", "cp1252")
+    assert decode_bytes(data, fallbacks=("latin-1",))[1] == "latin-1"
+    with pytest.raises(UnicodeDecodeError):
+        decode_bytes(data, fallbacks=())
+
+def test_normalize_encodings():
+    assert normalize_encodings(["UTF8", "Windows-1252", "Latin1", "cp1252"]) == ("cp1252", "latin-1")
+    with pytest.raises(LookupError):
+        normalize_encodings(["no-such-codec"])
+
+def test_reader_decodes_and_reports_encodings(tmp_path):
+    (tmp_path / "bom.txt").write_bytes(codecs.BOM_UTF8 + TEXT.encode("utf-8"))
+    (tmp_path / "plain.txt").write_bytes(TEXT.encode("utf-8"))
+    (tmp_path / "wide.txt").write_bytes(codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le"))
+    (tmp_path / "legacy.txt").write_bytes(TEXT.encode("cp1252"))
+    skipped = SkipReport()
+    tree = scan_directory(str(tmp_path))
+    bodies = {node.rel_path: body for node, body in read_files_parallel(iter_tree_files(tree), skipped=skipped)}
+    assert set(bodies.values()) == {TEXT}
+    assert len(skipped) == 0  # The NUL bytes of UTF-16 don't make it binary
+    assert skipped.encodings == {"bom.txt": "utf-8-sig", "wide.txt": "utf-16-le", "legacy.txt": "cp1252"}
+
+def test_cli_rejects_an_unknown_encoding(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        main([str(tmp_path), "--no-index", "--encoding", "no-such-codec"])
+    assert exc_info.value.code == 2
+    assert "no-such-codec" in capsys.readouterr().err
@@ -0,0 +1,61 @@
+import gzip
+import io
+import json
+import lzma
+import tarfile
+import zipfile
+
+import pytest
+
+from tree_copier.formats import export_format, open_text_output, write_archive, write_jsonl
+
+FILES = [("a.py", 1_600_000_000 * 10**9, "print('é')\n"), ("sub/b.txt", None, "one\ntwo\n")]
+
+def test_export_format():
+    assert [export_format(name) for name in ["b.TXT", "b.tgz", "b.tar.gz", "b.tar", "b.zip", "b.jsonl", "b.gz"]] == [
+        "text", "tar.gz", "tar.gz", "tar", "zip", "jsonl", "gzip",
+    ]
+
+@pytest.mark.parametrize("suffix, opener", [(".txt.gz", gzip.open), (".txt.xz", lzma.open)])
+def test_compressed_text_round_trips(tmp_path, suffix, opener):
+    path = str(tmp_path / ("bundle" + suffix))
+    text = "⚫ a.py:\nprint('é')\n" * 1000
+    with open_text_output(path) as out:
+        out.write(text)
+    with opener(path, "rt", encoding="utf-8") as f:
+        assert f.read() == text
+
+def test_jsonl_round_trips():
+    out = io.StringIO()
+    write_jsonl(out, [
+        ("a.py", 12, "print('é')\n", None, "utf-8"),
+        ("sub\\b.bin", 4, "[Skipped]\n", "contains NUL bytes", None),
+        ("c.txt", 5, "caf\u00e9\n", None, "cp1252"),
+    ])
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records == [
+        {"path": "a.py", "size": 12, "line": 1, "content": "print('é')\n"},
+        {"path": "sub/b.bin", "size": 4, "line": 4, "content": "[Skipped]\n", "skipped": "contains NUL bytes"},
+        {"path": "c.txt", "size": 5, "line": 7, "content": "café\n", "encoding": "cp1252"},
+    ]
+
+@pytest.mark.parametrize("name", ["bundle.tar", "bundle.tar.gz", "bundle.tar.xz"])
+def test_tar_round_trips(tmp_path, name):
+    path = str(tmp_path / name)
+    write_archive(path, FILES)
+    with tarfile.open(path) as archive:
+        members = archive.getmembers()
+        assert [member.name for member in members] == ["a.py", "sub/b.txt"]
+        assert members[0].mtime == 1_600_000_000
+        assert [archive.extractfile(member).read().decode("utf-8") for member in members] == [
+            content for _, _, content in FILES
+        ]
+
+def test_zip_round_trips(tmp_path):
+    path = str(tmp_path / "bundle.zip")
+    write_archive(path, FILES)
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["a.py", "sub/b.txt"]
+        assert [archive.read(name).decode("utf-8") for name in archive.namelist()] == [
+            content for _, _, content in FILES
+        ]
@@ -0,0 +1,61 @@
+import os
+import re
+
+import pytest
+
+from tree_copier.grep import ContentFilter, iter_matching, prune_tree
+from tree_copier.reader import SkipReport
+from tree_copier.scan import iter_tree_files, scan_directory
+from tree_copier.search import SearchIndex
+
+def test_any_and_all():
+    any_filter = ContentFilter(["alpha", "beta"])
+    all_filter = ContentFilter(["alpha", "beta"], match_all=True)
+    assert any_filter.matches("x Alpha y") and not all_filter.matches("x Alpha y")
+    assert all_filter.matches("beta\nALPHA")
+    assert not any_filter.matches("gamma")
+
+def test_case_and_regex():
+    assert not ContentFilter(["Alpha"], match_case=True).matches("alpha")
+    assert ContentFilter([r"(?i)Alpha\d"], regex=True, match_case=True).matches("ALPHA1")
+    assert ContentFilter([r"def \w+\("], regex=True).matches("DEF run(")
+    assert not ContentFilter(["a.c"]).matches("abc")
+    # Case-insensitive matches lower() doesn't find in non-ASCII text
+    assert ContentFilter(["SS"]).matches("ſs")
+
+def test_invalid_filters():
+    with pytest.raises(ValueError):
+        ContentFilter(["", ""])
+    with pytest.raises(re.error):
+        ContentFilter(["("], regex=True)
+
+def test_prefilter_with_the_index():
+    class Node:
+        def __init__(self, rel_path):
+            self.rel_path = rel_path
+    index = SearchIndex()
+    index.add("a", "alpha beta\n")
+    index.add("b", "gamma\n")
+    nodes = [Node("a"), Node("b"), Node("new")]
+    assert [node.rel_path for node in ContentFilter(["alpha"]).prefilter(nodes, index)] == ["a", "new"]
+    assert len(ContentFilter(["alpha", "x|y"], regex=True).prefilter(nodes, index)) == 3
+    assert [node.rel_path for node in ContentFilter(["beta", "gamma"], match_all=True).prefilter(nodes, index)] \
+        == ["new"]
+
+def test_matching_files_and_pruned_tree(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "hit.py").write_text("needle\n")
+    (tmp_path / "src" / "miss.py").write_text("hay\n")
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "miss.txt").write_text("hay\n")
+    tree = scan_directory(str(tmp_path))
+    files = [(node, open(node.path).read()) for node in iter_tree_files(tree)]
+    skipped = SkipReport()
+    skipped.add(files[0][0].rel_path, "binary", 1)  # Placeholders never match
+    kept = list(iter_matching(files, ContentFilter(["needle", "hay"]), skipped))
+    assert len(kept) == len(files) - 1
+
+    matched = {node.rel_path for node, _ in iter_matching(files, ContentFilter(["needle"]))}
+    pruned = prune_tree(tree, lambda node: node.rel_path in matched)
+    assert [node.rel_path for node in iter_tree_files(pruned)] == [os.path.join("src", "hit.py")]
+    assert [child.name for child in pruned.children] == ["src"]
@@ -0,0 +1,87 @@
+import os
+
+from tree_copier.ignore import IgnoreRules, PatternList
+from tree_copier.scan import iter_tree_files, scan_directory
+
+def test_bare_name_matches_at_any_depth():
+    patterns = PatternList(["*.log", "tmp"])
+    assert patterns.match("debug.log", False)
+    assert patterns.match("a/b/debug.log", False)
+    assert patterns.match("src/tmp", True)
+    assert patterns.match("debug.log.txt", False) is None
+
+def test_slash_anchors_to_the_base():
+    patterns = PatternList(["/build", "docs/*.md"])
+    assert patterns.match("build", True)
+    assert patterns.match("src/build", True) is None
+    assert patterns.match("docs/index.md", False)
+    assert patterns.match("src/docs/index.md", False) is None
+    assert patterns.match("docs/api/index.md", False) is None  # * doesn't cross a /
+
+def test_double_star():
+    patterns = PatternList(["**/gen/*.py", "logs/**"])
+    assert patterns.match("gen/a.py", False)
+    assert patterns.match("x/y/gen/a.py", False)
+    assert patterns.match("logs/a/b.txt", False)
+    assert patterns.match("logs", True) is None
+
+def test_trailing_slash_matches_directories_only():
+    patterns = PatternList(["cache/"])
+    assert patterns.match("cache", True)
+    assert patterns.match("cache", False) is None
+
+def test_last_matching_pattern_decides():
+    patterns = PatternList(["*.txt", "!keep.txt", "keep.txt"])
+    assert patterns.match("keep.txt", False) is True
+    patterns = PatternList(["*.txt", "!keep.txt"])
+    assert patterns.match("keep.txt", False) is False
+    assert patterns.match("other.txt", False) is True
+    assert patterns.match("other.py", False) is None
+
+def test_comments_blanks_and_escapes():
+    patterns = PatternList(["# comment", "", "   ", r"\#hash", r"\!bang", "trailing   "])
+    assert len(patterns.rules) == 3
+    assert patterns.match("#hash", False)
+    assert patterns.match("!bang", False)
+    assert patterns.match("trailing", False)
+
+def test_character_classes():
+    patterns = PatternList(["file[0-9].txt", "note[!a].md"])
+    assert patterns.match("file3.txt", False)
+    assert patterns.match("filex.txt", False) is None
+    assert patterns.match("noteb.md", False)
+    assert patterns.match("notea.md", False) is None
+
+def _scanned(tmp_path, files, rules):
+    for path, text in files.items():
+        full = tmp_path / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(text)
+    tree = scan_directory(str(tmp_path), rules)
+    return sorted(node.rel_path.replace(os.sep, '/') for node in iter_tree_files(tree))
+
+def test_gitignores_relative_to_their_directory_deepest_first(tmp_path):
+    files = {
+        ".gitignore": "*.tmp\n/top.txt\n",
+        "top.txt": "", "a.tmp": "", "keep.py": "",
+        "sub/.gitignore": "!b.tmp\ntop.txt\n",
+        "sub/b.tmp": "", "sub/c.tmp": "", "sub/top.txt": "",
+        "node_modules/x.js": "",
+    }
+    assert _scanned(tmp_path, files, IgnoreRules()) == [".gitignore", "keep.py", "sub/.gitignore", "sub/b.tmp"]
+
+def test_user_excludes_win_over_gitignore_negation(tmp_path):
+    files = {".gitignore": "*.tmp\n!keep.tmp\n", "keep.tmp": "", "x.py": ""}
+    assert _scanned(tmp_path, files, IgnoreRules(excludes=["keep.tmp"])) == [".gitignore", "x.py"]
+
+def test_defaults_and_gitignore_can_be_turned_off(tmp_path):
+    files = {".gitignore": "*.tmp\n", "a.tmp": "", "build/out.txt": ""}
+    rules = IgnoreRules(use_gitignore=False, use_defaults=False)
+    assert _scanned(tmp_path, files, rules) == [".gitignore", "a.tmp", "build/out.txt"]
+
+def test_includes_keep_matching_files_only():
+    rules = IgnoreRules(includes=["*.py", "re:^docs/.*\\.md$"])
+    assert rules.is_included("src/app.py")
+    assert rules.is_included(os.path.join("docs", "guide.md"))
+    assert not rules.is_included("README.md")
+    assert IgnoreRules().is_included("anything.bin")
@@ -0,0 +1,55 @@
+from tree_copier.index import DirectoryIndex
+
+def _reopen(index, tmp_path):
+    index.close()
+    return DirectoryIndex.open_for(str(tmp_path / "root"), index_dir=str(tmp_path / "index"))
+
+def _open(tmp_path):
+    return DirectoryIndex.open_for(str(tmp_path / "root"), index_dir=str(tmp_path / "index"))
+
+def test_hit_after_save_and_reopen(tmp_path):
+    index = _open(tmp_path)
+    index.record("a.txt", 100, 6, "hello\n")
+    index.record("c.txt", 100, 5, "café\n", encoding="cp1252")
+    index.record("b.bin", 100, 3, None, "contains NUL bytes")
+    index.save()
+    index = _reopen(index, tmp_path)
+    assert len(index) == 3
+    assert index.lookup("a.txt", 100, 6) == ("hello\n", None, None)
+    assert index.lookup("c.txt", 100, 5) == ("café\n", None, "cp1252")
+    assert index.lookup("b.bin", 100, 3) == ("[Skipped file: contains NUL bytes, 3 B]\n", "contains NUL bytes", None)
+    index.close()
+
+def test_miss_after_the_file_changes(tmp_path):
+    index = _open(tmp_path)
+    index.record("a.txt", 100, 6, "hello\n")
+    index.save()
+    index = _reopen(index, tmp_path)
+    assert index.lookup("a.txt", 200, 6) is None  # Touched
+    assert index.lookup("a.txt", 100, 7) is None  # Resized
+    assert index.lookup("new.txt", 100, 6) is None
+    index.close()
+
+def test_prune_drops_entries_not_seen_since_opening(tmp_path):
+    index = _open(tmp_path)
+    for name in ["keep.txt", "gone.txt"]:
+        index.record(name, 1, 5, name[:4] + "\n")
+    index.save()
+    index = _reopen(index, tmp_path)
+    assert index.lookup("keep.txt", 1, 5)[0] == "keep\n"
+    index.save(prune=True)
+    index = _reopen(index, tmp_path)
+    assert len(index) == 1
+    assert index.lookup("keep.txt", 1, 5)[0] == "keep\n"
+    assert index.lookup("gone.txt", 1, 5) is None
+    index.close()
+
+def test_save_without_prune_keeps_everything(tmp_path):
+    index = _open(tmp_path)
+    index.record("a.txt", 1, 2, "a\n")
+    index.save()
+    index = _reopen(index, tmp_path)
+    index.save()
+    index = _reopen(index, tmp_path)
+    assert index.lookup("a.txt", 1, 2)[0] == "a\n"
+    index.close()
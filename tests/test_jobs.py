@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from tree_copier.jobs import PRIORITY_BACKGROUND, PRIORITY_CONTENT, PRIORITY_TREE, JobCancelled, JobScheduler
+
+TIMEOUT = 5
+
+@pytest.fixture
+def busy():
+    """A one-worker scheduler and release(): until it is called, everything submitted queues up"""
+    scheduler = JobScheduler(workers=1)
+    started = threading.Event()
+    gate = threading.Event()
+
+    def hold(job):
+        started.set()
+        gate.wait(TIMEOUT)
+    blocker = scheduler.submit(hold, priority=PRIORITY_TREE)
+    assert started.wait(TIMEOUT)
+
+    def release(*jobs):
+        gate.set()
+        for job in (blocker,) + jobs:
+            assert job.done.wait(TIMEOUT)
+    return scheduler, release
+
+def _recorder(ran, name):
+    return lambda job: ran.append(name)
+
+def test_runs_by_priority_then_submission_order(busy):
+    scheduler, release = busy
+    ran = []
+    jobs = [
+        scheduler.submit(_recorder(ran, "background"), PRIORITY_BACKGROUND),
+        scheduler.submit(_recorder(ran, "content 1"), PRIORITY_CONTENT),
+        scheduler.submit(_recorder(ran, "tree"), PRIORITY_TREE),
+        scheduler.submit(_recorder(ran, "content 2"), PRIORITY_CONTENT),
+    ]
+    release(*jobs)
+    assert ran == ["tree", "content 1", "content 2", "background"]
+
+def test_new_job_in_a_group_supersedes_queued_ones(busy):
+    scheduler, release = busy
+    ran = []
+    old = scheduler.submit(_recorder(ran, "old"), group="load")
+    other = scheduler.submit(_recorder(ran, "other"), group="watch")
+    new = scheduler.submit(_recorder(ran, "new"), group="load")
+    assert old.cancelled and not other.cancelled and not new.cancelled
+    release(old, other, new)
+    assert ran == ["other", "new"]
+
+def test_running_job_stops_at_its_next_check():
+    scheduler = JobScheduler(workers=2)
+    started = threading.Event()
+    superseded = threading.Event()
+    steps = []
+
+    def load(job):
+        started.set()
+        assert superseded.wait(TIMEOUT)
+        steps.append("before check")
+        job.check()
+        steps.append("after check")
+    old = scheduler.submit(load, group="load")
+    assert started.wait(TIMEOUT)
+    new = scheduler.submit(lambda job: None, group="load")
+    superseded.set()
+    assert old.done.wait(TIMEOUT) and new.done.wait(TIMEOUT)
+    assert old.cancelled and steps == ["before check"]
+    with pytest.raises(JobCancelled):
+        old.check()
+
+def test_follow_ups_join_the_group_and_are_cancelled_with_their_parent(busy):
+    scheduler, release = busy
+    ran = []
+    parent = scheduler.submit(_recorder(ran, "parent"), group="load")
+    child = scheduler.submit(_recorder(ran, "child"), parent=parent)
+    assert child.group == "load" and not parent.cancelled
+    scheduler.cancel_group("load")
+    assert parent.cancelled and child.cancelled
+    release(parent, child)
+    assert ran == []
+
+def test_posted_updates_of_cancelled_jobs_are_dropped(busy):
+    scheduler, release = busy
+    ran = []
+    live = scheduler.submit(lambda job: None)
+    dead = scheduler.submit(lambda job: None)
+    scheduler.post(live, lambda: ran.append("live"))
+    scheduler.post(dead, lambda: ran.append("dead"))
+    scheduler.post(None, lambda: ran.append("always"))
+    dead.cancel()
+    scheduler.run_posted()
+    assert ran == ["live", "always"]
+    called = []
+    dead.on_cancel(lambda: called.append(True))  # Already cancelled: called right away
+    assert called == [True]
+    release(live, dead)
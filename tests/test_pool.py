@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from tree_copier import pool
+from tree_copier.pool import DecodePool, _process_batch
+from tree_copier.reader import read_files_parallel
+from tree_copier.scan import iter_tree_files, scan_directory
+
+# Worker stand-ins, module-level so the pool can pickle them
+
+def _dying_batch(files, *args):
+    if any(path.endswith('f13.txt') for path, _ in files):
+        os._exit(1)
+    return _process_batch(files, *args)
+
+def _raising_batch(files, *args):
+    if any(path.endswith('f13.txt') for path, _ in files):
+        raise RuntimeError("worker failed")
+    return _process_batch(files, *args)
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(pool, 'BATCH_FILES', 4)
+    for i in range(40):
+        (tmp_path / f"f{i:02}.txt").write_text(f"file {i}\n" * (i + 1))
+    (tmp_path / "blob.bin").write_bytes(bytes(range(256)) * 4)
+    return scan_directory(str(tmp_path))
+
+def _threaded(tree):
+    return [(node.rel_path, text) for node, text in read_files_parallel(iter_tree_files(tree))]
+
+def _pooled(tree):
+    with DecodePool(2, min_files=0) as decode_pool:
+        return [(node.rel_path, text) for node, text in decode_pool.read_files(iter_tree_files(tree))]
+
+def test_pooled_read_matches_threaded(tree):
+    assert _pooled(tree) == _threaded(tree)
+
+@pytest.mark.parametrize('worker', [_dying_batch, _raising_batch])
+def test_failing_worker_falls_back_in_process(tree, monkeypatch, worker):
+    monkeypatch.setattr(pool, '_process_batch', worker)
+    assert _pooled(tree) == _threaded(tree)
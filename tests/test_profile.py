@@ -0,0 +1,62 @@
+import json
+import threading
+
+from tree_copier.profile import SLOWEST_FILES, LoadProfile
+
+def _profile():
+    profile = LoadProfile("Load proj")
+    profile.started, profile.finished = 10.0, 11.25
+    return profile
+
+def test_stage_totals_add_up_across_threads():
+    profile = _profile()
+
+    def work():
+        for _ in range(100):
+            profile.add('read', 0.001, 512)
+            profile.count('files')
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = profile.as_dict()
+    assert stats['wall_seconds'] == 1.25
+    assert stats['stages']['read'] == {'seconds': 0.4, 'calls': 400, 'amount': 204800}
+    assert stats['stages']['scan'] == {'seconds': 0.0, 'calls': 0, 'amount': 0}
+    assert stats['counters'] == {'files': 400}
+
+def test_keeps_the_slowest_files():
+    profile = _profile()
+    for n in range(SLOWEST_FILES * 3):
+        profile.file_read(f"f{n}", n / 1000, n)
+    slowest = profile.as_dict()['slowest_files']
+    assert [entry['path'] for entry in slowest] == [f"f{n}" for n in range(SLOWEST_FILES * 3 - 1, SLOWEST_FILES * 2 - 1, -1)]
+
+def test_report_format(tmp_path):
+    profile = _profile()
+    profile.add('scan', 0.0125)
+    profile.add('read', 0.5, 3 * 1024 * 1024)
+    profile.add('assemble', 0.02, 1500)
+    profile.count('files', 1500)
+    profile.count('cache_hits', 2)
+    profile.file_read("big.txt", 0.25, 2048)
+    profile.extra['gutter'] = {'redraws': 3}
+    assert list(profile.report_lines()) == [
+        "Load proj: 1.250 s",
+        "",
+        "scan             12.5 ms        1 calls",
+        "read            500.0 ms        1 calls  3.0 MB",
+        "assemble         20.0 ms        1 calls  1,500 files",
+        "(read, decode and pool are summed over the reader threads and processes)",
+        "",
+        "cache hits: 2, files: 1,500",
+        "",
+        "Slowest files:",
+        "  250.00 ms  big.txt (2.0 KB)",
+        "",
+        "gutter: redraws: 3",
+    ]
+    profile.dump(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json", encoding='utf-8') as f:
+        assert json.load(f) == profile.as_dict()
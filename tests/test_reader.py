@@ -0,0 +1,55 @@
+import pytest
+
+from tree_copier import reader
+from tree_copier.reader import SkipReport, format_size, read_files_parallel, sniff_binary
+from tree_copier.scan import iter_tree_files, scan_directory
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setattr(reader, "MAX_FILE_SIZE", 1000)
+    return 1000
+
+def _read(tmp_path, workers=4, encodings=None):
+    skipped = SkipReport()
+    tree = scan_directory(str(tmp_path))
+    files = read_files_parallel(iter_tree_files(tree), workers, skipped=skipped, encodings=encodings)
+    bodies = {node.rel_path: body for node, body in files}
+    return bodies, {skipped_file.path: (skipped_file.reason, skipped_file.size) for skipped_file in skipped}
+
+def test_nul_bytes_are_skipped(tmp_path):
+    (tmp_path / "blob.dat").write_bytes(b"head\0tail" * 10)
+    (tmp_path / "ok.txt").write_text("fine\n")
+    bodies, skipped = _read(tmp_path)
+    assert skipped == {"blob.dat": ("contains NUL bytes", 90)}
+    assert bodies["blob.dat"] == "[Skipped file: contains NUL bytes, 90 B]\n"
+    assert bodies["ok.txt"] == "fine\n"
+
+def test_files_over_the_size_limit_are_skipped(tmp_path, small_limit, monkeypatch):
+    (tmp_path / "big.txt").write_text("x" * (small_limit + 1))
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda path, *args, **kwargs: opened.append(path) or real_open(path, *args, **kwargs))
+    bodies, skipped = _read(tmp_path)
+    reason = f"larger than {format_size(small_limit)}"
+    assert skipped == {"big.txt": (reason, small_limit + 1)}
+    assert bodies["big.txt"] == f"[Skipped file: {reason}, {format_size(small_limit + 1)}]\n"
+    assert opened == []  # Rejected on the scanned size
+
+def test_text_just_under_the_limit_is_kept(tmp_path, small_limit):
+    text = "y" * (small_limit - 1)
+    (tmp_path / "edge.txt").write_text(text)
+    bodies, skipped = _read(tmp_path, workers=1)
+    assert skipped == {}
+    assert bodies["edge.txt"] == text + "\n"
+
+def test_sniff_binary():
+    assert sniff_binary(b"plain text\n\tindented\r\n") is None
+    assert sniff_binary(b"a\0b") == "contains NUL bytes"
+    assert sniff_binary(bytes(range(1, 32)) * 4) == "mostly non-text bytes"
+    assert sniff_binary(b"") is None
+
+def test_non_utf8_keeps_the_old_message_without_fallbacks(tmp_path):
+    (tmp_path / "latin.txt").write_bytes("caf\xe9\n".encode("latin-1"))
+    bodies, skipped = _read(tmp_path, encodings=())
+    assert bodies["latin.txt"] == reader.BINARY_FILE_TEXT
+    assert skipped == {"latin.txt": (reader.NOT_UTF8_REASON, 5)}
@@ -0,0 +1,57 @@
+import os
+
+from tree_copier.ignore import IgnoreRules
+from tree_copier.scan import iter_tree_files, scan_directory, scan_files
+
+def _write(root, rel_path, text=""):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+def test_scan_records_paths_sizes_and_mtimes(tmp_path):
+    _write(tmp_path, "src/main.py", "print()\n")
+    tree = scan_directory(str(tmp_path))
+    assert tree.is_dir and tree.rel_path == ""
+    (src,) = tree.children
+    (main,) = src.children
+    assert src.is_dir and main.rel_path == os.path.join("src", "main.py")
+    assert main.size == 8 and main.mtime == os.stat(main.path).st_mtime_ns
+
+def test_children_sorted_by_name_like_the_app(tmp_path):
+    # Same order as the app's sorted(os.listdir()): by code point, so upper case first
+    # and directories mixed in with the files rather than listed first
+    for rel_path in ["b.txt", "B/x.txt", "a/x.txt", "A.txt", "_c.txt", "c/x.txt"]:
+        _write(tmp_path, rel_path)
+    tree = scan_directory(str(tmp_path))
+    assert [child.name for child in tree.children] == sorted(os.listdir(tmp_path))
+    assert [(child.name, child.is_dir) for child in tree.children] == [
+        ("A.txt", False), ("B", True), ("_c.txt", False), ("a", True), ("b.txt", False), ("c", True),
+    ]
+
+def test_iter_tree_files_lists_files_before_subdirectories(tmp_path):
+    for rel_path in ["b.txt", "a/z.txt", "a/y/x.txt", "c.txt"]:
+        _write(tmp_path, rel_path)
+    tree = scan_directory(str(tmp_path))
+    names = [node.rel_path.replace(os.sep, "/") for node in iter_tree_files(tree)]
+    assert names == ["b.txt", "c.txt", "a/z.txt", "a/y/x.txt"]
+
+def test_ignored_directories_are_not_descended_into(tmp_path, monkeypatch):
+    for rel_path in ["src/main.py", "node_modules/pkg/index.js", "build/out/app.js", "logs/today.log"]:
+        _write(tmp_path, rel_path)
+    _write(tmp_path, ".gitignore", "logs/\n")
+    scanned = []
+    real_scandir = os.scandir
+
+    def scandir(path):
+        scanned.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+    monkeypatch.setattr(os, "scandir", scandir)
+
+    tree = scan_directory(str(tmp_path), IgnoreRules())
+    assert [child.name for child in tree.children] == [".gitignore", "src"]
+    assert sorted(scanned) == [".", "src"]
+
+def test_scan_files_keeps_regular_files(tmp_path):
+    _write(tmp_path, "dir/file.txt", "abc")
+    nodes = scan_files([str(tmp_path / "dir" / "file.txt"), str(tmp_path / "dir"), str(tmp_path / "missing")])
+    assert [(node.name, node.rel_path, node.size) for node in nodes] == [("file.txt", "file.txt", 3)]
@@ -0,0 +1,89 @@
+import random
+import re
+
+import pytest
+
+from tree_copier.search import SearchIndex, compile_query, required_literals, search_segments
+
+@pytest.mark.parametrize('source, literals', [
+    ("handler", ["handler"]),
+    (r"def handler_\d+\(", ["def handler_", "("]),
+    ("colou?r", ["colo", "r"]),
+    ("ab*c", ["a", "c"]),
+    ("ab+c", ["ab", "c"]),
+    ("a.b", ["a", "b"]),
+    ("x{2,3}yz", ["yz"]),
+    (r"\x41BC", ["BC"]),
+    (r"\.py", [".py"]),
+    ("(foo|bar)baz", ["baz"]),
+    ("[abc]def", ["def"]),
+    ("[]a]def", ["def"]),
+    ("foo|bar", []),
+    ("^import os$", ["import os"]),
+])
+def test_required_literals(source, literals):
+    assert required_literals(re.compile(source)) == literals
+
+def test_required_literals_gives_none_in_verbose_mode():
+    assert required_literals(re.compile("abc  # comment", re.VERBOSE)) == []
+
+def test_plain_queries_are_escaped():
+    pattern = compile_query("a.b(")
+    assert pattern.search("x A.B( y")
+    assert not pattern.search("axb(")
+    assert not compile_query("A.B(", match_case=True).search("a.b(")
+    assert required_literals(pattern) == ["a.b("]
+
+def _index(files):
+    index = SearchIndex()
+    for name, text in files.items():
+        index.add(name, text)
+    return index
+
+def test_candidates_by_whole_word_prefix_suffix_and_part():
+    files = {"a": "def handler_one(request):\n", "b": "handler = None\n", "c": "unrelated text\n"}
+    index = _index(files)
+    assert index.candidates(["handler_one(request"]) == {"a"}  # "request" must start a word
+    assert index.candidates(["andler"]) == {"a", "b"}       # Part of a word
+    assert index.candidates(["UNRELATED"]) == {"c"}         # Case is folded
+    assert index.candidates(["missing"]) == set()
+    assert index.candidates(["ab"]) is None                 # Too short to narrow anything down
+    assert index.candidates([]) is None
+
+def test_readding_the_same_text_is_a_no_op_and_new_text_adds_words():
+    index = _index({"a": "alpha\n"})
+    index.add("a", "alpha\n")
+    assert len(index) == 1 and "a" in index and "b" not in index
+    index.add("a", "beta\n")
+    assert index.candidates(["beta"]) == {"a"}
+    index.clear()
+    assert len(index) == 0
+
+def test_candidates_never_miss_a_match():
+    # Brute force: every file a query matches must be among its candidates
+    rng = random.Random(7)
+    words = ["alpha", "beta", "gamma_1", "Delta", "x", "foo.bar", "café", "(", ")", " ", "\n", "-"]
+    files = {f"f{i}": "".join(rng.choice(words) for _ in range(rng.randint(0, 40))) for i in range(60)}
+    index = _index(files)
+    queries = ["alpha", "pha be", "gamma_1(", "delta", "foo.bar", "o.ba", "café", "ta\nal", r"gam+a_\d", r"a\(\)"]
+    for query in queries:
+        pattern = compile_query(query, regex='\\' in query)
+        candidates = index.candidates(required_literals(pattern))
+        matching = {name for name, text in files.items() if pattern.search(text)}
+        assert candidates is None or matching <= candidates, query
+
+def test_search_segments_reports_one_hit_per_line():
+    files = [("a.py", "x = 1\nfoo foo\nbar\n"), ("b.py", "foo\n")]
+    hits, total = search_segments(compile_query("foo"), files)
+    assert total == 2  # Matching lines, not matches
+    assert [(hit.name, hit.line, hit.column, hit.text) for hit in hits] == [
+        ("a.py", 2, 0, "foo foo"), ("b.py", 1, 0, "foo")]
+
+def test_search_segments_limits_and_candidates():
+    files = [("a", "foo\n" * 5), ("b", "foo\n")]
+    hits, total = search_segments(compile_query("foo"), files, max_results=2)
+    assert len(hits) == 2 and total == 6
+    hits, total = search_segments(compile_query("foo"), files, candidates={"b"})
+    assert [hit.name for hit in hits] == ["b"] and total == 1
+    hits, total = search_segments(compile_query("foo"), files, cancelled=lambda: True)
+    assert hits == [] and total == 0
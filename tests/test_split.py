@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from tree_copier.split import PartWriter, part_path
+
+def _parts(paths):
+    result = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            result.append(f.read())
+    return result
+
+def test_part_path():
+    assert part_path(os.path.join("out", "bundle.txt"), 7) == os.path.join("out", "bundle.part007.txt")
+
+def test_needs_a_limit(tmp_path):
+    with pytest.raises(ValueError):
+        PartWriter(str(tmp_path / "b.txt"))
+
+def test_files_that_fit_stay_whole(tmp_path):
+    out = str(tmp_path / "b.txt")
+    writer = PartWriter(out, max_bytes=40, header="H\n", footer="F\n")
+    writer.write_file("a", "1234567890\n")    # 24 bytes with its marker
+    writer.write_file("b", "1234567890\n")    # Doesn't fit next to a: a new part
+    writer.write_file("c", "x\n")             # Fits next to b, after a blank line
+    parts = _parts(writer.close())
+    assert parts == ["H\n⚫ a:\n1234567890\nF\n", "H\n⚫ b:\n1234567890\n\n⚫ c:\nx\nF\n"]
+    assert all(len(part.encode('utf-8')) <= 40 for part in parts)
+
+def test_oversized_file_is_split_on_lines(tmp_path):
+    out = str(tmp_path / "b.txt")
+    lines = [f"line {i:02}\n" for i in range(12)]
+    writer = PartWriter(out, max_bytes=40)
+    writer.write_file("big", "".join(lines))
+    parts = _parts(writer.close())
+    assert len(parts) > 1
+    assert all(len(part.encode('utf-8')) <= 40 for part in parts)
+    assert parts[0].startswith("⚫ big:\n")
+    assert all(part.startswith("⚫ big (continued):\n") for part in parts[1:])
+    body = "".join(part.split(":\n", 1)[1] for part in parts)
+    assert body == "".join(lines)
+
+def test_a_line_longer_than_the_limit_gets_a_part_of_its_own(tmp_path):
+    out = str(tmp_path / "b.txt")
+    writer = PartWriter(out, max_bytes=20)
+    writer.write_file("a", "short\n" + "y" * 50 + "\n")
+    parts = _parts(writer.close())
+    assert parts == ["⚫ a:\nshort\n", "⚫ a (continued):\n" + "y" * 50 + "\n"]
+
+def test_tree_lines_are_cut_between_lines(tmp_path):
+    out = str(tmp_path / "b.txt")
+    writer = PartWriter(out, max_bytes=10)
+    writer.write_lines(["abcd\n", "efgh\n", "ijkl\n"])
+    assert _parts(writer.close()) == ["abcd\nefgh\n", "ijkl\n"]
+
+def test_token_limit_and_empty_export(tmp_path):
+    out = str(tmp_path / "b.txt")
+    with PartWriter(out, max_tokens=1000) as writer:
+        paths = writer.close()
+    assert _parts(paths) == [""]
+    segment_tokens = PartWriter(out, max_tokens=1).measure("⚫ a:\nsome words here\n")
+    writer = PartWriter(out, max_tokens=segment_tokens + 1)  # One file per part
+    for name in "abc":
+        writer.write_file(name, "some words here\n")
+    assert len(writer.close()) == 3
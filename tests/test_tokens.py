@@ -0,0 +1,40 @@
+from tree_copier import tokens
+from tree_copier.scan import TreeNode
+from tree_copier.tokens import TokenCounter, estimate_tokens, fit_to_budget, format_tokens
+
+def _node(name, mtime):
+    return TreeNode(name, name, name, False, size=1, mtime=mtime)
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("def main():\n    return 42\n") == 9
+    assert estimate_tokens("internationalization") == 3  # Runs of up to eight letters
+
+def test_format_tokens():
+    assert [format_tokens(n) for n in (999, 1000, 15300, 2500000)] == ["999", "1.0k", "15.3k", "2.5M"]
+
+def test_counts_are_reused(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tokens, "estimate_tokens", lambda text: calls.append(text) or len(text))
+    counter = TokenCounter()
+    text = "".join(["same ", "text"])
+    assert counter.count(text) == 9
+    assert counter.count("same text") == 9  # Equal text, another object
+    assert counter.count_segment("a.py", text) == len("⚫ a.py:\n") + 9
+    assert calls == ["same text", "⚫ a.py:\n"]
+
+def test_fit_to_budget_keeps_whole_files():
+    nodes = [_node("old_big", 1), _node("new_big", 3), _node("small", 2)]
+    counts = {"old_big": 6, "new_big": 7, "small": 3}
+    # Newest first: new_big (7) fits, old_big (6) would cross 10 and is passed over, small (3) fills the rest
+    chosen, used = fit_to_budget(nodes, counts, budget=10)
+    assert [node.rel_path for node in chosen] == ["new_big", "small"]
+    assert used == 10
+
+def test_fit_to_budget_prefers_matches_and_skips_uncounted():
+    nodes = [_node("a", 1), _node("b", 2), _node("c", 3)]
+    counts = {"a": 5, "b": 5}
+    chosen, used = fit_to_budget(nodes, counts, budget=5, preferred=lambda node: node.rel_path == "a")
+    assert [node.rel_path for node in chosen] == ["a"] and used == 5
+    chosen, used = fit_to_budget(nodes, counts, budget=100)
+    assert [node.rel_path for node in chosen] == ["a", "b"] and used == 10
@@ -0,0 +1,53 @@
+import os
+
+from tree_copier.scan import scan_directory
+from tree_copier.watch import diff_trees
+
+def _write(root, rel_path, text=""):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+def _names(nodes):
+    return sorted(node.rel_path.replace(os.sep, "/") for node in nodes)
+
+def test_no_changes(tmp_path):
+    _write(tmp_path, "a/b.txt", "b")
+    assert not diff_trees(scan_directory(str(tmp_path)), scan_directory(str(tmp_path)))
+
+def test_added_removed_and_modified_files(tmp_path):
+    for rel_path in ["keep.txt", "edit.txt", "gone.txt", "old/x.txt", "sub/deep/y.txt"]:
+        _write(tmp_path, rel_path, "v1")
+    old = scan_directory(str(tmp_path))
+
+    _write(tmp_path, "edit.txt", "version 2")
+    os.remove(tmp_path / "gone.txt")
+    os.remove(tmp_path / "old" / "x.txt")
+    os.rmdir(tmp_path / "old")
+    _write(tmp_path, "new.txt", "n")
+    _write(tmp_path, "fresh/z.txt", "z")
+    _write(tmp_path, "sub/deep/w.txt", "w")
+    changes = diff_trees(old, scan_directory(str(tmp_path)))
+
+    assert _names(changes.added) == ["fresh/z.txt", "new.txt", "sub/deep/w.txt"]
+    assert _names(changes.removed) == ["gone.txt", "old/x.txt"]
+    assert [(o.rel_path, n.size) for o, n in changes.modified] == [("edit.txt", 9)]
+    assert [new_dir.rel_path.replace(os.sep, "/") for _, new_dir in changes.changed_dirs] == ["", "sub/deep"]
+
+def test_changed_directories_come_before_their_descendants(tmp_path):
+    _write(tmp_path, "a/b/c/file.txt")
+    old = scan_directory(str(tmp_path))
+    for rel_path in ["top.txt", "a/one.txt", "a/b/two.txt", "a/b/c/three.txt"]:
+        _write(tmp_path, rel_path)
+    changes = diff_trees(old, scan_directory(str(tmp_path)))
+    order = [new_dir.rel_path.replace(os.sep, "/") for _, new_dir in changes.changed_dirs]
+    assert order == ["", "a", "a/b", "a/b/c"]
+
+def test_file_replaced_by_a_directory(tmp_path):
+    _write(tmp_path, "thing", "file")
+    old = scan_directory(str(tmp_path))
+    os.remove(tmp_path / "thing")
+    _write(tmp_path, "thing/inner.txt")
+    changes = diff_trees(old, scan_directory(str(tmp_path)))
+    assert _names(changes.removed) == ["thing"]
+    assert _names(changes.added) == ["thing/inner.txt"]
@@ -0,0 +1,51 @@
+"""GUI-free core of File Content-Tree Copier: scanning, reading and formatting the aggregate.
+
+Nothing here imports tkinter, so it can run in CI jobs and pre-commit hooks:
+
+    python -m tree_copier DIR --ext .py --out bundle.txt
+"""
+from .bundle import (
+    CONTENTS_HEADER, TREE_HEADER, iter_bundle_files, iter_bundle_segments, iter_tree_lines, iter_tree_section,
+    matches_extensions, write_bundle, write_bundle_archive, write_bundle_jsonl, write_split_bundle,
+)
+from .cache import DEFAULT_CACHE_BUDGET, CachedFile, ContentCache
+from .content import INSERT_CHUNK_CHARS, AggregateContent, format_segments
+from .dedup import DEDUP_MIN_CHARS, ContentHashes, duplicate_text, iter_deduplicated
+from .encoding import (
+    DEFAULT_FALLBACK_ENCODINGS, decode_bytes, decodes_the_same, detect_encoding, normalize_encodings,
+)
+from .formats import ARCHIVE_FORMATS, export_format, open_text_output, write_archive, write_jsonl
+from .grep import ContentFilter, iter_matching, prune_tree
+from .ignore import DEFAULT_EXCLUDES, IgnoreRules, PatternList
+from .index import DirectoryIndex, default_index_dir
+from .jobs import (
+    DEFAULT_JOB_WORKERS, PRIORITY_BACKGROUND, PRIORITY_CONTENT, PRIORITY_TREE, Job, JobCancelled, JobScheduler,
+)
+from .pool import DEFAULT_DECODE_PROCESSES, POOL_MIN_BYTES, POOL_MIN_FILES, DecodePool
+from .profile import LOAD_STAGES, LoadProfile
+from .reader import (
+    BINARY_FILE_TEXT, DEFAULT_READ_WORKERS, IGNORED_EXTENSIONS, MAX_FILE_SIZE, SkipReport, SkippedFile, format_size,
+    is_ignored_file, read_file_text, read_files_parallel, sniff_binary,
+)
+from .scan import TreeNode, iter_tree_files, scan_directory, scan_files
+from .search import MAX_SEARCH_RESULTS, SearchHit, SearchIndex, compile_query, required_literals, search_segments
+from .split import PartWriter, part_path
+from .tokens import TokenCounter, estimate_tokens, fit_to_budget, format_tokens
+from .watch import TreeChanges, diff_trees
+
+__all__ = [
+    'CONTENTS_HEADER', 'TREE_HEADER', 'iter_bundle_files', 'iter_bundle_segments', 'iter_tree_lines',
+    'iter_tree_section', 'matches_extensions', 'write_bundle', 'write_bundle_archive', 'write_bundle_jsonl',
+    'write_split_bundle', 'DEFAULT_CACHE_BUDGET', 'CachedFile', 'ContentCache', 'INSERT_CHUNK_CHARS',
+    'AggregateContent', 'format_segments', 'DEDUP_MIN_CHARS', 'ContentHashes', 'duplicate_text', 'iter_deduplicated',
+    'DEFAULT_FALLBACK_ENCODINGS', 'decode_bytes', 'decodes_the_same', 'detect_encoding', 'normalize_encodings',
+    'ARCHIVE_FORMATS', 'export_format', 'open_text_output', 'write_archive', 'write_jsonl', 'ContentFilter',
+    'iter_matching', 'prune_tree', 'DEFAULT_EXCLUDES', 'IgnoreRules', 'PatternList', 'DirectoryIndex',
+    'default_index_dir', 'DEFAULT_JOB_WORKERS', 'PRIORITY_BACKGROUND', 'PRIORITY_CONTENT', 'PRIORITY_TREE', 'Job',
+    'JobCancelled', 'JobScheduler', 'DEFAULT_DECODE_PROCESSES', 'POOL_MIN_BYTES', 'POOL_MIN_FILES', 'DecodePool',
+    'LOAD_STAGES', 'LoadProfile', 'BINARY_FILE_TEXT', 'DEFAULT_READ_WORKERS', 'IGNORED_EXTENSIONS', 'MAX_FILE_SIZE',
+    'SkipReport', 'SkippedFile', 'format_size', 'is_ignored_file', 'read_file_text', 'read_files_parallel',
+    'sniff_binary', 'TreeNode', 'iter_tree_files', 'scan_directory', 'scan_files', 'MAX_SEARCH_RESULTS', 'SearchHit',
+    'SearchIndex', 'compile_query', 'required_literals', 'search_segments', 'PartWriter', 'part_path', 'TokenCounter',
+    'estimate_tokens', 'fit_to_budget', 'format_tokens', 'TreeChanges', 'diff_trees',
+]
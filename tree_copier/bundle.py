@@ -0,0 +1,137 @@
+from .content import format_segments
+from .dedup import ContentHashes, iter_deduplicated
+from .formats import write_archive, write_jsonl
+from .grep import iter_matching
+from .reader import DEFAULT_READ_WORKERS, SkipReport, is_ignored_file, read_files_parallel
+from .scan import iter_tree_files
+from .split import PartWriter
+
+# First line of the tree for a directory, as shown in the app
+TREE_HEADER = "The Contents"
+
+# Start of the contents section of an export
+CONTENTS_HEADER = "=== File Contents ===\n\n"
+
+def iter_tree_lines(directory, icon_for=None, prefix=""):
+    """Yield (display_text, node) for everything under directory, drawn with box characters.
+
+    icon_for(node) returns the icon placed before each name; without it the
+    lines match the app's cleaned "Copy Tree" text.
+    """
+    items = directory.children
+    for index, node in enumerate(items):
+        is_last = index == len(items) - 1
+        display_prefix = '└── ' if is_last else '├── '
+        icon = f"{icon_for(node)} " if icon_for else ""
+        yield f"{prefix}{display_prefix}{icon}{node.name}", node
+
+        if node.is_dir:
+            next_prefix = prefix + ('    ' if is_last else '│   ')
+            yield from iter_tree_lines(node, icon_for, next_prefix)
+
+def matches_extensions(node, extensions):
+    """Whether a file node passes an extension filter (None or empty lets everything through)"""
+    return not extensions or node.name.lower().endswith(tuple(extensions))
+
+def iter_bundle_files(tree, extensions=None, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None,
+                      dedupe=False, hashes=None, profile=None, pool=None, encodings=None, content_filter=None,
+                      search_index=None):
+    """Yield (node, content) for the files of a scanned tree that go into the aggregate.
+
+    With dedupe, files identical to an earlier one get a short reference
+    instead of their content (hashes is a ContentHashes to reuse across loads).
+    A LoadProfile as profile records the reads; a DecodePool as pool decodes
+    large trees in worker processes. encodings is the fallback chain for
+    files that aren't UTF-8. With a ContentFilter as content_filter, only
+    the files whose content matches it are yielded, as they are read; files
+    a SearchIndex as search_index rules out for it aren't read at all.
+    """
+    files = (
+        node for node in iter_tree_files(tree)
+        if not is_ignored_file(node.name) and matches_extensions(node, extensions)
+    )
+    if content_filter is not None and search_index is not None:
+        files = content_filter.prefilter(files, search_index)
+    if dedupe or content_filter is not None:
+        skipped = skipped if skipped is not None else SkipReport()
+    if dedupe:
+        hashes = hashes if hashes is not None else ContentHashes()
+    if pool is not None:
+        files = pool.read_files(files, workers, cache, index, skipped, profile, hashes, encodings)
+    else:
+        files = read_files_parallel(files, workers, cache, index, skipped, profile, encodings)
+    if content_filter is not None:
+        files = iter_matching(files, content_filter, skipped)
+    if dedupe:
+        return iter_deduplicated(files, hashes, index, skipped)
+    return files
+
+def iter_bundle_segments(tree, extensions=None, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None,
+                         dedupe=False, hashes=None, profile=None, pool=None, encodings=None, content_filter=None,
+                         search_index=None):
+    """Yield (relative_path, content) for the files of a scanned tree that go into the aggregate"""
+    for node, content in iter_bundle_files(tree, extensions, workers, cache, index, skipped, dedupe, hashes, profile,
+                                           pool, encodings, content_filter, search_index):
+        yield node.rel_path, content
+
+def iter_tree_section(tree, extensions=None, include_contents=True):
+    """Yield the "=== File Structure ===" part of the export, a line at a time"""
+    yield "=== File Structure ===\n\n"
+    yield TREE_HEADER
+    for line, node in iter_tree_lines(tree):
+        # Directories stay, like the app's extension filter
+        if node.is_dir or matches_extensions(node, extensions):
+            yield "\n" + line
+    if include_contents:
+        yield "\n\n"
+
+def write_bundle(out, tree, extensions=None, include_tree=True, include_contents=True,
+                 workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None, dedupe=False, profile=None,
+                 pool=None, encodings=None):
+    """Write the export format (tree, then '⚫ path:' contents) to a text stream as files are read"""
+    if include_tree:
+        out.writelines(iter_tree_section(tree, extensions, include_contents))
+
+    if include_contents:
+        out.write(CONTENTS_HEADER)
+        segments = iter_bundle_segments(tree, extensions, workers, cache, index, skipped, dedupe, profile=profile,
+                                        pool=pool, encodings=encodings)
+        for part in format_segments(segments):
+            out.write(part)
+
+def write_split_bundle(out_path, tree, max_bytes=None, max_tokens=None, extensions=None, include_tree=True,
+                       include_contents=True, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None,
+                       dedupe=False, header="", footer="", profile=None, pool=None, encodings=None):
+    """Write the export into numbered parts next to out_path (see PartWriter) and return their paths"""
+    with PartWriter(out_path, max_bytes, max_tokens, header, footer) as writer:
+        if include_tree:
+            writer.write_lines(iter_tree_section(tree, extensions, include_contents))
+
+        if include_contents:
+            writer.write_lines([CONTENTS_HEADER])
+            segments = iter_bundle_segments(tree, extensions, workers, cache, index, skipped, dedupe, profile=profile,
+                                            pool=pool, encodings=encodings)
+            for name, content in segments:
+                writer.write_file(name, content)
+        return writer.close()
+
+def write_bundle_jsonl(out, tree, extensions=None, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None,
+                       dedupe=False, profile=None, pool=None, encodings=None):
+    """Write one JSON record per file (see write_jsonl) to a text stream as files are read"""
+    skipped = skipped if skipped is not None else SkipReport()
+    write_jsonl(out, (
+        (node.rel_path, node.size, content, skipped.reason_for(node.rel_path), skipped.encoding_for(node.rel_path))
+        for node, content in iter_bundle_files(tree, extensions, workers, cache, index, skipped, dedupe,
+                                               profile=profile, pool=pool, encodings=encodings)
+    ))
+
+def write_bundle_archive(file_path, tree, fmt=None, extensions=None, workers=DEFAULT_READ_WORKERS, cache=None,
+                         index=None, skipped=None, profile=None, pool=None, encodings=None):
+    """Write the text files of a tree into a tar or zip archive as they are read; skipped files are left out"""
+    skipped = skipped if skipped is not None else SkipReport()
+    write_archive(file_path, (
+        (node.rel_path, node.mtime, content)
+        for node, content in iter_bundle_files(tree, extensions, workers, cache, index, skipped, profile=profile,
+                                               pool=pool, encodings=encodings)
+        if skipped.reason_for(node.rel_path) is None
+    ), fmt)
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+# Approximate size (in characters of decoded text) of file contents kept in memory
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024
+
+class CachedFile:
+    __slots__ = ('text', 'line_count', 'mtime', 'size', 'skip_reason', 'encoding')
+
+    def __init__(self, text, line_count, mtime, size, skip_reason=None, encoding=None):
+        self.text = text
+        self.line_count = line_count
+        self.mtime = mtime
+        self.size = size
+        self.skip_reason = skip_reason  # Why the file was left out, for binary files
+        self.encoding = encoding  # What the text was decoded from
+
+class ContentCache:
+    """Decoded file contents keyed by path, evicting least recently used files over budget"""
+    def __init__(self, budget=DEFAULT_CACHE_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Shared by the reader threads
+
+    def get(self, file_path):
+        """Return the cached file without checking the disk, or None"""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                self._entries.move_to_end(file_path)
+            return entry
+
+    def get_fresh(self, file_path, mtime, size):
+        """Return the cached file if it still has this mtime and size, or None"""
+        entry = self.get(file_path)
+        if entry is not None and entry.mtime == mtime and entry.size == size:
+            return entry
+        return None
+
+    def put(self, file_path, text, mtime, size, skip_reason=None, line_count=None, encoding=None):
+        if line_count is None:
+            line_count = text.count('\n')
+        entry = CachedFile(text, line_count, mtime, size, skip_reason, encoding)
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self.used -= len(old.text)
+            if len(text) > self.budget:
+                return entry  # Never worth evicting everything else for
+            self._entries[file_path] = entry
+            self.used += len(text)
+            while self.used > self.budget:
+                _, evicted = self._entries.popitem(last=False)
+                self.used -= len(evicted.text)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
@@ -0,0 +1,177 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+from .bundle import iter_bundle_files, write_bundle, write_bundle_archive, write_bundle_jsonl, write_split_bundle
+from .cache import ContentCache
+from .encoding import DEFAULT_FALLBACK_ENCODINGS, normalize_encodings
+from .formats import ARCHIVE_FORMATS, export_format, open_text_output
+from .grep import ContentFilter, prune_tree
+from .ignore import IgnoreRules
+from .index import DirectoryIndex
+from .pool import DecodePool
+from .profile import LoadProfile
+from .reader import DEFAULT_READ_WORKERS, SkipReport, format_size
+from .scan import scan_directory
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m tree_copier",
+        description="Write a directory's tree and file contents in the File Content-Tree Copier export format.",
+    )
+    parser.add_argument("directory", help="directory to aggregate")
+    parser.add_argument("--ext", action="append", metavar="EXT",
+                        help="only include files with this extension, e.g. .py (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="leave out paths matching this gitignore-style pattern (repeatable)")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="only keep files matching this glob, or 're:REGEX' (repeatable)")
+    parser.add_argument("--grep", action="append", metavar="PATTERN",
+                        help="only include files whose content contains PATTERN, in the tree and the contents "
+                             "(repeatable; files matching any of them are kept)")
+    parser.add_argument("--grep-all", action="store_true", help="keep only files matching every --grep pattern")
+    parser.add_argument("--grep-regex", action="store_true", help="--grep patterns are regular expressions")
+    parser.add_argument("--grep-case", action="store_true", help="match --grep patterns case-sensitively")
+    parser.add_argument("--no-gitignore", action="store_true", help="don't honour .gitignore files")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="also walk .git, node_modules, virtualenvs, caches and build output")
+    parser.add_argument("--out", metavar="FILE",
+                        help="write to FILE instead of stdout; .gz and .xz are compressed, .jsonl writes one JSON "
+                             "record per file, .tar, .tar.gz, .tar.xz and .zip archive the text files")
+    split = parser.add_mutually_exclusive_group()
+    split.add_argument("--split-bytes", type=int, metavar="N",
+                       help="with --out, write numbered parts of at most N bytes each (FILE.part001.txt, ...)")
+    split.add_argument("--split-tokens", type=int, metavar="N",
+                       help="with --out, write numbered parts of at most about N tokens each")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="replace the content of files identical to an earlier one with a reference to it")
+    parser.add_argument("--encoding", action="append", metavar="ENC",
+                        help="decode files that aren't UTF-8 and have no BOM with ENC, trying each one given in "
+                             f"turn (repeatable; default: {', '.join(DEFAULT_FALLBACK_ENCODINGS)}; "
+                             "--encoding utf-8 skips them instead)")
+    parser.add_argument("--no-tree", action="store_true", help="leave out the tree structure")
+    parser.add_argument("--no-contents", action="store_true", help="leave out the file contents")
+    parser.add_argument("--workers", type=int, default=DEFAULT_READ_WORKERS,
+                        help=f"threads reading files concurrently (default: {DEFAULT_READ_WORKERS})")
+    parser.add_argument("--processes", type=int, default=0, metavar="N",
+                        help="decode and hash large trees in N worker processes (default: off)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="don't use or update the on-disk index that skips rereading unchanged files")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write the timings of the scan, reads and decoding, and the slowest files, as JSON")
+    return parser
+
+def normalize_extension(ext):
+    ext = ext.lower()
+    return ext if ext.startswith('.') else '.' + ext
+
+def report_skipped(skipped):
+    """List the files left out of the contents, and those that weren't UTF-8, on stderr"""
+    for path, encoding in sorted(skipped.encodings.items()):
+        print(f"decoded {path} as {encoding}", file=sys.stderr)
+    for skipped_file in sorted(skipped, key=lambda skipped_file: skipped_file.path):
+        size = format_size(skipped_file.size) if skipped_file.size is not None else "unknown size"
+        print(f"skipped {skipped_file.path}: {skipped_file.reason} ({size})", file=sys.stderr)
+    if len(skipped):
+        print(f"{len(skipped)} file(s) skipped, {format_size(skipped.total_size())} in total", file=sys.stderr)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    if args.no_tree and args.no_contents:
+        parser.error("nothing to write with both --no-tree and --no-contents")
+    fmt = export_format(args.out) if args.out else 'text'
+    split_limit = args.split_bytes or args.split_tokens
+    if split_limit is not None:
+        if not args.out:
+            parser.error("--split-bytes and --split-tokens need --out")
+        if split_limit <= 0:
+            parser.error("the part size must be positive")
+        if fmt != 'text':
+            parser.error("only plain text exports can be split")
+    if fmt == 'jsonl' or fmt in ARCHIVE_FORMATS:
+        if args.no_contents:
+            parser.error(f"a {fmt} export holds the file contents, it can't be written with --no-contents")
+    if args.dedupe and fmt in ARCHIVE_FORMATS:
+        parser.error("archives hold every file whole, --dedupe doesn't apply")
+    extensions = [normalize_extension(ext) for ext in args.ext] if args.ext else None
+    try:
+        encodings = normalize_encodings(args.encoding) if args.encoding else DEFAULT_FALLBACK_ENCODINGS
+    except LookupError as e:
+        parser.error(str(e))
+
+    try:
+        rules = IgnoreRules(args.exclude, args.include, use_gitignore=not args.no_gitignore,
+                            use_defaults=not args.no_default_excludes)
+    except re.error as e:
+        parser.error(f"invalid include pattern: {e}")
+    content_filter = None
+    if args.grep:
+        try:
+            content_filter = ContentFilter(args.grep, args.grep_all, args.grep_regex, args.grep_case)
+        except (ValueError, re.error) as e:
+            parser.error(f"invalid --grep pattern: {e}")
+    profile = LoadProfile(args.directory) if args.profile else None
+    started = time.perf_counter()
+    tree = scan_directory(args.directory, rules)
+    if profile is not None:
+        profile.add('scan', time.perf_counter() - started)
+    index = None
+    if not args.no_index and not args.no_contents:
+        index = DirectoryIndex.open_for(args.directory)
+    options = dict(
+        extensions=extensions,
+        workers=args.workers,
+        index=index,
+        skipped=SkipReport(),
+        profile=profile,
+        pool=DecodePool(args.processes) if args.processes > 1 else None,
+        encodings=encodings,
+    )
+    sections = dict(include_tree=not args.no_tree, include_contents=not args.no_contents, dedupe=args.dedupe)
+    completed = False
+    try:
+        if content_filter is not None:
+            # Find the matching files first, the tree only lists those; their texts are kept for writing
+            options['cache'] = ContentCache()
+            matched = {
+                node.rel_path for node, _ in iter_bundle_files(tree, extensions, args.workers, options['cache'], index,
+                                                               profile=profile, pool=options['pool'],
+                                                               encodings=encodings, content_filter=content_filter)
+            }
+            tree = prune_tree(tree, lambda node: node.rel_path in matched)
+        if fmt in ARCHIVE_FORMATS:
+            write_bundle_archive(args.out, tree, fmt, **options)
+        elif fmt == 'jsonl':
+            with open_text_output(args.out, fmt) as f:
+                write_bundle_jsonl(f, tree, dedupe=args.dedupe, **options)
+        elif split_limit:
+            paths = write_split_bundle(args.out, tree, args.split_bytes, args.split_tokens, **sections, **options)
+            print(f"wrote {len(paths)} part(s): {paths[0]} ... {paths[-1]}" if len(paths) > 1
+                  else f"wrote {paths[0]}", file=sys.stderr)
+        elif args.out:
+            with open_text_output(args.out, fmt) as f:
+                write_bundle(f, tree, **sections, **options)
+        else:
+            if hasattr(sys.stdout, 'reconfigure'):
+                sys.stdout.reconfigure(encoding='utf-8')
+            write_bundle(sys.stdout, tree, **sections, **options)
+        completed = True
+    finally:
+        if index is not None:
+            # A filtered or interrupted run only saw part of the tree, so keep the other entries
+            index.save(prune=completed and extensions is None)
+            index.close()
+        if options['pool'] is not None:
+            options['pool'].close()
+    report_skipped(options['skipped'])
+    if profile is not None:
+        profile.count('skipped', len(options['skipped']))
+        profile.finish()
+        profile.dump(args.profile)
+    return 0
@@ -0,0 +1,128 @@
+import os
+
+# Largest piece of text handed to a single Text.insert call
+INSERT_CHUNK_CHARS = 1 << 20
+
+def format_segments(segments):
+    """Yield the text parts of the aggregate for (name, content) pairs, without keeping them"""
+    for index, (name, content) in enumerate(segments):
+        if index:  # If not the first file
+            yield "\n"
+        yield f"⚫ {name}:\n"  # Add dot marker before filename
+        yield content
+
+class AggregateContent:
+    """The aggregated text kept as per-file segments, joined as
+    "⚫ name:" header + content with a blank line between files.
+
+    Header line numbers are recorded while the aggregate is built, so the
+    text never has to be re-parsed to find the file markers.
+    """
+    def __init__(self):
+        self.segments = []   # (name, content), content is newline-terminated
+        self.positions = []  # (line_number, name) of each file header
+        self.next_line = 1
+
+    def append(self, name, content, line_count=None):
+        """Add a file and return the text parts it contributes to the aggregate"""
+        parts = []
+        if self.segments:  # If not the first file
+            parts.append("\n")
+            self.next_line += 1
+
+        # Record the position and add file marker
+        self.positions.append((self.next_line, name))
+        parts.append(f"⚫ {name}:\n")
+        parts.append(content)
+        if line_count is None:
+            line_count = content.count('\n')
+        self.next_line += 1 + line_count
+        self.segments.append((name, content))
+        return parts
+
+    # Patching: each method updates the model and returns the edit
+    # (first_line, end_line, text) that brings a view of the old aggregate up
+    # to date: delete lines first_line up to (not including) end_line, then
+    # insert text at first_line. Later positions are shifted, not recomputed.
+
+    def _shift(self, start_index, delta):
+        for index in range(start_index, len(self.positions)):
+            line, name = self.positions[index]
+            self.positions[index] = (line + delta, name)
+        self.next_line += delta
+
+    def _content_lines(self, index):
+        first_line = self.positions[index][0] + 1
+        if index + 1 < len(self.positions):
+            return first_line, self.positions[index + 1][0] - 1
+        return first_line, self.next_line
+
+    def replace(self, index, content, line_count=None):
+        """Swap the content of the file at index"""
+        if line_count is None:
+            line_count = content.count('\n')
+        first_line, end_line = self._content_lines(index)
+        self.segments[index] = (self.segments[index][0], content)
+        self._shift(index + 1, line_count - (end_line - first_line))
+        return first_line, end_line, content
+
+    def insert(self, index, name, content, line_count=None):
+        """Add a file before the one currently at index (or at the end)"""
+        if line_count is None:
+            line_count = content.count('\n')
+        if index < len(self.segments):
+            line = self.positions[index][0]
+            text = f"⚫ {name}:\n{content}\n"
+            self._shift(index, line_count + 2)
+            self.positions.insert(index, (line, name))
+        else:
+            line = self.next_line
+            text = f"⚫ {name}:\n{content}"
+            header_line = line
+            if self.segments:
+                text = "\n" + text
+                header_line += 1
+            self.positions.append((header_line, name))
+            self.next_line = header_line + 1 + line_count
+        self.segments.insert(index, (name, content))
+        return line, line, text
+
+    def remove(self, index):
+        """Drop the file at index together with its separator line"""
+        header_line = self.positions[index][0]
+        if index + 1 < len(self.segments):
+            first_line, end_line = header_line, self.positions[index + 1][0]
+        elif index:
+            first_line, end_line = header_line - 1, self.next_line
+        else:
+            first_line, end_line = header_line, self.next_line
+        del self.segments[index]
+        del self.positions[index]
+        self._shift(index, first_line - end_line)
+        return first_line, end_line, ""
+
+    def iter_parts(self):
+        return format_segments(self.segments)
+
+    def iter_chunks(self, chunk_chars=INSERT_CHUNK_CHARS):
+        """Join the parts into strings of roughly chunk_chars each"""
+        buffer = []
+        size = 0
+        for part in self.iter_parts():
+            buffer.append(part)
+            size += len(part)
+            if size >= chunk_chars:
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+
+    def get_text(self):
+        return "".join(self.iter_parts())
+
+    def filename_to_line(self):
+        # Full paths last, so a basename never hides another file's path
+        mapping = {os.path.basename(name): line for line, name in self.positions}
+        mapping.update({name: line for line, name in self.positions})
+        return mapping
@@ -0,0 +1,46 @@
+import threading
+
+from .index import content_hash
+
+# Bodies shorter than this are kept even when repeated, the reference wouldn't be shorter
+DEDUP_MIN_CHARS = 100
+
+def duplicate_text(original):
+    """Body shown in place of a file identical to an earlier one"""
+    return f"(identical to {original})\n"
+
+class ContentHashes:
+    """Content hashes memoized by path, size and mtime, so repeat loads don't rehash unchanged files"""
+    def __init__(self):
+        self._hashes = {}  # path -> (size, mtime, hash)
+        self._lock = threading.Lock()
+
+    def hash_for(self, node, content, index=None):
+        entry = self._hashes.get(node.path)
+        if entry is not None and entry[0] == node.size and entry[1] == node.mtime and node.mtime is not None:
+            return entry[2]
+        text_hash = None
+        if index is not None and node.mtime is not None:
+            text_hash = index.hash_for(node.rel_path, node.mtime, node.size)  # Hashed when it was recorded
+        if text_hash is None:
+            text_hash = content_hash(content)
+        self.remember(node, text_hash)
+        return text_hash
+
+    def remember(self, node, text_hash):
+        """Record a hash computed elsewhere, e.g. by a DecodePool worker"""
+        with self._lock:
+            self._hashes[node.path] = (node.size, node.mtime, text_hash)
+
+def iter_deduplicated(files, hashes=None, index=None, skipped=None):
+    """Yield (node, content) for (node, content) pairs, replacing the body of a file identical to
+    an earlier one with a reference to it. Skipped files keep their placeholder.
+    """
+    hashes = hashes if hashes is not None else ContentHashes()
+    first_seen = {}  # hash -> rel_path of the copy that is kept
+    for node, content in files:
+        if len(content) >= DEDUP_MIN_CHARS and (skipped is None or skipped.reason_for(node.rel_path) is None):
+            original = first_seen.setdefault(hashes.hash_for(node, content, index), node.rel_path)
+            if original != node.rel_path:
+                content = duplicate_text(original)
+        yield node, content
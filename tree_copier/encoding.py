@@ -0,0 +1,103 @@
+import codecs
+
+# Tried in order for files that have no BOM and aren't UTF-8: cp1252 covers most
+# legacy Windows sources, and latin-1 maps every byte, so with it last no text
+# file is dropped for its encoding
+DEFAULT_FALLBACK_ENCODINGS = ('cp1252', 'latin-1')
+
+# Byte order marks, the UTF-32 ones first since UTF-32 LE starts like UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Encodings found from the bytes alone, whatever the fallback chain
+DETECTED_ENCODINGS = {'utf-8'} | {encoding for _, encoding in BOMS}
+
+# Encodings whose text is full of NUL bytes, so the binary sniff doesn't apply to them
+WIDE_ENCODINGS = {'utf-16-le', 'utf-16-be', 'utf-32-le', 'utf-32-be'}
+
+def normalize_encodings(names):
+    """Canonical codec names for a fallback chain, e.g. 'Latin1' -> 'latin-1'; raises LookupError for unknown ones.
+
+    UTF-8 is always tried first, so it is dropped from the chain.
+    """
+    encodings = []
+    for name in names:
+        encoding = codecs.lookup(name.strip()).name.replace('_', '-')
+        if encoding == 'iso8859-1':
+            encoding = 'latin-1'
+        if encoding != 'utf-8' and encoding not in encodings:
+            encodings.append(encoding)
+    return tuple(encodings)
+
+def undecodable_reason(fallbacks):
+    """Skip reason of a file that none of UTF-8 and the fallbacks can decode"""
+    if not fallbacks:
+        return "not UTF-8 text"
+    return f"not UTF-8 or {' / '.join(fallbacks)} text"
+
+def _utf16_without_bom(prefix):
+    # Mostly-ASCII UTF-16 has a NUL in every other byte and almost none in between
+    sample = prefix[:4096]
+    half = len(sample) // 2
+    if half < 2:
+        return None
+    even_nuls = sample[0::2].count(0)
+    odd_nuls = sample[1::2].count(0)
+    if odd_nuls > half * 0.6 and even_nuls < half * 0.05:
+        return 'utf-16-le'
+    if even_nuls > half * 0.6 and odd_nuls < half * 0.05:
+        return 'utf-16-be'
+    return None
+
+def detect_encoding(prefix):
+    """Return (encoding, bom_length) for a file starting with prefix when its bytes say which
+    encoding it is (a BOM, or UTF-16 without one), else (None, 0)"""
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+    return _utf16_without_bom(prefix), 0
+
+def _is_utf8_prefix(prefix):
+    try:
+        # Not final: the prefix may end in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def decode_bytes(data, fallbacks=DEFAULT_FALLBACK_ENCODINGS, prefix_bytes=8192):
+    """Decode file contents and return (text, encoding), without the BOM.
+
+    A BOM (or BOM-less UTF-16) decides the encoding. Otherwise UTF-8 is
+    tried, unless the first prefix_bytes already aren't valid UTF-8, then each
+    fallback in turn. Raises UnicodeDecodeError when nothing fits, or when
+    the detected encoding doesn't.
+    """
+    encoding, bom_length = detect_encoding(data[:prefix_bytes])
+    if encoding is not None:
+        # Raises when the bytes don't hold up, reinterpreting them would only give garbage
+        return data[bom_length:].decode(encoding), encoding
+
+    candidates = ('utf-8',) + tuple(fallbacks) if _is_utf8_prefix(data[:prefix_bytes]) else tuple(fallbacks)
+    for encoding in candidates:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    raise UnicodeDecodeError('utf-8', data, 0, len(data), undecodable_reason(fallbacks))
+
+def decodes_the_same(encoding, skip_reason, fallbacks):
+    """Whether a file read earlier with this outcome can be kept with the fallback chain fallbacks.
+
+    Text keeps its encoding while that is still detected from the bytes or in
+    the chain (the report says which one was used); a file nothing could
+    decode is read again once the chain is different.
+    """
+    if skip_reason is not None:
+        return not skip_reason.startswith("not UTF-8") or skip_reason == undecodable_reason(fallbacks)
+    return encoding is None or encoding in DETECTED_ENCODINGS or encoding in fallbacks
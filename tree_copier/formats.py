@@ -0,0 +1,90 @@
+import gzip
+import io
+import json
+import lzma
+import tarfile
+import time
+import zipfile
+
+# Export formats by file name suffix; the first match wins, anything else is plain text
+FORMAT_SUFFIXES = (
+    ('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'), ('.tar.xz', 'tar.xz'), ('.tar', 'tar'), ('.zip', 'zip'),
+    ('.jsonl', 'jsonl'), ('.gz', 'gzip'), ('.xz', 'xz'),
+)
+ARCHIVE_FORMATS = ('tar', 'tar.gz', 'tar.xz', 'zip')
+
+# Compression settings: fast enough to keep up with the reader threads
+GZIP_LEVEL = 6
+XZ_PRESET = 1
+ZIP_LEVEL = 6
+
+def export_format(file_path):
+    """The export format a file name asks for: 'text', 'gzip', 'xz', 'jsonl' or an archive format"""
+    name = file_path.lower()
+    for suffix, fmt in FORMAT_SUFFIXES:
+        if name.endswith(suffix):
+            return fmt
+    return 'text'
+
+def open_text_output(file_path, fmt=None):
+    """Open a text stream for a plain, gzip, xz or JSON Lines export, compressed as it is written.
+
+    zlib and lzma release the GIL, so compressing overlaps with the reader
+    threads that fetch the next files.
+    """
+    fmt = fmt or export_format(file_path)
+    if fmt == 'gzip':
+        return gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=GZIP_LEVEL)
+    if fmt == 'xz':
+        return lzma.open(file_path, 'wt', encoding='utf-8', preset=XZ_PRESET)
+    return open(file_path, 'w', encoding='utf-8')
+
+def write_jsonl(out, files):
+    """Write one JSON record per (path, size, content, skip_reason, encoding) to a text stream.
+
+    line is where the file's "⚫ path:" header sits in the contents section
+    of the text export; skipped files carry the reason and their placeholder,
+    and text that wasn't UTF-8 the encoding it was decoded from.
+    """
+    line = 1
+    for index, (path, size, content, skip_reason, encoding) in enumerate(files):
+        if index:  # Blank line between files
+            line += 1
+        record = {'path': path.replace('\\', '/'), 'size': size, 'line': line, 'content': content}
+        if skip_reason is not None:
+            record['skipped'] = skip_reason
+        elif encoding is not None and encoding != 'utf-8':
+            record['encoding'] = encoding
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write('\n')
+        line += 1 + content.count('\n')
+
+def _zip_date_time(mtime_ns):
+    # Zip timestamps start in 1980
+    seconds = mtime_ns / 1e9 if mtime_ns is not None else time.time()
+    return max(time.localtime(seconds)[:6], (1980, 1, 1, 0, 0, 0))
+
+def write_archive(file_path, files, fmt=None):
+    """Write (path, mtime_ns, content) files into a tar or zip archive as they come, one UTF-8 member each"""
+    fmt = fmt or export_format(file_path)
+    if fmt == 'zip':
+        with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL) as archive:
+            for path, mtime_ns, content in files:
+                info = zipfile.ZipInfo(path.replace('\\', '/'), _zip_date_time(mtime_ns))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, content.encode('utf-8'))
+        return
+
+    if fmt == 'tar.gz':
+        archive = tarfile.open(file_path, 'w:gz', compresslevel=GZIP_LEVEL)
+    elif fmt == 'tar.xz':
+        archive = tarfile.open(file_path, 'w:xz', preset=XZ_PRESET)
+    else:
+        archive = tarfile.open(file_path, 'w')
+    with archive:
+        for path, mtime_ns, content in files:
+            data = content.encode('utf-8')
+            info = tarfile.TarInfo(path.replace('\\', '/'))
+            info.size = len(data)
+            info.mtime = mtime_ns // 1000000000 if mtime_ns is not None else int(time.time())
+            archive.addfile(info, io.BytesIO(data))
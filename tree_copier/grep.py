@@ -0,0 +1,88 @@
+import re
+
+from .scan import TreeNode
+from .search import compile_query, required_literals
+
+class ContentFilter:
+    """Grep mode: keep the files whose content matches any (or, with match_all, every) pattern.
+
+    Patterns are plain text unless regex. Each pattern stops at its first
+    match in a file, and the patterns stop at the first one that decides.
+    Before a pattern runs, the literals every match of it contains are
+    looked for with a plain substring test, which rules most files out much
+    faster than the regex engine (ignoring case, it does a lot slower).
+    Raises ValueError without patterns and re.error for an invalid regex.
+    """
+    def __init__(self, patterns, match_all=False, regex=False, match_case=False):
+        self.sources = [pattern for pattern in patterns if pattern]
+        if not self.sources:
+            raise ValueError("no patterns to grep for")
+        self.patterns = [compile_query(pattern, regex, match_case) for pattern in self.sources]
+        self.match_all = match_all
+        self.regex = regex
+        self.match_case = match_case
+        self._literals = [required_literals(pattern) for pattern in self.patterns]
+        # Lowercasing finds the case-insensitive matches of ASCII literals in ASCII text; other
+        # characters have case-insensitive matches lower() doesn't give (e.g. "s" and "ſ")
+        self._lowered_literals = [
+            [literal.lower() for literal in literals] if all(literal.isascii() for literal in literals) else None
+            for literals in self._literals
+        ]
+
+    def matches(self, content):
+        test = all if self.match_all else any
+        lowered = []  # content.lower(), made once the first pattern needs it
+        return test(self._pattern_matches(i, content, lowered) for i in range(len(self.patterns)))
+
+    def _pattern_matches(self, i, content, lowered):
+        if not self.patterns[i].flags & re.IGNORECASE:  # A regex can turn it on with (?i)
+            if not all(literal in content for literal in self._literals[i]):
+                return False
+        elif self._lowered_literals[i] and content.isascii():
+            if not lowered:
+                lowered.append(content.lower())
+            if not all(literal in lowered[0] for literal in self._lowered_literals[i]):
+                return False
+        return self.patterns[i].search(content) is not None
+
+    def candidates(self, search_index):
+        """Names of the indexed files that can match, or None when the index can't rule any out"""
+        found = None
+        for literals in self._literals:
+            names = search_index.candidates(literals)
+            if self.match_all:
+                if names is not None:
+                    found = names if found is None else found & names
+            elif names is None:
+                return None  # This pattern could match in any file
+            else:
+                found = names if found is None else found | names
+        return found
+
+    def prefilter(self, nodes, search_index=None):
+        """The file nodes that can match: those a SearchIndex rules out are dropped without being read"""
+        candidates = self.candidates(search_index) if search_index is not None else None
+        if candidates is None:
+            return list(nodes)
+        # Files the index hasn't seen can match whatever it says
+        return [node for node in nodes if node.rel_path in candidates or node.rel_path not in search_index]
+
+def iter_matching(files, content_filter, skipped=None):
+    """Yield the (node, content) pairs whose content content_filter matches; skipped files never do"""
+    for node, content in files:
+        if skipped is not None and skipped.reason_for(node.rel_path) is not None:
+            continue  # Only a placeholder to match
+        if content_filter.matches(content):
+            yield node, content
+
+def prune_tree(root, keep):
+    """Copy of a scanned tree with only the files keep(node) accepts and the directories holding them"""
+    pruned = TreeNode(root.name, root.path, root.rel_path, True, root.size, root.mtime)
+    for child in root.children:
+        if child.is_dir:
+            pruned_child = prune_tree(child, keep)
+            if pruned_child.children:
+                pruned.children.append(pruned_child)
+        elif keep(child):
+            pruned.children.append(child)
+    return pruned
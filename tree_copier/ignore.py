@@ -0,0 +1,164 @@
+import os
+import re
+
+# Left out of every scan unless turned off: version control metadata,
+# dependencies, virtualenvs, caches and build output (gitignore syntax)
+DEFAULT_EXCLUDES = (
+    '.git', '.hg/', '.svn/',
+    'node_modules/', 'bower_components/',
+    'venv/', '.venv/',
+    '__pycache__/', '.mypy_cache/', '.pytest_cache/', '.ruff_cache/', '.tox/', '.nox/',
+    'build/', 'dist/', '*.egg-info/',
+)
+
+GITIGNORE_NAME = '.gitignore'
+
+# Include patterns starting with this are regular expressions, searched in the relative path
+REGEX_PREFIX = 're:'
+
+def translate_pattern(pattern):
+    """Regex source for one gitignore pattern (without '!' or trailing '/'),
+    matched against a '/'-separated path relative to the pattern's base"""
+    if pattern.startswith('/'):
+        pattern = pattern[1:]
+        anchored = True
+    else:
+        anchored = '/' in pattern
+    parts = [] if anchored else ['(?:.*/)?']  # A bare name matches at any depth
+
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                if i + 2 == n:
+                    parts.append('.*')
+                    i += 2
+                    continue
+                if pattern[i + 2] == '/':
+                    parts.append('(?:.*/)?')
+                    i += 3
+                    continue
+            parts.append('[^/]*')
+            while i < n and pattern[i] == '*':
+                i += 1
+            continue
+        if c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+class PatternList:
+    """Compiled gitignore-style patterns; the last matching pattern decides, '!' re-includes"""
+    def __init__(self, patterns):
+        self.rules = []  # (compiled, negated, dir_only)
+        for pattern in patterns:
+            pattern = pattern.rstrip('\r\n')
+            if not pattern.strip() or pattern.startswith('#'):
+                continue
+            if not pattern.endswith('\\ '):
+                pattern = pattern.rstrip(' ')
+            negated = pattern.startswith('!')
+            if negated:
+                pattern = pattern[1:]
+            elif pattern.startswith('\\!') or pattern.startswith('\\#'):
+                pattern = pattern[1:]
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if pattern:
+                self.rules.append((re.compile(translate_pattern(pattern) + '$'), negated, dir_only))
+
+        # Without negations the order doesn't matter: one alternation per kind
+        self._combined = None
+        if not any(negated for _, negated, _ in self.rules):
+            any_kind = [rule.pattern for rule, _, dir_only in self.rules if not dir_only]
+            dirs_only = [rule.pattern for rule, _, dir_only in self.rules if dir_only]
+            self._combined = (
+                re.compile('|'.join(f'(?:{p})' for p in any_kind)) if any_kind else None,
+                re.compile('|'.join(f'(?:{p})' for p in dirs_only)) if dirs_only else None,
+            )
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Patterns of a .gitignore file, or None if it can't be read or has none"""
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                patterns = cls(f)
+        except OSError:
+            return None
+        return patterns if patterns.rules else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, path, is_dir):
+        """True if path is ignored, False if re-included, None if no pattern applies"""
+        if self._combined is not None:
+            any_kind, dirs_only = self._combined
+            if (any_kind is not None and any_kind.match(path)) or \
+                    (is_dir and dirs_only is not None and dirs_only.match(path)):
+                return True
+            return None
+        for rule, negated, dir_only in reversed(self.rules):
+            if (is_dir or not dir_only) and rule.match(path):
+                return not negated
+        return None
+
+class IgnoreRules:
+    """What a directory scan leaves out, applied before descending so excluded
+    subtrees are never walked or read.
+
+    In order of precedence: the user's excludes, .gitignore files (the
+    deepest one first, each relative to its own directory), then
+    DEFAULT_EXCLUDES. includes, when given, keeps only files matching one of
+    the globs (or 're:' regexes) relative to the root; directories are
+    always descended into.
+    """
+    def __init__(self, excludes=(), includes=(), use_gitignore=True, use_defaults=True):
+        self.excludes = PatternList(excludes)
+        self.defaults = PatternList(DEFAULT_EXCLUDES if use_defaults else ())
+        self.use_gitignore = use_gitignore
+        self.include_globs = PatternList(p for p in includes if not p.startswith(REGEX_PREFIX))
+        self.include_regexes = [re.compile(p[len(REGEX_PREFIX):]) for p in includes if p.startswith(REGEX_PREFIX)]
+
+    def gitignores_for(self, dir_path, rel_path, parent_gitignores=()):
+        """The .gitignore lists in effect inside a directory: (base, PatternList), deepest last"""
+        if not self.use_gitignore:
+            return ()
+        patterns = PatternList.from_file(os.path.join(dir_path, GITIGNORE_NAME))
+        if patterns is None:
+            return parent_gitignores
+        base = rel_path.replace(os.sep, '/') + '/' if rel_path else ''
+        return parent_gitignores + ((base, patterns),)
+
+    def is_excluded(self, rel_path, is_dir, gitignores=()):
+        path = rel_path.replace(os.sep, '/')
+        if self.excludes.match(path, is_dir):
+            return True
+        for base, patterns in reversed(gitignores):
+            decision = patterns.match(path[len(base):], is_dir)
+            if decision is not None:
+                return decision
+        return bool(self.defaults.match(path, is_dir))
+
+    def is_included(self, rel_path):
+        """Whether a file passes the include patterns (everything does when there are none)"""
+        if not self.include_globs and not self.include_regexes:
+            return True
+        path = rel_path.replace(os.sep, '/')
+        return bool(self.include_globs.match(path, False)) or any(regex.search(path) for regex in self.include_regexes)
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+
+from .reader import skipped_file_text
+
+# Bump when the schema or the stored text format changes; old indexes are rebuilt
+INDEX_VERSION = 3
+
+# Pending compressed text written to the database once it grows past this
+FLUSH_BYTES = 32 * 1024 * 1024
+
+def default_index_dir():
+    """Per-user cache directory holding one index database per opened root"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'File Content-Tree Copier', 'index')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'file-content-tree-copier', 'index')
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+class DirectoryIndex:
+    """Persistent record of a root's files: relative path, size, mtime, text status (or why
+    the file was skipped), content hash and the encoding the text was decoded from.
+
+    Decoded text is stored once per distinct hash (zlib-compressed), so when a
+    directory is opened again only files whose size or mtime changed are read
+    from disk. Lookups and records are safe to call from the reader threads.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_schema()
+
+        # rel_path -> (size, mtime, is_text, hash, skip_reason, encoding), loaded up front so lookups are dict hits
+        self._files = {
+            rel_path: (size, mtime, bool(is_text), text_hash, skip_reason, encoding)
+            for rel_path, size, mtime, is_text, text_hash, skip_reason, encoding
+            in self._conn.execute("SELECT rel_path, size, mtime, is_text, hash, skip_reason, encoding FROM files")
+        }
+        self._pending_files = {}
+        self._pending_blobs = {}
+        self._pending_bytes = 0
+        self._seen = set()
+
+    @classmethod
+    def open_for(cls, root_path, index_dir=None):
+        """Open (or create) the index for root_path, or return None if it can't be stored"""
+        index_dir = index_dir or default_index_dir()
+        key = os.path.normcase(os.path.abspath(root_path))
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '.sqlite'
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            return cls(os.path.join(index_dir, name))
+        except (OSError, sqlite3.Error) as e:
+            print(f"Index unavailable for {root_path}: {e}")
+            return None
+
+    def _create_schema(self):
+        with self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != INDEX_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS files")
+                self._conn.execute("DROP TABLE IF EXISTS blobs")
+                self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "rel_path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, is_text INTEGER, hash TEXT, skip_reason TEXT, "
+                "encoding TEXT)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB)")
+
+    def __len__(self):
+        return len(self._files)
+
+    def lookup(self, rel_path, mtime, size):
+        """Return (body, skip_reason, encoding) stored for an unchanged file, or None if it has to be read"""
+        with self._lock:
+            self._seen.add(rel_path)
+            row = self._files.get(rel_path)
+            if row is None or row[0] != size or row[1] != mtime:
+                return None
+            if not row[2]:
+                return skipped_file_text(row[4], size), row[4], None  # Known binary, never reopened
+            data = self._pending_blobs.get(row[3])
+            if data is None:
+                found = self._conn.execute("SELECT data FROM blobs WHERE hash = ?", (row[3],)).fetchone()
+                if found is None:
+                    return None
+                data = found[0]
+        return zlib.decompress(data).decode('utf-8'), None, row[5]
+
+    def has(self, rel_path, mtime, size):
+        """Whether lookup() would find the file, without decompressing its text"""
+        with self._lock:
+            row = self._files.get(rel_path)
+        return row is not None and row[0] == size and row[1] == mtime
+
+    def hash_for(self, rel_path, mtime, size):
+        """Content hash stored for an unchanged text file, or None"""
+        with self._lock:
+            row = self._files.get(rel_path)
+        if row is None or row[0] != size or row[1] != mtime:
+            return None
+        return row[3]
+
+    def record(self, rel_path, mtime, size, text, skip_reason=None, text_hash=None, encoding=None):
+        """Remember a freshly read file; text is None for skipped files"""
+        if text is not None and text_hash is None:
+            text_hash = content_hash(text)
+        # Compress outside the lock, zlib releases the GIL
+        data = zlib.compress(text.encode('utf-8'), 1) if text is not None else None
+        with self._lock:
+            self._seen.add(rel_path)
+            row = (size, mtime, text is not None, text_hash, skip_reason, encoding)
+            self._files[rel_path] = row
+            self._pending_files[rel_path] = row
+            if data is not None and text_hash not in self._pending_blobs:
+                self._pending_blobs[text_hash] = data
+                self._pending_bytes += len(data)
+            if self._pending_bytes > FLUSH_BYTES:
+                self._flush()
+
+    def _flush(self):
+        # Caller holds the lock
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(rel_path, *row) for rel_path, row in self._pending_files.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?)",
+                list(self._pending_blobs.items()),
+            )
+        self._pending_files.clear()
+        self._pending_blobs.clear()
+        self._pending_bytes = 0
+
+    def save(self, prune=False):
+        """Write pending records; with prune, also forget files not looked up or recorded since opening"""
+        with self._lock:
+            self._flush()
+            if not prune:
+                return
+            gone = [(rel_path,) for rel_path in self._files if rel_path not in self._seen]
+            with self._conn:
+                self._conn.executemany("DELETE FROM files WHERE rel_path = ?", gone)
+                self._conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM files WHERE hash IS NOT NULL)")
+            for (rel_path,) in gone:
+                del self._files[rel_path]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
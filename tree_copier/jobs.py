@@ -0,0 +1,136 @@
+import itertools
+import queue
+import threading
+import time
+
+# Job priorities, lower runs first: a tree is shown before any contents are read
+PRIORITY_TREE = 0
+PRIORITY_CONTENT = 1
+PRIORITY_BACKGROUND = 2
+
+# Worker threads; a superseded job can still be winding down while the next one starts
+DEFAULT_JOB_WORKERS = 2
+
+class JobCancelled(Exception):
+    """Raised by Job.check() once the job has been cancelled"""
+
+class Job:
+    """A unit of background work, cancelled cooperatively: func(job) checks job.cancelled"""
+    def __init__(self, func, priority=PRIORITY_CONTENT, group=None):
+        self.func = func
+        self.priority = priority
+        self.group = group
+        self.done = threading.Event()
+        self._cancelled = threading.Event()
+        self._on_cancel = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._on_cancel = self._on_cancel, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Call callback when the job is cancelled, right away if it already is"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._on_cancel.append(callback)
+                return
+        callback()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+class JobScheduler:
+    """Run background jobs on a few worker threads, by priority, and hand their UI updates to the main loop.
+
+    Submitting a job in a group cancels the unfinished jobs already in it, so
+    a new load supersedes the previous one: queued jobs never start and
+    running ones stop at their next check. post(job, func) queues func for
+    the main loop, where run_posted() calls it unless the job has been
+    cancelled since, so a discarded load never touches the widgets.
+    """
+    def __init__(self, workers=DEFAULT_JOB_WORKERS):
+        self.workers = workers
+        self._jobs = queue.PriorityQueue()
+        self._posted = queue.SimpleQueue()
+        self._groups = {}  # group -> unfinished jobs submitted in it
+        self._order = itertools.count()  # Keeps submission order within a priority
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, priority=PRIORITY_CONTENT, group=None, parent=None):
+        """Queue func(job) and return its Job.
+
+        With a parent the job is a follow-up step of it: it joins the parent's
+        group without superseding anything and is cancelled with the parent.
+        """
+        job = Job(func, priority, parent.group if parent is not None else group)
+        superseded = []
+        with self._lock:
+            if job.group is not None:
+                jobs = self._groups.setdefault(job.group, [])
+                if parent is None:
+                    superseded, jobs[:] = list(jobs), []
+                jobs.append(job)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"job-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        for old_job in superseded:
+            old_job.cancel()
+        if parent is not None:
+            parent.on_cancel(job.cancel)
+        self._jobs.put((priority, next(self._order), job))
+        return job
+
+    def cancel_group(self, group):
+        """Cancel every unfinished job of a group"""
+        with self._lock:
+            jobs = self._groups.pop(group, [])
+        for job in jobs:
+            job.cancel()
+
+    def post(self, job, func):
+        """Queue func() for the main loop; dropped if job is cancelled first (never with job None)"""
+        self._posted.put((job, func))
+
+    def run_posted(self, max_seconds=None):
+        """Call the queued UI updates of live jobs; call this from the main loop only"""
+        deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+        while deadline is None or time.perf_counter() < deadline:
+            try:
+                job, func = self._posted.get_nowait()
+            except queue.Empty:
+                return
+            if job is None or not job.cancelled:
+                func()
+
+    def _work(self):
+        while True:
+            _, _, job = self._jobs.get()
+            try:
+                if not job.cancelled:
+                    job.func(job)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                print(f"Error in background job: {str(e)}")
+            finally:
+                job.done.set()
+                self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            jobs = self._groups.get(job.group)
+            if jobs is not None and job in jobs:
+                jobs.remove(job)
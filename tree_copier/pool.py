@@ -0,0 +1,211 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .index import content_hash
+from .reader import DEFAULT_READ_WORKERS, _read_node, _read_text, _store_text, read_files_parallel, skipped_file_text
+from .tokens import estimate_tokens
+
+# Worker processes decoding files; one is no better than the reader threads
+DEFAULT_DECODE_PROCESSES = min(os.cpu_count() or 1, 8)
+
+# Below both of these, files still to read are handled in-process: starting the
+# processes and pickling the texts back would take longer than it saves
+POOL_MIN_FILES = 2000
+POOL_MIN_BYTES = 32 * 1024 * 1024
+
+# Files sent to a worker per task, so the IPC cost is paid per batch rather than per file
+BATCH_FILES = 256
+BATCH_BYTES = 8 * 1024 * 1024
+
+def _process_batch(files, want_hash, count_tokens, encodings=None):
+    """Worker process: read, decode and measure a batch of (path, size) files.
+
+    Returns ([(content, is_text, skip_reason, encoding, line_count, hash, tokens)], seconds).
+    Skipped files come back without content, their placeholder is rebuilt by
+    the caller, so only text worth keeping is pickled.
+    """
+    started = time.perf_counter()
+    results = []
+    for path, size in files:
+        content, is_text, skip_reason, encoding = _read_text(path, size, encodings=encodings)
+        if is_text:
+            results.append((
+                content, True, None, encoding, content.count('\n'),
+                content_hash(content) if want_hash else None,
+                estimate_tokens(content) if count_tokens else None,
+            ))
+        elif is_text is False:
+            results.append((None, False, skip_reason, None, None, None, None))
+        else:
+            results.append((content, None, None, None, None, None, None))
+    return results, time.perf_counter() - started
+
+class DecodePool:
+    """Worker processes that read, decode, normalize, line-count and hash files in batches.
+
+    For big trees, where decoding and hashing under the GIL hold the reader
+    threads back. Files already in the cache or the index are served as
+    usual; when the rest is small, everything goes through read_files_parallel
+    instead. The processes start on first use and are kept for later loads.
+    With a TokenCounter, token estimates are made in the workers as well.
+    """
+    def __init__(self, processes=DEFAULT_DECODE_PROCESSES, token_counter=None,
+                 min_files=POOL_MIN_FILES, min_bytes=POOL_MIN_BYTES):
+        self.processes = processes
+        self.token_counter = token_counter
+        self.min_files = min_files
+        self.min_bytes = min_bytes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def worth_starting(self, nodes):
+        """Whether reading these files in the worker processes pays off"""
+        if self.processes <= 1:
+            return False
+        return len(nodes) >= self.min_files or sum(node.size or 0 for node in nodes) >= self.min_bytes
+
+    def read_files(self, nodes, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None, profile=None,
+                   hashes=None, encodings=None):
+        """Yield (node, body) for each file node, in the given order, like read_files_parallel.
+
+        Hashes computed by the workers are handed to hashes (a ContentHashes)
+        and the index, so dedupe and the index don't hash the texts again.
+        """
+        nodes = list(nodes)
+        missing = [node for node in nodes if not self._is_stored(node, cache, index)]
+        if not self.worth_starting(missing):
+            yield from read_files_parallel(nodes, workers, cache, index, skipped, profile, encodings)
+            return
+
+        missing_paths = {node.path for node in missing}
+        pooled = self._read_pooled(missing, cache, index, skipped, profile, hashes, encodings)
+        try:
+            for node in nodes:
+                if node.path in missing_paths:
+                    yield next(pooled)
+                else:
+                    yield _read_node(node, cache, index, skipped, profile, encodings)
+        finally:
+            pooled.close()
+
+    def _is_stored(self, node, cache, index):
+        if node.mtime is None:
+            return False
+        if cache is not None and cache.get_fresh(node.path, node.mtime, node.size) is not None:
+            return True
+        return index is not None and index.has(node.rel_path, node.mtime, node.size)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            return self._executor
+
+    def _read_pooled(self, nodes, cache, index, skipped, profile, hashes, encodings):
+        executor = self._get_executor()
+        want_hash = index is not None or hashes is not None
+        count_tokens = self.token_counter is not None
+
+        def submit(batch):
+            files = [(node.path, node.size) for node in batch]
+            try:
+                return batch, executor.submit(_process_batch, files, want_hash, count_tokens, encodings)
+            except BrokenProcessPool:
+                return batch, None  # Read in-process when its turn comes
+
+        batches = _iter_batches(nodes)
+        pending = deque()
+        try:
+            # A few batches ahead per process, so none of them waits on the consumer
+            for batch in batches:
+                pending.append(submit(batch))
+                if len(pending) >= self.processes * 2:
+                    break
+            while pending:
+                batch, future = pending.popleft()
+                try:
+                    if future is None:
+                        raise BrokenProcessPool("the pool broke before this batch was submitted")
+                    results, seconds = future.result()
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory): the pool is gone, read this batch, the ones
+                    # submitted after it and the rest here, in order, and start over next time
+                    self._discard_executor(executor)
+                    remaining = [batch] + [pending_batch for pending_batch, _ in pending]
+                    pending.clear()
+                    for node in itertools.chain.from_iterable(itertools.chain(remaining, batches)):
+                        yield _read_node(node, cache, index, skipped, profile, encodings)
+                    return
+                except Exception:
+                    # The worker raised on this batch, the pool itself is fine
+                    results = None
+                next_batch = next(batches, None)
+                if next_batch is not None:
+                    pending.append(submit(next_batch))
+                if results is None:
+                    for node in batch:
+                        yield _read_node(node, cache, index, skipped, profile, encodings)
+                    continue
+                if profile is not None:
+                    profile.add('pool', seconds, sum(node.size or 0 for node in batch))
+                for node, result in zip(batch, results):
+                    yield node, self._keep_result(node, result, cache, index, skipped, profile, hashes)
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def _keep_result(self, node, result, cache, index, skipped, profile, hashes):
+        content, is_text, skip_reason, encoding, line_count, text_hash, tokens = result
+        if is_text is False:
+            content = skipped_file_text(skip_reason, node.size)
+            if skipped is not None:
+                skipped.add(node.rel_path, skip_reason, node.size)
+        elif skipped is not None:
+            skipped.add_encoding(node.rel_path, encoding)
+        if node.mtime is not None:
+            _store_text(node, content, is_text, skip_reason, encoding, cache, index, line_count, text_hash)
+            if text_hash is not None and hashes is not None:
+                hashes.remember(node, text_hash)
+        if tokens is not None:
+            self.token_counter.remember(content, tokens)
+        if profile is not None:
+            profile.count('files')
+            profile.count('pooled_files')
+        return content
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _iter_batches(nodes):
+    batch = []
+    batch_bytes = 0
+    for node in nodes:
+        batch.append(node)
+        batch_bytes += node.size or 0
+        if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+            yield batch
+            batch = []
+            batch_bytes = 0
+    if batch:
+        yield batch
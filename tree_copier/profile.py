@@ -0,0 +1,110 @@
+import heapq
+import json
+import threading
+import time
+
+from .reader import format_size
+
+# Stages of a load, in the order they run
+LOAD_STAGES = ('scan', 'read', 'decode', 'assemble', 'insert', 'indicators')
+
+# What the amount of a stage counts
+STAGE_AMOUNTS = {'read': 'bytes', 'decode': 'bytes', 'pool': 'bytes', 'assemble': 'files', 'insert': 'characters'}
+
+# Slowest files kept per load
+SLOWEST_FILES = 10
+
+class LoadProfile:
+    """Timings and counters of one load, filled from the loader and reader threads.
+
+    Each stage adds up seconds (summed across threads, so read and decode can
+    exceed the wall time), calls and an amount (bytes for read and decode).
+    Code paths take profile=None by default and then don't time anything.
+    """
+    def __init__(self, label=""):
+        self.label = label
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {name: [0.0, 0, 0] for name in LOAD_STAGES}  # name -> [seconds, calls, amount]
+        self.counters = {}
+        self.extra = {}  # Other stats reported as they are, e.g. the gutter's
+        self._slowest = []  # Min-heap of (seconds, path, size)
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, amount=0):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+            totals[2] += amount
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def file_read(self, path, seconds, size):
+        """Note a file read from disk, keeping the slowest ones"""
+        entry = (seconds, path, size)
+        with self._lock:
+            if len(self._slowest) < SLOWEST_FILES:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def as_dict(self):
+        with self._lock:
+            end = self.finished if self.finished is not None else time.perf_counter()
+            return {
+                'label': self.label,
+                'wall_seconds': round(end - self.started, 6),
+                'stages': {
+                    name: {'seconds': round(seconds, 6), 'calls': calls, 'amount': amount}
+                    for name, (seconds, calls, amount) in self.stages.items()
+                },
+                'counters': dict(self.counters),
+                'slowest_files': [
+                    {'path': path, 'seconds': round(seconds, 6), 'size': size}
+                    for seconds, path, size in sorted(self._slowest, reverse=True)
+                ],
+                **self.extra,
+            }
+
+    def report_lines(self):
+        """Human-readable summary of as_dict(), a line at a time"""
+        stats = self.as_dict()
+        yield f"{stats['label'] or 'Load'}: {stats['wall_seconds']:.3f} s"
+        yield ""
+        for name, stage in stats['stages'].items():
+            if not stage['calls']:
+                continue
+            unit = STAGE_AMOUNTS.get(name)
+            amount = ""
+            if unit == 'bytes':
+                amount = format_size(stage['amount'])
+            elif unit:
+                amount = f"{stage['amount']:,} {unit}"
+            yield f"{name:<11}{stage['seconds'] * 1000:>10.1f} ms{stage['calls']:>9,} calls  {amount}".rstrip()
+        yield "(read, decode and pool are summed over the reader threads and processes)"
+
+        counters = stats['counters']
+        if counters:
+            yield ""
+            yield ", ".join(f"{name.replace('_', ' ')}: {value:,}" for name, value in sorted(counters.items()))
+        if stats['slowest_files']:
+            yield ""
+            yield "Slowest files:"
+            for entry in stats['slowest_files']:
+                yield f"{entry['seconds'] * 1000:>8.2f} ms  {entry['path']} ({format_size(entry['size'])})"
+        for name, value in self.extra.items():
+            if isinstance(value, dict):
+                value = ", ".join(f"{key.replace('_', ' ')}: {item}" for key, item in value.items())
+            yield ""
+            yield f"{name}: {value}"
+
+    def dump(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+            f.write('\n')
@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .encoding import (
+    DEFAULT_FALLBACK_ENCODINGS, WIDE_ENCODINGS, decode_bytes, decodes_the_same, detect_encoding, undecodable_reason,
+)
+
+# Number of threads used to read file contents concurrently. Loading is
+# dominated by I/O latency (especially on network drives), not CPU.
+DEFAULT_READ_WORKERS = 16
+
+# File types never read into the aggregate
+IGNORED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.mp4', '.avi', '.mov', '.wmv', '.zip', '.tar', '.gz']
+
+# Body shown for files that aren't UTF-8 text, when there are no fallback encodings
+BINARY_FILE_TEXT = "[Could not read file: Binary or non-text file]\n"
+NOT_UTF8_REASON = undecodable_reason(())
+
+# Binary detection: only this much of a file is read before deciding to skip it
+SNIFF_BYTES = 8192
+# Share of control bytes in the sniffed prefix above which a file counts as binary
+MAX_NON_TEXT_RATIO = 0.3
+# Larger files are skipped without being opened
+MAX_FILE_SIZE = 16 * 1024 * 1024
+
+_NON_TEXT_BYTES = bytes(b for b in range(32) if b not in b'\t\n\f\r\b\x1b') + b'\x7f'
+
+def is_ignored_file(file_path):
+    return any(file_path.lower().endswith(ext) for ext in IGNORED_EXTENSIONS)
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def sniff_binary(prefix):
+    """Return why a file starting with prefix isn't text, or None if it looks like text"""
+    if b'\0' in prefix:
+        return "contains NUL bytes"
+    non_text = len(prefix) - len(prefix.translate(None, _NON_TEXT_BYTES))
+    if non_text > len(prefix) * MAX_NON_TEXT_RATIO:
+        return "mostly non-text bytes"
+    return None
+
+def skipped_file_text(reason, size):
+    """Body shown in place of a file that was skipped"""
+    if reason == NOT_UTF8_REASON:
+        return BINARY_FILE_TEXT
+    return f"[Skipped file: {reason}, {format_size(size)}]\n"
+
+class SkippedFile:
+    __slots__ = ('path', 'reason', 'size')
+
+    def __init__(self, path, reason, size):
+        self.path = path
+        self.reason = reason
+        self.size = size
+
+class SkipReport:
+    """Files left out of the aggregate and why, and the encoding of files that
+    weren't plain UTF-8; filled from the reader threads"""
+    def __init__(self):
+        self.files = []
+        self.encodings = {}  # path -> encoding, for text decoded from anything but UTF-8
+        self._reasons = {}
+        self._lock = threading.Lock()
+
+    def add(self, path, reason, size):
+        with self._lock:
+            self.files.append(SkippedFile(path, reason, size))
+            self._reasons[path] = reason
+
+    def add_encoding(self, path, encoding):
+        if encoding is not None and encoding != 'utf-8':
+            with self._lock:
+                self.encodings[path] = encoding
+
+    def encoding_for(self, path):
+        """Encoding a text file was decoded from"""
+        return self.encodings.get(path, 'utf-8')
+
+    def reason_for(self, path):
+        """Why a file was skipped, or None if it wasn't"""
+        return self._reasons.get(path)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        return iter(list(self.files))
+
+    def total_size(self):
+        return sum(skipped.size or 0 for skipped in self.files)
+
+def _read_text(file_path, size=None, profile=None, encodings=None):
+    """Return (content, is_text, skip_reason, encoding) for a file, content always newline-terminated.
+
+    A size cutoff and a sniff of the first SNIFF_BYTES reject binary files
+    before they are read in full. The encoding comes from a BOM, UTF-8, or
+    the fallback chain encodings (DEFAULT_FALLBACK_ENCODINGS when None),
+    decided on the bytes already read. is_text is False for skipped files and
+    None when the file couldn't be read at all, in which case the result must
+    not be cached. A LoadProfile as profile gets the read and decode times.
+    """
+    encodings = DEFAULT_FALLBACK_ENCODINGS if encodings is None else encodings
+    started = time.perf_counter() if profile is not None else 0
+    if size is not None and size > MAX_FILE_SIZE:
+        reason = f"larger than {format_size(MAX_FILE_SIZE)}"
+        return skipped_file_text(reason, size), False, reason, None
+    try:
+        with open(file_path, 'rb') as f:
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+                if size > MAX_FILE_SIZE:
+                    reason = f"larger than {format_size(MAX_FILE_SIZE)}"
+                    return skipped_file_text(reason, size), False, reason, None
+            data = f.read(SNIFF_BYTES)
+            # UTF-16 and UTF-32 text is full of NUL bytes, the sniff would take it for binary
+            reason = sniff_binary(data) if detect_encoding(data)[0] not in WIDE_ENCODINGS else None
+            if reason is not None:
+                if profile is not None:
+                    profile.add('read', time.perf_counter() - started, len(data))
+                return skipped_file_text(reason, size), False, reason, None
+            if len(data) == SNIFF_BYTES:  # Small files were read whole by the sniff
+                data += f.read()
+        if profile is not None:
+            read_done = time.perf_counter()
+            profile.add('read', read_done - started, len(data))
+        content, encoding = decode_bytes(data, encodings, SNIFF_BYTES)
+    except UnicodeDecodeError:
+        reason = undecodable_reason(encodings)
+        return skipped_file_text(reason, size), False, reason, None
+    except IOError as e:
+        return f"[Could not read file: {str(e)}]\n", None, None, None
+    except Exception as e:
+        return f"[Error reading file: {str(e)}]\n", None, None, None
+    if '\r' in content:  # Universal newlines, as text mode reading did
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    if not content.endswith('\n'):
+        content += '\n'
+    if profile is not None:
+        finished = time.perf_counter()
+        profile.add('decode', finished - read_done, len(data))
+        profile.file_read(file_path, finished - started, len(data))
+    return content, True, None, encoding
+
+def read_file_text(file_path, cache=None, mtime=None, size=None, encodings=None):
+    """Read a file for the aggregate and return its body, always newline-terminated.
+
+    With a cache, mtime and size (from a scan, or a fresh stat when not
+    given) decide whether the cached text can be used instead.
+    """
+    if cache is not None:
+        try:
+            if mtime is None:
+                st = os.stat(file_path)
+                mtime, size = st.st_mtime_ns, st.st_size
+        except OSError as e:
+            return f"[Could not read file: {str(e)}]\n"
+        # Unchanged files are served from memory without being reopened
+        entry = cache.get_fresh(file_path, mtime, size)
+        if entry is not None and decodes_the_same(entry.encoding, entry.skip_reason, _chain(encodings)):
+            return entry.text
+
+    content, is_text, skip_reason, encoding = _read_text(file_path, size, encodings=encodings)
+    if cache is not None and is_text is not None:
+        cache.put(file_path, content, mtime, size, skip_reason, encoding=encoding)
+    return content
+
+def _chain(encodings):
+    return DEFAULT_FALLBACK_ENCODINGS if encodings is None else encodings
+
+def _read_node(node, cache=None, index=None, skipped=None, profile=None, encodings=None):
+    """Return (node, body), trying the memory cache, then the on-disk index, then the file"""
+    if node.mtime is None:  # Not stat-able, nothing can vouch for a cached copy
+        content, _, skip_reason, encoding = _read_text(node.path, profile=profile, encodings=encodings)
+    else:
+        content, skip_reason, encoding = _read_node_text(node, cache, index, profile, encodings)
+    if skipped is not None:
+        if skip_reason is not None:
+            skipped.add(node.rel_path, skip_reason, node.size)
+        skipped.add_encoding(node.rel_path, encoding)
+    if profile is not None:
+        profile.count('files')
+    return node, content
+
+def _read_node_text(node, cache, index, profile=None, encodings=None):
+    found = _stored_text(node, cache, index, profile, encodings)
+    if found is not None:
+        return found
+    content, is_text, skip_reason, encoding = _read_text(node.path, node.size, profile, encodings)
+    _store_text(node, content, is_text, skip_reason, encoding, cache, index)
+    return content, skip_reason, encoding
+
+def _stored_text(node, cache, index, profile=None, encodings=None):
+    """(content, skip_reason, encoding) of an unchanged file from the memory cache or the on-disk
+    index, or None; entries the fallback chain encodings would decode differently don't count"""
+    encodings = _chain(encodings)
+    if cache is not None:
+        entry = cache.get_fresh(node.path, node.mtime, node.size)
+        if entry is not None and decodes_the_same(entry.encoding, entry.skip_reason, encodings):
+            if profile is not None:
+                profile.count('cache_hits')
+            return entry.text, entry.skip_reason, entry.encoding
+    if index is not None:
+        found = index.lookup(node.rel_path, node.mtime, node.size)
+        if found is not None and decodes_the_same(found[2], found[1], encodings):
+            content, skip_reason, encoding = found
+            if profile is not None:
+                profile.count('index_hits')
+            if cache is not None:
+                cache.put(node.path, content, node.mtime, node.size, skip_reason, encoding=encoding)
+            return found
+    return None
+
+def _store_text(node, content, is_text, skip_reason, encoding, cache, index, line_count=None, text_hash=None):
+    """Keep a freshly read file in the cache and the index, unless it couldn't be read"""
+    if is_text is not None:
+        if cache is not None:
+            cache.put(node.path, content, node.mtime, node.size, skip_reason, line_count, encoding)
+        if index is not None:
+            index.record(node.rel_path, node.mtime, node.size, content if is_text else None, skip_reason, text_hash,
+                         encoding)
+
+def read_files_parallel(nodes, workers=DEFAULT_READ_WORKERS, cache=None, index=None, skipped=None, profile=None,
+                        encodings=None):
+    """Yield (node, body) for each file node, in the given order, reading ahead on a thread pool.
+
+    Binary and oversized files get a placeholder body and, with a SkipReport
+    as skipped, are listed there with the reason; files that aren't UTF-8
+    are decoded with the fallback chain encodings and listed there with their
+    encoding. With a LoadProfile as profile, disk reads, decoding and cache
+    hits are recorded in it.
+    """
+    if workers <= 1:
+        for node in nodes:
+            yield _read_node(node, cache, index, skipped, profile, encodings)
+        return
+
+    nodes = iter(nodes)
+    pending = deque()
+    # Bound the read-ahead so a slow consumer doesn't pull the whole tree into memory
+    max_pending = workers * 4
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reader") as executor:
+        try:
+            for node in nodes:
+                pending.append(executor.submit(_read_node, node, cache, index, skipped, profile, encodings))
+                if len(pending) >= max_pending:
+                    break
+            while pending:
+                entry = pending.popleft().result()
+                next_node = next(nodes, None)
+                if next_node is not None:
+                    pending.append(executor.submit(_read_node, next_node, cache, index, skipped, profile, encodings))
+                yield entry
+        finally:
+            for future in pending:
+                future.cancel()
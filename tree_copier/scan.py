@@ -0,0 +1,91 @@
+import os
+import stat
+
+class TreeNode:
+    """A file or directory found by a scan; directories keep their children sorted by name"""
+    __slots__ = ('name', 'path', 'rel_path', 'is_dir', 'size', 'mtime', 'children')
+
+    def __init__(self, name, path, rel_path, is_dir, size=None, mtime=None):
+        self.name = name
+        self.path = path
+        self.rel_path = rel_path  # Name shown in the aggregate
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime  # st_mtime_ns
+        self.children = [] if is_dir else None
+
+def scan_directory(dir_path, rules=None, cancelled=None):
+    """Walk dir_path once with os.scandir and return its TreeNode.
+
+    File types, sizes and mtimes come from the DirEntry objects, so building
+    the tree, loading the contents and filtering never stat a file again.
+    Like os.walk, symlinked directories are listed but not descended into.
+    With IgnoreRules, excluded entries are dropped before anything below
+    them is scanned, so the tree, contents and exports all leave them out.
+    cancelled() is asked before each directory; once it is true the scan
+    stops and the partial tree is returned.
+    """
+    root = TreeNode(os.path.basename(os.path.normpath(dir_path)), dir_path, "", True)
+    stack = [(root, ())]
+    while stack:
+        if cancelled is not None and cancelled():
+            break
+        node, gitignores = stack.pop()
+        try:
+            with os.scandir(node.path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue  # Unreadable directories show up empty
+        if rules is not None:
+            gitignores = rules.gitignores_for(node.path, node.rel_path, gitignores)
+
+        for entry in entries:
+            rel_path = os.path.join(node.rel_path, entry.name) if node.rel_path else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if rules is not None:
+                if rules.is_excluded(rel_path, is_dir, gitignores):
+                    continue
+                if not is_dir and not rules.is_included(rel_path):
+                    continue
+            child = TreeNode(entry.name, entry.path, rel_path, is_dir)
+            if is_dir:
+                if not entry.is_symlink():
+                    stack.append((child, gitignores))
+            else:
+                try:
+                    st = entry.stat()
+                    child.size = st.st_size
+                    child.mtime = st.st_mtime_ns
+                except OSError:
+                    pass  # e.g. a broken symlink, reading it reports the error
+            node.children.append(child)
+    return root
+
+def scan_files(file_paths):
+    """Return TreeNodes for the regular files among file_paths, named by their basename"""
+    nodes = []
+    for file_path in file_paths:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            name = os.path.basename(file_path)
+            nodes.append(TreeNode(name, file_path, name, False, st.st_size, st.st_mtime_ns))
+    return nodes
+
+def iter_tree_files(node):
+    """Yield the file nodes under node, each directory's files before its subdirectories (os.walk order)"""
+    stack = [node]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        for child in directory.children:
+            if child.is_dir:
+                subdirs.append(child)
+            else:
+                yield child
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,273 @@
+import bisect
+import re
+import threading
+
+from .index import content_hash
+
+# Words the index is made of: runs of anything but ASCII punctuation, space
+# and control characters. Texts are split on their UTF-8 bytes, a translate()
+# and split() being much faster than a regex; queries are split the same way.
+_NON_WORD = bytes(range(48)) + bytes(range(58, 65)) + bytes(range(91, 95)) + b'`' + bytes(range(123, 128))
+_SPLIT_TABLE = bytes.maketrans(_NON_WORD, b' ' * len(_NON_WORD))
+_WORD = re.compile('[^' + re.escape(_NON_WORD.decode('ascii')) + ']+')
+
+# Query words shorter than this that may be part of a longer word match too
+# much of the vocabulary to narrow anything down, they are left to the verify pass
+MIN_PARTIAL_WORD = 3
+
+# Hits returned per search, the rest is only counted as "more"
+MAX_SEARCH_RESULTS = 2000
+
+class SearchHit:
+    __slots__ = ('name', 'line', 'column', 'text')
+
+    def __init__(self, name, line, column, text):
+        self.name = name
+        self.line = line  # 1-based, within the file's content
+        self.column = column
+        self.text = text  # The matching line
+
+class SearchIndex:
+    """Inverted index of the words (ASCII-lowercased) in each loaded file, filled as files load.
+
+    It only narrows down which files can match; the matches themselves are
+    found by running the pattern over those files (see search_segments). So
+    it can hold more than what is shown: words of a file's older text, or of
+    files the filter hides, are just candidates that don't match.
+    """
+    def __init__(self):
+        self._ids = {}        # name -> file id
+        self._names = []      # file id -> name
+        self._indexed = {}    # name -> content_hash of the text indexed for it
+        self._postings = {}   # word (bytes) -> [file id, ...]
+        self._vocabulary = None  # (words, newline-joined words, start offsets), rebuilt after new words
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def add(self, name, text):
+        """Index a file's text; the same text for the same name again is a no-op"""
+        key = content_hash(text)
+        words = set(text.encode('utf-8', 'replace').translate(_SPLIT_TABLE).lower().split())
+        with self._lock:
+            if self._indexed.get(name) == key:
+                return
+            self._indexed[name] = key
+            file_id = self._ids.get(name)
+            if file_id is None:
+                file_id = self._ids[name] = len(self._names)
+                self._names.append(name)
+            postings = self._postings
+            for word in words:
+                files = postings.get(word)
+                if files is None:
+                    postings[word] = [file_id]
+                    self._vocabulary = None
+                elif files[-1] != file_id:
+                    files.append(file_id)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+            self._indexed.clear()
+            self._postings.clear()
+            self._vocabulary = None
+
+    def candidates(self, literals):
+        """Names of the files that can contain all of literals (strings every match contains), or None
+        when they don't narrow anything down and every file has to be searched"""
+        constraints = [constraint for literal in literals for constraint in _word_constraints(literal)]
+        if not constraints:
+            return None
+        with self._lock:
+            found = None
+            for word, kind in constraints:
+                files = self._files_with(word, kind)
+                found = files if found is None else found & files
+                if not found:
+                    break
+            return {self._names[file_id] for file_id in found}
+
+    def _files_with(self, word, kind):
+        # Caller holds the lock
+        if kind == 'word':
+            return set(self._postings.get(word, ()))
+        files = set()
+        for vocabulary_word in self._matching_words(word, kind):
+            files.update(self._postings[vocabulary_word])
+        return files
+
+    def _matching_words(self, word, kind):
+        # All words in one string, so finding the ones that start with, end
+        # with or contain word is a C-speed str.find over it
+        if self._vocabulary is None:
+            words = list(self._postings)
+            offsets = []
+            offset = 1
+            for vocabulary_word in words:
+                offsets.append(offset)
+                offset += len(vocabulary_word) + 1
+            self._vocabulary = (words, b"\n" + b"\n".join(words) + b"\n", offsets)
+        words, joined, offsets = self._vocabulary
+
+        needle = {'prefix': b"\n" + word, 'suffix': word + b"\n", 'part': word}[kind]
+        shift = 1 if kind == 'prefix' else 0
+        matched = []
+        position = joined.find(needle)
+        while position != -1:
+            index = bisect.bisect_right(offsets, position + shift) - 1
+            matched.append(words[index])
+            # Continue after this word, each word counts once
+            position = joined.find(needle, offsets[index] + len(words[index]))
+        return matched
+
+def _word_constraints(literal):
+    """(word, kind) the index has to hold for text containing literal: the
+    whole words in it, and the words cut by its ends as prefix / suffix / part"""
+    constraints = []
+    for match in _WORD.finditer(literal):
+        word = match.group()
+        if not word.isascii():
+            continue  # The index only folds ASCII case, so it can't tell "É" from "é"
+        word = word.lower().encode('ascii')
+        at_start = match.start() == 0
+        at_end = match.end() == len(literal)
+        if not at_start and not at_end:
+            constraints.append((word, 'word'))
+        elif len(word) >= MIN_PARTIAL_WORD:
+            kind = 'part' if at_start and at_end else 'suffix' if at_start else 'prefix'
+            constraints.append((word, kind))
+    return constraints
+
+def compile_query(query, regex=False, match_case=False):
+    """Compile a search query; raises re.error for an invalid regex"""
+    flags = re.MULTILINE if match_case else re.MULTILINE | re.IGNORECASE
+    return re.compile(query if regex else re.escape(query), flags)
+
+def required_literals(pattern):
+    """Literal strings every match of a compiled pattern contains, for prefiltering with the index.
+
+    Conservative: groups, classes and optional characters are left out, and
+    a top-level alternation (or verbose mode) gives none at all.
+    """
+    if pattern.flags & re.VERBOSE:
+        return []
+    source = pattern.pattern
+    literals = []
+    run = []
+
+    def end_run():
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            escaped = source[i + 1:i + 2]
+            if escaped and not escaped.isalnum():
+                run.append(escaped)
+            else:
+                end_run()  # \d, \b, \x41, \1 and the like
+            i = _skip_escape(source, i)
+        elif char == '|':
+            return []
+        elif char in '([':
+            end_run()
+            i = _skip_group(source, i)
+        elif char in '*?{':
+            # The character before is optional
+            if run:
+                run.pop()
+            end_run()
+            i = source.find('}', i) + 1 or len(source) if char == '{' else i + 1
+        else:
+            if char in '+.^$':
+                end_run()  # After +, the character before repeats; the others match anything
+            else:
+                run.append(char)
+            i += 1
+    end_run()
+    return literals
+
+def _skip_escape(source, i):
+    """Index just past the escape sequence starting at source[i]"""
+    escaped = source[i + 1:i + 2]
+    if escaped in ('x', 'u', 'U'):
+        return i + 2 + {'x': 2, 'u': 4, 'U': 8}[escaped]
+    if escaped == 'N':
+        return source.find('}', i) + 1 or len(source)
+    i += 2
+    if escaped.isdigit():
+        while i < len(source) and source[i].isdigit():
+            i += 1
+    return i
+
+def _skip_group(source, i):
+    """Index just past the group or class starting at source[i]"""
+    depth = 0
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            if char == ']':
+                in_class = False
+                if depth == 0:
+                    return i + 1
+        elif char == '[':
+            in_class = True
+            # A ] right after [ or [^ is a literal
+            if source[i + 1:i + 2] == '^':
+                i += 1
+            if source[i + 1:i + 2] == ']':
+                i += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+def search_segments(pattern, files, candidates=None, max_results=MAX_SEARCH_RESULTS, cancelled=None):
+    """Run a compiled pattern over (name, content) files and return (hits, total).
+
+    Only files in candidates are searched when it isn't None. One hit per
+    matching line, at most max_results of them; total counts them all.
+    cancelled() is checked between files.
+    """
+    hits = []
+    total = 0
+    for name, content in files:
+        if candidates is not None and name not in candidates:
+            continue
+        if cancelled is not None and cancelled():
+            break
+        line = 1
+        counted_to = 0
+        last_line_end = -1
+        for match in pattern.finditer(content):
+            start = match.start()
+            if start < last_line_end:
+                continue  # Already have a hit on this line
+            line += content.count('\n', counted_to, start)
+            counted_to = start
+            line_start = content.rfind('\n', 0, start) + 1
+            line_end = content.find('\n', start)
+            if line_end == -1:
+                line_end = len(content)
+            last_line_end = line_end + 1
+            total += 1
+            if len(hits) < max_results:
+                hits.append(SearchHit(name, line, start - line_start, content[line_start:line_end]))
+    return hits, total
@@ -0,0 +1,108 @@
+import os
+
+from .tokens import estimate_tokens
+
+def part_path(out_path, number):
+    """File name of a numbered part: bundle.txt -> bundle.part001.txt"""
+    root, ext = os.path.splitext(out_path)
+    return f"{root}.part{number:03d}{ext}"
+
+class PartWriter:
+    """Write the export into numbered part files of at most max_bytes (UTF-8)
+    or max_tokens (estimated) each, header and footer included.
+
+    Files are kept whole when they fit in a part and only split on line
+    boundaries when they don't fit in any; text is written as it comes, so
+    memory stays constant however large the export. A single line longer
+    than the limit still gets a part of its own.
+    """
+    def __init__(self, out_path, max_bytes=None, max_tokens=None, header="", footer=""):
+        if not max_bytes and not max_tokens:
+            raise ValueError("PartWriter needs max_bytes or max_tokens")
+        self.out_path = out_path
+        self.limit = max_tokens if max_tokens else max_bytes
+        self.by_tokens = bool(max_tokens)
+        self.header = header
+        self.footer = footer
+        self.paths = []      # Part files written so far
+        self._file = None
+        self._used = 0
+        self._empty = True       # Whether nothing but the header is in the open part
+        self._has_files = False  # Whether the open part holds a file, so the next one needs a separator
+
+    def measure(self, text):
+        return estimate_tokens(text) if self.by_tokens else len(text.encode('utf-8'))
+
+    def _new_part(self):
+        self._close_part()
+        path = part_path(self.out_path, len(self.paths) + 1)
+        self._file = open(path, 'w', encoding='utf-8')
+        self.paths.append(path)
+        self._file.write(self.header)
+        # Room for the footer is kept from the start
+        self._used = self.measure(self.header) + self.measure(self.footer)
+        self._empty = True
+        self._has_files = False
+
+    def _close_part(self):
+        if self._file is not None:
+            self._file.write(self.footer)
+            self._file.close()
+            self._file = None
+
+    def _needs_new_part(self, size):
+        return self._file is None or (not self._empty and self._used + size > self.limit)
+
+    def _emit(self, text, size):
+        self._file.write(text)
+        self._used += size
+        self._empty = False
+
+    def write_lines(self, lines):
+        """Write text that can be cut between any two lines, e.g. the tree"""
+        for line in lines:
+            size = self.measure(line)
+            if self._needs_new_part(size):
+                self._new_part()
+            self._emit(line, size)
+
+    def write_file(self, name, content):
+        """Write one "⚫ name:" segment, starting a new part or splitting it on lines when it doesn't fit"""
+        segment = f"⚫ {name}:\n{content}"
+        size = self.measure(segment)
+        if self._has_files and not self._needs_new_part(size + 1):
+            self._emit("\n" + segment, size + 1)
+        elif not self._has_files and not self._needs_new_part(size):
+            self._emit(segment, size)
+        else:
+            if self._file is None or not self._empty:
+                self._new_part()
+            if self._used + size <= self.limit:
+                self._emit(segment, size)
+            else:
+                self._write_split_file(name, content)
+        self._has_files = True
+
+    def _write_split_file(self, name, content):
+        header = f"⚫ {name}:\n"
+        self._emit(header, self.measure(header))
+        for line in content.splitlines(keepends=True):
+            size = self.measure(line)
+            if self._used + size > self.limit:
+                self._new_part()
+                header = f"⚫ {name} (continued):\n"
+                self._emit(header, self.measure(header))
+            self._emit(line, size)
+
+    def close(self):
+        """Finish the last part and return the paths of all parts"""
+        if self._file is None and not self.paths:
+            self._new_part()
+        self._close_part()
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._close_part()
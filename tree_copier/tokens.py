@@ -0,0 +1,77 @@
+import re
+import threading
+
+from .index import content_hash
+
+# Close to what BPE tokenizers do with source code (about 3.6 characters per
+# token): runs of up to eight letters, up to three digits, a line break with
+# the indentation after it, other whitespace runs and single punctuation marks
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{1,8}|\d{1,3}|\s*\n[ \t]*|[ \t]{2,}|[^\w\s]|_")
+
+# Distinct texts remembered by a TokenCounter before it starts over
+MAX_COUNTED_TEXTS = 200000
+
+def estimate_tokens(text):
+    """Approximate number of LLM tokens in text, without a tokenizer"""
+    return len(TOKEN_PATTERN.findall(text))
+
+def format_tokens(count):
+    if count < 1000:
+        return str(count)
+    if count < 1000000:
+        return f"{count / 1000:.1f}k"
+    return f"{count / 1000000:.1f}M"
+
+class TokenCounter:
+    """Token estimates memoized by content, so reloads, filtering and watch
+    updates only tokenize text that changed. Safe to call from reader threads.
+    """
+    def __init__(self):
+        self._counts = {}  # content_hash of the text -> estimate; not the text, which would stay in memory
+        self._lock = threading.Lock()
+
+    def count(self, text):
+        key = content_hash(text)
+        count = self._counts.get(key)
+        if count is None:
+            count = estimate_tokens(text)
+            self._remember(key, count)
+        return count
+
+    def remember(self, text, count):
+        """Record an estimate made elsewhere, e.g. by a DecodePool worker"""
+        self._remember(content_hash(text), count)
+
+    def _remember(self, key, count):
+        with self._lock:
+            if len(self._counts) >= MAX_COUNTED_TEXTS:
+                self._counts.clear()
+            self._counts[key] = count
+
+    def count_segment(self, name, content):
+        """Tokens a file adds to the aggregate: its "⚫ name:" header and its content"""
+        return self.count(f"⚫ {name}:\n") + self.count(content)
+
+def fit_to_budget(nodes, counts, budget, preferred=None):
+    """Pick the files to keep within budget tokens, in the order of nodes.
+
+    counts maps rel_path to the file's token count. Files for which
+    preferred(node) is true come first, then the most recently modified,
+    then the smallest; a file that doesn't fit is passed over for smaller ones.
+    """
+    def priority(node):
+        return (
+            0 if preferred is None or preferred(node) else 1,
+            -(node.mtime or 0),
+            counts.get(node.rel_path, 0),
+        )
+
+    chosen = set()
+    used = 0
+    for node in sorted(nodes, key=priority):
+        count = counts.get(node.rel_path)
+        if count is None or used + count > budget:
+            continue
+        chosen.add(node.rel_path)
+        used += count
+    return [node for node in nodes if node.rel_path in chosen], used
@@ -0,0 +1,50 @@
+from .scan import iter_tree_files
+
+class TreeChanges:
+    """Difference between two scans of the same root.
+
+    added and removed hold file nodes (files under a new or deleted directory
+    included), modified holds (old_node, new_node) pairs whose size or mtime
+    changed, and changed_dirs holds (old_dir, new_dir) pairs whose list of
+    entries differs, each directory before any of its descendants.
+    """
+    __slots__ = ('added', 'removed', 'modified', 'changed_dirs')
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.modified = []
+        self.changed_dirs = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified or self.changed_dirs)
+
+def diff_trees(old, new):
+    """Compare two TreeNode scans directory by directory"""
+    changes = TreeChanges()
+    stack = [(old, new)]
+    while stack:
+        old_dir, new_dir = stack.pop()
+        old_children = {child.name: child for child in old_dir.children}
+        new_children = {child.name: child for child in new_dir.children}
+        structure_changed = False
+
+        for name, old_child in old_children.items():
+            new_child = new_children.get(name)
+            if new_child is None or new_child.is_dir != old_child.is_dir:
+                structure_changed = True
+                changes.removed.extend(iter_tree_files(old_child) if old_child.is_dir else [old_child])
+            elif old_child.is_dir:
+                stack.append((old_child, new_child))
+            elif old_child.size != new_child.size or old_child.mtime != new_child.mtime:
+                changes.modified.append((old_child, new_child))
+
+        for name, new_child in new_children.items():
+            old_child = old_children.get(name)
+            if old_child is None or new_child.is_dir != old_child.is_dir:
+                structure_changed = True
+                changes.added.extend(iter_tree_files(new_child) if new_child.is_dir else [new_child])
+
+        if structure_changed:
+            changes.changed_dirs.append((old_dir, new_dir))
+    return changes